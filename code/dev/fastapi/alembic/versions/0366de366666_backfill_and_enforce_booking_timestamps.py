@@ -1,7 +1,7 @@
 """Backfill NULL booking timestamps and enforce NOT NULL + defaults.
 
 Revision ID: 7a2c41b9d810
-Revises: <PUT_PREVIOUS_REVISION_ID_HERE>
+Revises:
 Create Date: 2025-08-11 09:15:00 UTC
 """
 from alembic import op
@@ -9,7 +9,8 @@ from alembic import op
 
 # Revision identifiers.
 revision = "7a2c41b9d810"
-down_revision = "<PUT_PREVIOUS_REVISION_ID_HERE>"
+# Root of the chain: the initial tables predate Alembic and were made by create_all
+down_revision = None
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,38 @@
+"""Add the booking_stats_daily rollup and backfill it from bookings.
+
+Revision ID: a9d4e6f1c302
+Revises: f7a3c1e9b254
+Create Date: 2026-10-18 12:00:00 UTC
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a9d4e6f1c302"
+down_revision = "f7a3c1e9b254"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "booking_stats_daily",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("service_type", sa.String(20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("user_id", "day", "status", "service_type"),
+    )
+    op.create_index("ix_booking_stats_daily_day", "booking_stats_daily", ["day"])
+    # Same aggregation as app.rollups.rebuild
+    op.execute(
+        "INSERT INTO booking_stats_daily (user_id, day, status, service_type, count) "
+        "SELECT user_id, CAST(timezone('UTC', created_at) AS DATE), status::text, service_type::text, count(*) "
+        "FROM bookings GROUP BY 1, 2, 3, 4"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_booking_stats_daily_day", table_name="booking_stats_daily")
+    op.drop_table("booking_stats_daily")
@@ -0,0 +1,25 @@
+"""Add chat_history.embedding for message similarity search.
+
+Revision ID: b2e8f4a7d610
+Revises: a9d4e6f1c302
+Create Date: 2026-10-18 12:00:00 UTC
+
+Existing rows keep a NULL embedding; the in-process vector index encodes
+them when it first loads them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "b2e8f4a7d610"
+down_revision = "a9d4e6f1c302"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("chat_history", sa.Column("embedding", sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("chat_history", "embedding")
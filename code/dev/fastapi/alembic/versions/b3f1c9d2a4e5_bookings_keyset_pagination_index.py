@@ -0,0 +1,35 @@
+"""Composite index for keyset pagination of a user's bookings.
+
+Revision ID: b3f1c9d2a4e5
+Revises: 7a2c41b9d810
+Create Date: 2026-10-18 09:00:00 UTC
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "b3f1c9d2a4e5"
+down_revision = "7a2c41b9d810"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction; avoid locking bookings for writes.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_bookings_user_created_id",
+            "bookings",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_include=["status", "service_type"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_bookings_user_created_id",
+            table_name="bookings",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,39 @@
+"""Add the booking_stats_daily_global rollup and backfill it from booking_stats_daily.
+
+Revision ID: c6d9e3a1b847
+Revises: b2e8f4a7d610
+Create Date: 2026-10-18 12:00:00 UTC
+
+Global stats read this table instead of summing the per-user rollup, so the
+day index that served that aggregation is dropped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "c6d9e3a1b847"
+down_revision = "b2e8f4a7d610"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "booking_stats_daily_global",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("service_type", sa.String(20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("day", "status", "service_type"),
+    )
+    # Same aggregation as app.rollups.rebuild
+    op.execute(
+        "INSERT INTO booking_stats_daily_global (day, status, service_type, count) "
+        "SELECT day, status, service_type, sum(count) FROM booking_stats_daily GROUP BY 1, 2, 3"
+    )
+    op.drop_index("ix_booking_stats_daily_day", table_name="booking_stats_daily")
+
+
+def downgrade():
+    op.create_index("ix_booking_stats_daily_day", "booking_stats_daily", ["day"])
+    op.drop_table("booking_stats_daily_global")
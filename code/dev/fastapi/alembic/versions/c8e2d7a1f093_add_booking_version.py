@@ -0,0 +1,26 @@
+"""Add bookings.version for optimistic concurrency (If-Match).
+
+Revision ID: c8e2d7a1f093
+Revises: b3f1c9d2a4e5
+Create Date: 2026-10-18 10:00:00 UTC
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "c8e2d7a1f093"
+down_revision = "b3f1c9d2a4e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant server default lets Postgres add the column without a table rewrite.
+    op.add_column(
+        "bookings",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    op.drop_column("bookings", "version")
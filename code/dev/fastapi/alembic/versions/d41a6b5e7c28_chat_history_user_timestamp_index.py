@@ -0,0 +1,33 @@
+"""Composite index for paging a user's chat history newest-first.
+
+Revision ID: d41a6b5e7c28
+Revises: c8e2d7a1f093
+Create Date: 2026-10-18 11:00:00 UTC
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "d41a6b5e7c28"
+down_revision = "c8e2d7a1f093"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_chat_history_user_timestamp_id",
+            "chat_history",
+            ["user_id", sa.text("timestamp DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_chat_history_user_timestamp_id",
+            table_name="chat_history",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,77 @@
+"""Add bookings.end_date, a schedule index and a no-overlap exclusion constraint.
+
+Revision ID: e5f0b2c9a716
+Revises: d41a6b5e7c28
+Create Date: 2026-10-18 12:00:00 UTC
+
+Active (pending or confirmed) bookings of one user and service type may not
+overlap. The upgrade changes no booking data: if existing active bookings
+already overlap it stops and lists the conflicting ids, and an operator
+resolves them before running it again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "e5f0b2c9a716"
+down_revision = "d41a6b5e7c28"
+branch_labels = None
+depends_on = None
+
+# Keep in sync with app.scheduling.SERVICE_DURATIONS
+DURATION_MINUTES = {"consultation": 60, "delivery": 120, "meeting": 60, "project": 240}
+# Keep in sync with app.models.ACTIVE_BOOKING_STATUSES
+ACTIVE_STATUSES = "('pending', 'confirmed')"
+# How many conflicting pairs the failure message lists
+REPORT_LIMIT = 50
+
+
+class OverlappingBookings(RuntimeError):
+    """Raised when active bookings already overlap and the constraint cannot be added."""
+
+
+def check_no_overlapping_bookings():
+    """Stop the upgrade with a report if active bookings of one user and service overlap.
+
+    The migration does not change bookings; which one keeps the slot is a
+    business decision, so the conflicts are resolved by an operator (for
+    example by cancelling the later booking) before the upgrade is re-run.
+    """
+    pairs = op.get_bind().execute(sa.text(
+        "SELECT b.id, o.id FROM bookings b JOIN bookings o "
+        "ON o.user_id = b.user_id AND o.service_type = b.service_type AND o.id > b.id "
+        "AND o.scheduled_date < b.end_date AND o.end_date > b.scheduled_date "
+        f"WHERE b.status IN {ACTIVE_STATUSES} AND o.status IN {ACTIVE_STATUSES} "
+        f"ORDER BY b.id, o.id LIMIT {REPORT_LIMIT + 1}"
+    )).all()
+    if pairs:
+        listed = ", ".join(f"{first}/{second}" for first, second in pairs[:REPORT_LIMIT])
+        more = " (and more)" if len(pairs) > REPORT_LIMIT else ""
+        raise OverlappingBookings(
+            f"Active bookings overlap, resolve them before upgrading; conflicting booking ids: {listed}{more}"
+        )
+
+
+def upgrade():
+    op.add_column("bookings", sa.Column("end_date", sa.DateTime(), nullable=True))
+    cases = " ".join(
+        f"WHEN '{service}' THEN scheduled_date + INTERVAL '{minutes} minutes'"
+        for service, minutes in DURATION_MINUTES.items()
+    )
+    op.execute(f"UPDATE bookings SET end_date = CASE service_type::text {cases} END")
+    op.alter_column("bookings", "end_date", nullable=False)
+
+    op.create_index("ix_bookings_user_service_schedule", "bookings", ["user_id", "service_type", "scheduled_date"])
+    check_no_overlapping_bookings()
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        "ALTER TABLE bookings ADD CONSTRAINT excl_bookings_user_service_overlap EXCLUDE USING gist "
+        "(user_id WITH =, (service_type::text) WITH =, tsrange(scheduled_date, end_date) WITH &&) "
+        f"WHERE (status IN {ACTIVE_STATUSES})"
+    )
+
+
+def downgrade():
+    op.execute("ALTER TABLE bookings DROP CONSTRAINT IF EXISTS excl_bookings_user_service_overlap")
+    op.drop_index("ix_bookings_user_service_schedule", table_name="bookings")
+    op.drop_column("bookings", "end_date")
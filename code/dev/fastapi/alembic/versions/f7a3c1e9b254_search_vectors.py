@@ -0,0 +1,45 @@
+"""Add generated tsvector columns and GIN indexes for full-text search.
+
+Revision ID: f7a3c1e9b254
+Revises: e5f0b2c9a716
+Create Date: 2026-10-18 12:00:00 UTC
+
+Adding a STORED generated column rewrites the table under an ACCESS EXCLUSIVE
+lock; run during a quiet period on large installations. The GIN indexes are
+then built concurrently.
+"""
+from alembic import op
+
+
+revision = "f7a3c1e9b254"
+down_revision = "e5f0b2c9a716"
+branch_labels = None
+depends_on = None
+
+# Keep in sync with app.models.SEARCH_VECTOR_SOURCES
+SEARCH_VECTOR_SOURCES = {
+    "bookings": "coalesce(title, '') || ' ' || coalesce(details, '')",
+    "chat_history": "coalesce(message, '') || ' ' || coalesce(response, '')",
+}
+
+
+def upgrade():
+    for table, source in SEARCH_VECTOR_SOURCES.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('simple', {source})) STORED"
+        )
+    with op.get_context().autocommit_block():
+        for table in SEARCH_VECTOR_SOURCES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_vector "
+                f"ON {table} USING gin (search_vector)"
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in SEARCH_VECTOR_SOURCES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_vector")
+    for table in SEARCH_VECTOR_SOURCES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+from app.db import settings as db_settings
+from app.metrics import Counter, Gauge
+from app.security import PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_WORKERS
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+# How long a request may wait for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2.0"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Every class but auth ends up holding a pool connection, so default caps are
+# sized from the pool: a full set of in-flight requests waits at most about
+# one query for a connection instead of until DB_POOL_TIMEOUT.
+_POOL_CAPACITY = db_settings.pool_size + db_settings.max_overflow
+_DEFAULT_LIMITS = {
+    "read": _POOL_CAPACITY,
+    "write": max(1, _POOL_CAPACITY // 2),
+    "chat": max(1, _POOL_CAPACITY // 2),
+    # Login/register are bound by the password hashing pool, not the database
+    "auth": PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE,
+}
+
+AUTH_PATHS = frozenset({"/users/login", "/users/register"})
+EXEMPT_PATHS = frozenset({"/health", "/metrics", "/docs", "/redoc", "/openapi.json"})
+
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Requests admitted and running, by route class", ("route_class",))
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for a slot, by route class", ("route_class",))
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests shed with 503, by route class and reason", ("route_class", "reason")
+)
+
+
+def route_class(method: str, path: str) -> str:
+    if path in AUTH_PATHS:
+        return "auth"
+    if path.startswith("/chat"):
+        return "chat"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` concurrent holders, a FIFO queue of ``max_queue`` waiters.
+
+    Waiters give up after ``timeout`` seconds. A released slot is handed
+    directly to the oldest waiter, so newcomers cannot overtake the queue.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """None once admitted, otherwise the reason for rejection ("queue_full" or "timeout")."""
+        if self.in_flight < self.limit and not self._waiters:
+            self._admit()
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.inc(1, self.name)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            return "timeout"
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the client went away; pass it on
+                self.release()
+            raise
+        finally:
+            ADMISSION_QUEUED.dec(1, self.name)
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+        return None
+
+    def _admit(self):
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.inc(1, self.name)
+
+    def release(self):
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec(1, self.name)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._admit()
+                waiter.set_result(None)
+                return
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "queued": self.queued, "max_queue": self.max_queue}
+
+
+def default_limiters() -> Dict[str, ConcurrencyLimiter]:
+    limiters = {}
+    for name, default in _DEFAULT_LIMITS.items():
+        limit = int(os.getenv(f"ADMISSION_{name.upper()}_LIMIT", default))
+        max_queue = int(os.getenv(f"ADMISSION_{name.upper()}_QUEUE", 2 * limit))
+        limiters[name] = ConcurrencyLimiter(name, limit, max_queue, ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    return limiters
+
+
+route_limiters = default_limiters()
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware capping in-flight requests per route class.
+
+    Requests over the cap wait in a bounded queue; when the queue is full or
+    the wait exceeds its deadline they get an immediate 503 with Retry-After
+    instead of piling up on the connection pool. Health, metrics, docs and
+    CORS preflights are never limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiters: Optional[Dict[str, ConcurrencyLimiter]] = None,
+        exempt_paths: Sequence[str] = EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.limiters = limiters if limiters is not None else route_limiters
+        self.exempt_paths = frozenset(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class(scope["method"], scope["path"])]
+        rejected = await limiter.acquire()
+        if rejected is not None:
+            ADMISSION_REJECTED.inc(1, limiter.name, rejected)
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": "Server is busy, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a time-to-live.
+
+    Not thread-safe: it is meant to be used from a single event loop, where
+    every method runs to completion without yielding. ``on_evict(key, value)``
+    is called for entries dropped because they expired or the cache was full,
+    not for ones removed explicitly.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, timer=time.monotonic, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._on_evict = on_evict
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at <= self._timer():
+            del self._data[key]
+            self._evicted(key, value)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (value, self._timer() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted_key, (evicted_value, _) = self._data.popitem(last=False)
+            self._evicted(evicted_key, evicted_value)
+
+    def _evicted(self, key, value):
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def discard_where(self, predicate) -> int:
+        """Drop every entry whose (key, value) matches ``predicate``."""
+        stale = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+        for key in stale:
+            del self._data[key]
+        return len(stale)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+
+_MISSING = object()
@@ -1,8 +1,17 @@
-from fastapi import Depends, HTTPException, status
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.db import get_db
+from app.cache import TTLCache
+from app.db import SessionLocal, get_db
+from app.singleflight import SingleFlight, read_coalescer
+from app.ratelimit import RATE_LIMIT_TRUST_FORWARDED, rate_limiter
 from app import models, security
 import jwt
 from jwt import PyJWTError
@@ -10,34 +19,162 @@ from jwt import PyJWTError
 # Security scheme
 security_scheme = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> models.User:
-    """Get current authenticated user from JWT token"""
-    credentials_exception = HTTPException(
+# Maximum staleness of a cached principal; 0 disables the cache
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+# Comma-separated ids of the users allowed to read data across users, e.g. global booking stats
+ADMIN_USER_IDS = frozenset(int(i) for i in os.getenv("ADMIN_USER_IDS", "").split(",") if i.strip())
+
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot of the authenticated user, enough for ownership checks."""
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str] = None
+
+# Bearer token -> Principal
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_ENTRIES, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+# A burst of requests with a token not yet cached runs one lookup; principal_cache does the caching
+principal_lookups = SingleFlight(ttl=0)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def decode_token(token: str) -> dict:
+    """Decode and validate a JWT, raising 401 if it is invalid or has no subject"""
     try:
         payload = jwt.decode(
-            credentials.credentials, 
-            security.SECRET_KEY, 
+            token,
+            security.SECRET_KEY,
             algorithms=[security.ALGORITHM]
         )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except PyJWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def invalidate_principal(user_id: int = None, username: str = None) -> int:
+    """Drop cached principals for a user whose row changed"""
+    return principal_cache.discard_where(
+        lambda _, p: p.id == user_id or p.username == username
+    )
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_user_change(mapper, connection, target):
+    invalidate_principal(user_id=target.id, username=target.username)
+    read_coalescer.invalidate(target.id)
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security_scheme)
+) -> Principal:
+    """Get the authenticated principal, served from cache when possible"""
+    return await principal_for_token(credentials.credentials)
+
+async def principal_for_token(token: str) -> Principal:
+    """Resolve a bearer token to its principal; also used by WebSocket sessions"""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_token(token)
+    principal = await principal_lookups.do(token, ("principal",), lambda: _load_principal(payload["sub"]))
+    if principal is None:
+        raise _credentials_exception()
+    # Never keep a principal around longer than its token is valid
+    ttl = PRINCIPAL_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    principal_cache.set(token, principal, ttl=ttl)
+    return principal
+
+async def _load_principal(username: str) -> Optional[Principal]:
+    # Its own session: the lookup is shared, so it must not depend on any one request's
+    query = select(
+        models.User.id, models.User.username, models.User.email, models.User.full_name
+    ).where(models.User.username == username)
+    async with SessionLocal() as session:
+        row = (await session.execute(query)).one_or_none()
+    if row is None:
+        return None
+    return Principal(id=row.id, username=row.username, email=row.email, full_name=row.full_name)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> models.User:
+    """Get current authenticated user from JWT token"""
+    payload = decode_token(credentials.credentials)
+
     # Get user from database
-    query = select(models.User).where(models.User.username == username)
+    query = select(models.User).where(models.User.username == payload["sub"])
     result = await db.execute(query)
     user = result.scalar_one_or_none()
     
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    return user
+
+def is_admin(principal: Principal) -> bool:
+    return principal.id in ADMIN_USER_IDS
+
+def client_ip(connection: HTTPConnection) -> Optional[str]:
+    """Client address for per-IP limits; works for requests and WebSockets"""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = connection.headers.get("x-forwarded-for")
+        if forwarded:
+            # The last hop is the one our own proxy appended
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return connection.client.host if connection.client else None
+
+def _too_many_requests(decision) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please retry later",
+        headers=decision.headers(),
+    )
+
+async def enforce_rate_limit(request: Request, response: Response, route: str, user=None):
+    """Take a token for ``route``, raising 429 when a bucket is empty; sets RateLimit-* headers"""
+    decision = await rate_limiter.hit(route, ip=client_ip(request), user=user)
+    if decision is None:
+        return
+    if not decision.allowed:
+        raise _too_many_requests(decision)
+    response.headers.update(decision.headers())
+
+def failure_key(request: Request, identity: str) -> str:
+    """Bucket identity for failed attempts at ``identity`` from this client"""
+    return f"{client_ip(request)}|{identity}"
+
+async def check_failure_limit(route: str, key: str):
+    """Raise 429 if ``key`` has no failed attempts left on ``route``; takes nothing"""
+    decision = await rate_limiter.hit(route, user=key, cost=0)
+    if decision is not None and not decision.allowed:
+        raise _too_many_requests(decision)
+
+async def record_failure(route: str, key: str):
+    """Count one failed attempt of ``key`` against its per-user bucket on ``route``"""
+    await rate_limiter.hit(route, user=key)
+
+def rate_limit(route: str):
+    """Dependency applying the per-IP limit of ``route``"""
+    async def dependency(request: Request, response: Response):
+        await enforce_rate_limit(request, response, route)
+    return dependency
+
+def user_rate_limit(route: str):
+    """Dependency applying the per-IP and per-user limits of an authenticated ``route``"""
+    async def dependency(
+        request: Request,
+        response: Response,
+        principal: Principal = Depends(get_current_principal)
+    ):
+        await enforce_rate_limit(request, response, route, user=principal.id)
+    return dependency
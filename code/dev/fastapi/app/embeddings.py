@@ -0,0 +1,132 @@
+import math
+import os
+import re
+import zlib
+from typing import List, Optional, Sequence
+
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "128"))
+# Optional document-frequency weights fitted on chat history (see HashedEncoder.fit_idf).
+# Changing them changes every embedding, so re-encode stored rows afterwards.
+EMBEDDING_IDF_PATH = os.getenv("EMBEDDING_IDF_PATH")
+
+IDF_BUCKETS = 1 << 18
+# Each feature is added to this many signed coordinates (a sparse random projection)
+PROJECTIONS = 2
+_SEEDS = (0x9E3779B9, 0x85EBCA6B, 0xC2B2AE35, 0x27D4EB2F)[:PROJECTIONS]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# Down-weighted when no fitted IDF is available
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from have how i in is it me my of on or "
+    "please so that the this to was we what when where which who will with you your".split()
+)
+STOPWORD_WEIGHT = 0.2
+
+
+def features(text: str) -> List[str]:
+    """Word unigrams and bigrams."""
+    tokens = _TOKEN.findall(text.casefold())
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class HashedEncoder:
+    """Fixed-size text embeddings: hashed TF-IDF, randomly projected, L2-normalized.
+
+    Each unigram/bigram gets a sublinear TF x IDF weight and is added with a
+    pseudo-random sign to ``PROJECTIONS`` of the ``dim`` coordinates picked by
+    seeded crc32 hashes. That is a sparse Johnson-Lindenstrauss projection of
+    the TF-IDF vector, so cosine similarity (a dot product after
+    normalization) is approximately preserved, without storing a projection
+    matrix or any model beyond the optional IDF table.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, idf=None):
+        import numpy as np
+
+        if dim & (dim - 1):
+            raise ValueError("Embedding dimension must be a power of two")
+        self.dim = dim
+        self.idf = idf
+        if self.idf is None:
+            self.idf = np.ones(IDF_BUCKETS, dtype=np.float32)
+            for word in STOPWORDS:
+                self.idf[zlib.crc32(word.encode("utf-8")) % IDF_BUCKETS] = STOPWORD_WEIGHT
+
+    @classmethod
+    def from_env(cls) -> "HashedEncoder":
+        import numpy as np
+
+        idf = None
+        if EMBEDDING_IDF_PATH and os.path.exists(EMBEDDING_IDF_PATH):
+            idf = np.load(EMBEDDING_IDF_PATH)
+        return cls(EMBEDDING_DIM, idf)
+
+    def fit_idf(self, texts: Sequence[str]):
+        """Smoothed IDF over hashed features: log((1 + n) / (1 + df)) + 1."""
+        import numpy as np
+
+        df = np.zeros(IDF_BUCKETS, dtype=np.int64)
+        for text in texts:
+            buckets = {zlib.crc32(f.encode("utf-8")) % IDF_BUCKETS for f in features(text)}
+            df[list(buckets)] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def _coordinates(self, text: str):
+        """(coordinate, signed weight) pairs for one text."""
+        counts = {}
+        for feature in features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        coords, weights = [], []
+        mask = self.dim - 1
+        for feature, count in counts.items():
+            data = feature.encode("utf-8")
+            weight = (1.0 + math.log(count)) * float(self.idf[zlib.crc32(data) % IDF_BUCKETS])
+            for seed in _SEEDS:
+                h = zlib.crc32(data, seed)
+                coords.append(h & mask)
+                weights.append(weight if h & 0x80000000 else -weight)
+        return coords, weights
+
+    def encode(self, text: str):
+        """One float32 vector of length ``dim`` with unit norm (all zeros for empty text)."""
+        return self.encode_many([text])[0]
+
+    def encode_many(self, texts: Sequence[str]):
+        """An (n, dim) float32 matrix, one unit-norm row per text."""
+        import numpy as np
+
+        rows, coords, weights = [], [], []
+        for i, text in enumerate(texts):
+            c, w = self._coordinates(text)
+            rows.extend([i] * len(c))
+            coords.extend(c)
+            weights.extend(w)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(out, (rows, coords), np.asarray(weights, dtype=np.float32))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def to_bytes(vector) -> bytes:
+    """Compact storage form: raw little-endian float32."""
+    import numpy as np
+
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(data: Optional[bytes]):
+    import numpy as np
+
+    return None if data is None else np.frombuffer(data, dtype="<f4")
+
+
+_encoder: Optional[HashedEncoder] = None
+
+
+def get_encoder() -> HashedEncoder:
+    global _encoder
+    if _encoder is None:
+        _encoder = HashedEncoder.from_env()
+    return _encoder
@@ -0,0 +1,86 @@
+import csv
+import enum
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime, timezone
+from typing import Optional
+from fastapi.responses import StreamingResponse
+from app.db import SessionLocal
+from app.scheduling import as_naive_utc
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+def _as_column_utc(column, value: datetime) -> datetime:
+    """UTC in the form the column stores: naive for TIMESTAMP, aware for TIMESTAMPTZ"""
+    value = as_naive_utc(value)
+    return value.replace(tzinfo=timezone.utc) if column.type.timezone else value
+
+def time_range(column, start: Optional[datetime], end: Optional[datetime]) -> list:
+    """Conditions for start <= column < end; either bound may be omitted, naive bounds are UTC"""
+    conditions = []
+    if start:
+        conditions.append(column >= _as_column_utc(column, start))
+    if end:
+        conditions.append(column < _as_column_utc(column, end))
+    return conditions
+
+async def _partitions(stmt):
+    """Yield lists of rows from a server-side cursor, one batch at a time.
+
+    The export opens its own session: the request-scoped one from get_db may
+    be closed before a streaming body has finished sending.
+    """
+    async with SessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield partition
+
+async def _ndjson_chunks(stmt):
+    async for partition in _partitions(stmt):
+        yield "".join(
+            json.dumps({key: _plain(value) for key, value in row._mapping.items()}) + "\n"
+            for row in partition
+        )
+
+async def _csv_chunks(stmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in stmt.selected_columns])
+    async for partition in _partitions(stmt):
+        writer.writerows([_plain(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def _encode(chunks, compress: bool):
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        data = chunk.encode()
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+def export_response(stmt, fmt: str, compress: bool, filename: str) -> StreamingResponse:
+    """Stream the rows of ``stmt`` as NDJSON or CSV in constant memory"""
+    chunks = _csv_chunks(stmt) if fmt == "csv" else _ndjson_chunks(stmt)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(_encode(chunks, compress), media_type=MEDIA_TYPES[fmt], headers=headers)
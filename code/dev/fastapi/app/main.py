@@ -1,11 +1,29 @@
-import uvicorn
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from app.routers import users, bookings, chat
-from app.db import Base, engine, get_db
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routers import users, bookings, chat, search
+from app.db import engine, get_db, pool_metrics, pool_stats
+from app.metrics import Counter, Gauge, MetricsMiddleware, instrument_engine, loop_lag_monitor, render_metrics
+from app import profiling
+from app.admission import ADMISSION_CONTROL, AdmissionMiddleware, route_limiters
+from app.sentiment import sentiment_backend
+from app.writebehind import chat_history_writer
+from app.rollups import booking_stats_refresher
+from app.vector_index import chat_vector_index
+from app.streaming import stream_connections
+from app.singleflight import read_coalescer
+from app.ratelimit import rate_limiter
+from app.responses import FastJSONResponse
+from app import security
+from app.startup import STARTUP_SCHEMA_MODE, StartupTimer, prepare_schema
 from contextlib import asynccontextmanager
 from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import asyncio
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
@@ -13,30 +31,74 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+HEALTH_DB_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "1.0"))
+STARTUP_SECONDS = Gauge("startup_phase_seconds", "Worker startup time by phase", ("phase",))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    timer = StartupTimer()
+    timer.phases["imports"] = IMPORT_SECONDS
     try:
         async with engine.begin() as conn:
             # Test connection first
-            await conn.execute(text("SELECT 1"))
+            with timer.phase("db_connect"):
+                await conn.execute(text("SELECT 1"))
             logger.info("Database connection verified")
             
-            # Create tables
-            await conn.run_sync(Base.metadata.create_all)
-            logger.info("Database tables created successfully")
+            with timer.phase(f"schema_{STARTUP_SCHEMA_MODE}"):
+                await prepare_schema(conn)
             
     except Exception as e:
         logger.error(f"Database startup error: {e}", exc_info=True)
         raise
+
+    with timer.phase(f"sentiment_{sentiment_backend.name}"):
+        await sentiment_backend.start()
+    with timer.phase("chat_vector_index"):
+        await chat_vector_index.start()
+    with timer.phase("background_tasks"):
+        chat_history_writer.start()
+        loop_lag_monitor.start()
+        booking_stats_refresher.start()
+    for phase, seconds in timer.phases.items():
+        STARTUP_SECONDS.set(seconds, phase)
+    logger.info(f"Startup complete: {timer.report()}")
     
     yield  # App runs here
     
     # Shutdown
+    await booking_stats_refresher.stop()
+    await loop_lag_monitor.stop()
+    await chat_history_writer.stop()
+    await chat_vector_index.stop()
+    await sentiment_backend.aclose()
+    rate_limiter.close()
+    security.hash_executor.shutdown()
     await engine.dispose()
     logger.info("Database engine disposed")
 
-app = FastAPI(lifespan=lifespan,title="CService Booking Backend")
+app = FastAPI(lifespan=lifespan,title="CService Booking Backend", default_response_class=FastJSONResponse)
+
+# Metrics: per-route latency, DB usage per request, pool and queue gauges
+instrument_engine(engine.sync_engine)
+Gauge("db_pool_connections_in_use", "Pool connections currently checked out", fn=lambda: pool_stats.in_use)
+Counter("db_pool_checkouts_total", "Pool checkouts since start", fn=lambda: pool_stats.checkouts)
+Counter("db_pool_timeouts_total", "Pool checkouts that timed out since start", fn=lambda: pool_stats.timeouts)
+# The db_pool_checkout_wait_seconds histogram is recorded by app/db.py
+Gauge("db_pool_checkout_wait_max_seconds", "Longest wait for a pool connection", fn=lambda: pool_stats.wait_seconds_max)
+Gauge("chat_write_behind_depth", "Chat history rows waiting to be flushed", fn=lambda: chat_history_writer.depth)
+Gauge("chat_write_behind_flush_seconds", "Duration of the last chat history flush",
+      fn=lambda: chat_history_writer.counters["last_flush_seconds"])
+Counter("chat_write_behind_dropped_total", "Chat history rows dropped after failed flushes",
+        fn=lambda: chat_history_writer.counters["dropped"])
+Gauge("chat_write_behind_held", "Chat history rows held for retry after a failed flush",
+      fn=lambda: chat_history_writer.held)
+
+# Load shedding; added before CORS so that it runs inside it and 503s carry CORS headers
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware)
 
 # Enhanced CORS configuration
 app.add_middleware(
@@ -52,8 +114,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Let the SPA read validators for conditional polling, the history cursor and its rate limits
+    expose_headers=[
+        "ETag", "Last-Modified", "X-Next-Cursor", "Retry-After",
+        "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy",
+    ],
 )
 
+app.add_middleware(MetricsMiddleware)
+
+if profiling.SQL_PROFILE:
+    profiling.instrument_engine(engine.sync_engine)
+    app.add_middleware(profiling.SQLProfilerMiddleware)
+    logger.warning("SQL profiling enabled: every statement is recorded per request")
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logging.error(f"Global exception handler caught: {exc}", exc_info=True)
@@ -67,29 +141,60 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
+@app.exception_handler(security.HashingSaturated)
+async def hashing_saturated_handler(request: Request, exc: security.HashingSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # No connection freed up within DB_POOL_TIMEOUT: the database is saturated, not broken
+    logger.warning(f"Database pool checkout timed out on {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(bookings.router, prefix="/bookings", tags=["bookings"])
-app.include_router(chat.router, prefix="/", tags=["chat"])
+app.include_router(chat.router, tags=["chat"])
+app.include_router(search.router, prefix="/search", tags=["search"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health_check(db: AsyncSession = Depends(get_db)):
     try:
         # Test database connection
-        result = await db.execute(text("SELECT version()"))
+        # Bounded, so a saturated pool reports unhealthy instead of hanging the probe
+        result = await asyncio.wait_for(db.execute(text("SELECT version()")), HEALTH_DB_TIMEOUT_SECONDS)
         db_version = result.scalar()
         
         return {
             "status": "healthy",
             "database": "connected",
             "postgresql_version": db_version,
+            "pool": pool_metrics(),
+            "chat_write_behind": chat_history_writer.stats(),
+            "chat_vector_index": len(chat_vector_index.index) if chat_vector_index.ready else None,
+            "admission": {name: limiter.stats() for name, limiter in route_limiters.items()},
+            "chat_streams": stream_connections.stats(),
+            "read_coalescing": read_coalescer.stats(),
             "timestamp": "2025-08-10 11:21:40"
         }
     except Exception as e:
         return {
             "status": "unhealthy",
             "database": "disconnected",
-            "error": str(e)
+            "error": str(e) or repr(e)
         }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
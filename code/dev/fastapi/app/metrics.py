@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, tuned for an API whose typical request takes a few ms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _format_labels(labelnames: Sequence[str], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter, either incremented directly or read from a callback at scrape time.
+
+    Label values are passed positionally for speed.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=(), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+        self._fn = fn
+
+    def inc(self, amount: float = 1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        if self._fn is not None:
+            try:
+                yield "", (), "", self._fn()
+            except Exception as e:
+                logger.warning(f"Counter {self.name} callback failed: {e!r}")
+            return
+        for labels, value in sorted(self._values.items()):
+            yield "", labels, "", value
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set directly or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+        self._fn = fn
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def samples(self):
+        if self._fn is not None:
+            try:
+                yield "", (), "", self._fn()
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e!r}")
+            return
+        for labels, value in sorted(self._values.items()):
+            yield "", labels, "", value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution; bucket counts are cumulated only when rendered."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            # [per-bucket counts..., +Inf count, sum]
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                yield "_bucket", labels, f'le="{_format_value(float(bound))}"', cumulative
+            yield "_sum", labels, "", series[-1]
+            yield "_count", labels, "", cumulative
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition (format 0.0.4) of every registered metric."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed, by route template", ("route",))
+DB_SECONDS = Counter("db_query_seconds_total", "Time spent in SQL statements, by route template", ("route",))
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements per HTTP request", ("route",), buckets=(0, 1, 2, 3, 5, 10, 25, 50)
+)
+LOOP_LAG = Gauge("event_loop_lag_seconds", "Most recent event loop scheduling delay")
+LOOP_LAG_HISTOGRAM = Histogram("event_loop_lag_distribution_seconds", "Event loop scheduling delay")
+
+# [query count, seconds in queries] for the request being served
+_request_db = ContextVar("request_db", default=None)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and DB usage per route template.
+
+    It is a plain ASGI callable rather than a BaseHTTPMiddleware so that it adds no
+    extra task or body buffering to each request.
+    """
+
+    def __init__(self, app, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        db_usage = [0, 0.0]
+        token = _request_db.set(db_usage)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            _request_db.reset(token)
+            route = route_template(scope)
+            method = scope["method"]
+            REQUEST_DURATION.observe(elapsed, method, route)
+            REQUESTS.inc(1, method, route, status_code)
+            DB_QUERIES_PER_REQUEST.observe(db_usage[0], route)
+            if db_usage[0]:
+                DB_QUERIES.inc(db_usage[0], route)
+                DB_SECONDS.inc(db_usage[1], route)
+
+
+def instrument_engine(engine):
+    """Count statements and time spent in them for the request being served."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        usage = _request_db.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+
+class LoopLagMonitor:
+    """Background task measuring how late the event loop wakes up a sleeping task."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG.set(lag)
+            LOOP_LAG_HISTOGRAM.observe(lag)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
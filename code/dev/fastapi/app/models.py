@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum as SAEnum, func
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, LargeBinary, ForeignKey, Index, DDL, event, Enum as SAEnum, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -11,6 +11,14 @@ class ChatHistory(Base):
     message = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Message embedding as raw float32 bytes (app/embeddings.py); NULL for rows stored before embeddings
+    embedding = Column(LargeBinary, nullable=True)
+
+# Serves a user's history newest-first with (timestamp, id) keyset paging
+Index(
+    "ix_chat_history_user_timestamp_id",
+    ChatHistory.user_id, ChatHistory.timestamp.desc(), ChatHistory.id.desc(),
+)
 
 class BookingStatus(enum.Enum):
     pending = "pending"
@@ -18,6 +26,9 @@ class BookingStatus(enum.Enum):
     cancelled = "cancelled"
     completed = "completed"
 
+# Statuses that hold a booking's time slot; cancelled and completed ones free it
+ACTIVE_BOOKING_STATUSES = (BookingStatus.pending.value, BookingStatus.confirmed.value)
+
 class ServiceType(enum.Enum):
     consultation = "consultation"
     delivery = "delivery"
@@ -48,13 +59,93 @@ class Booking(Base):
     title = Column(String(255), nullable=True)
     details = Column(Text, nullable=False, default="")
     scheduled_date = Column(DateTime, nullable=False)
+    # scheduled_date + the service type's duration (see app/scheduling.py)
+    end_date = Column(DateTime, nullable=False)
 
     status = Column(
         SAEnum(BookingStatus, name="bookingstatus", native_enum=True),
         nullable=False,
         default=BookingStatus.pending
     )
+    # Bumped on every write; used for If-Match optimistic concurrency
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
-    user = relationship("User", back_populates="bookings")
\ No newline at end of file
+    user = relationship("User", back_populates="bookings")
+
+# Serves keyset pagination of a user's bookings ordered by (created_at, id)
+Index(
+    "ix_bookings_user_created_id",
+    Booking.user_id, Booking.created_at.desc(), Booking.id.desc(),
+    postgresql_include=["status", "service_type"],
+)
+
+# Range lookups for conflict checks and availability:
+# user_id = ? AND service_type = ? AND scheduled_date in a window
+Index("ix_bookings_user_service_schedule", Booking.user_id, Booking.service_type, Booking.scheduled_date)
+
+# On Postgres the database itself rejects overlapping active bookings of one user and service type.
+# Other dialects (SQLite in tests) rely on the application-level check only.
+BOOKING_OVERLAP_CONSTRAINT = "excl_bookings_user_service_overlap"
+event.listen(
+    Booking.__table__, "after_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Booking.__table__, "after_create",
+    DDL(
+        f"ALTER TABLE bookings ADD CONSTRAINT {BOOKING_OVERLAP_CONSTRAINT} EXCLUDE USING gist "
+        "(user_id WITH =, (service_type::text) WITH =, tsrange(scheduled_date, end_date) WITH &&) "
+        "WHERE (status IN ('pending', 'confirmed'))"
+    ).execute_if(dialect="postgresql"),
+)
+
+# Full-text search (app/routers/search.py). Generated tsvector columns with GIN indexes
+# exist on Postgres only and are deliberately not mapped; other dialects use the
+# in-memory index in app/search_index.py.
+SEARCH_VECTOR_SOURCES = {
+    "bookings": "coalesce(title, '') || ' ' || coalesce(details, '')",
+    "chat_history": "coalesce(message, '') || ' ' || coalesce(response, '')",
+}
+for _table in (Booking.__table__, ChatHistory.__table__):
+    event.listen(
+        _table, "after_create",
+        DDL(
+            f"ALTER TABLE {_table.name} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+            f"(to_tsvector('simple', {SEARCH_VECTOR_SOURCES[_table.name]})) STORED"
+        ).execute_if(dialect="postgresql"),
+    )
+    event.listen(
+        _table, "after_create",
+        DDL(
+            f"CREATE INDEX ix_{_table.name}_search_vector ON {_table.name} USING gin (search_vector)"
+        ).execute_if(dialect="postgresql"),
+    )
+
+class BookingStatsDaily(Base):
+    """Booking counts per user, creation day (UTC), status and service type.
+
+    Maintained incrementally by the booking write paths (app/rollups.py) so
+    dashboards read O(buckets) rows instead of scanning bookings.
+    """
+    __tablename__ = "booking_stats_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    service_type = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+class BookingStatsDailyGlobal(Base):
+    """BookingStatsDaily summed over users, maintained alongside it.
+
+    Global stats read one row per day, status and service type here, however
+    many users booked that day.
+    """
+    __tablename__ = "booking_stats_daily_global"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    service_type = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
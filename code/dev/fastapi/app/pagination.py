@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(*values) -> str:
+    """Pack keyset values into an opaque, URL-safe cursor string."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return values
+
+
+def decode_timestamp_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a ``(timestamp, id)`` cursor produced by ``encode_cursor``."""
+    values = decode_cursor(cursor)
+    try:
+        timestamp, row_id = values
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: meant for development and canary instances, not the whole fleet
+SQL_PROFILE = os.getenv("SQL_PROFILE", "false").lower() in ("1", "true", "yes")
+# Identical statements per request at or above this count are reported as a likely N+1
+SQL_PROFILE_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "3"))
+# When set, every profiled request is written here as a Chrome/speedscope trace
+SQL_PROFILE_DUMP_DIR = os.getenv("SQL_PROFILE_DUMP_DIR")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by ``query_budget`` when a block issues more statements than allowed."""
+
+
+class RequestProfile:
+    """Statements executed while serving one request (or one ``capture_queries`` block)."""
+
+    def __init__(self, name: str, parent: Optional["RequestProfile"] = None):
+        self.name = name
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        # (statement, offset from start in seconds, duration in seconds)
+        self.queries = []
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(duration for _, _, duration in self.queries)
+
+    def record(self, statement: str, started: float, duration: float):
+        profile = self
+        while profile is not None:
+            profile.queries.append((statement, started - profile.started, duration))
+            profile = profile.parent
+
+    def repeated(self, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD) -> dict:
+        counts = Counter(statement for statement, _, _ in self.queries)
+        return {statement: n for statement, n in counts.items() if n >= threshold}
+
+    def server_timing(self) -> str:
+        total = ((self.finished or time.perf_counter()) - self.started) * 1000
+        return f'db;dur={self.db_seconds * 1000:.2f};desc="{self.count} queries", total;dur={total:.2f}'
+
+    def trace(self) -> dict:
+        """Chrome trace-event JSON, loadable in chrome://tracing, Perfetto or speedscope."""
+        end = (self.finished or time.perf_counter()) - self.started
+        events = [{"name": self.name, "ph": "X", "ts": 0, "dur": end * 1e6, "pid": 1, "tid": 1}]
+        for statement, offset, duration in self.queries:
+            events.append({
+                "name": statement.split(None, 1)[0].upper() if statement else "SQL",
+                "cat": "sql",
+                "ph": "X",
+                "ts": offset * 1e6,
+                "dur": duration * 1e6,
+                "pid": 1,
+                "tid": 1,
+                "args": {"statement": statement},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+def instrument_engine(engine):
+    """Record every statement into the active profile, if any."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["sql_profile_started"].pop()
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(statement, started, time.perf_counter() - started)
+
+
+@contextmanager
+def capture_queries(name: str = "capture"):
+    """Collect the statements issued inside the block, e.g. around a test client call."""
+    profile = RequestProfile(name, parent=_current_profile.get())
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        profile.finished = time.perf_counter()
+        _current_profile.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, name: str = "query budget"):
+    """Fail if the block issues more than ``max_queries`` statements.
+
+        with query_budget(2):
+            client.get("/bookings/1", headers=auth)
+    """
+    with capture_queries(name) as profile:
+        yield profile
+    if profile.count > max_queries:
+        statements = "\n".join(f"  {statement}" for statement, _, _ in profile.queries)
+        raise QueryBudgetExceeded(f"{name}: {profile.count} queries, budget {max_queries}\n{statements}")
+
+
+class SQLProfilerMiddleware:
+    """Profiles SQL per request: Server-Timing header, N+1 warnings, optional trace dumps."""
+
+    def __init__(self, app, dump_dir: Optional[str] = SQL_PROFILE_DUMP_DIR,
+                 repeat_threshold: int = SQL_PROFILE_REPEAT_THRESHOLD):
+        self.app = app
+        self.dump_dir = Path(dump_dir) if dump_dir else None
+        self.repeat_threshold = repeat_threshold
+        if self.dump_dir is not None:
+            self.dump_dir.mkdir(parents=True, exist_ok=True)
+        self._seq = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(f'{scope["method"]} {scope["path"]}', parent=_current_profile.get())
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.finished = time.perf_counter()
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", profile.server_timing().encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            if profile.finished is None:
+                profile.finished = time.perf_counter()
+            self._report(scope, profile)
+
+    def _report(self, scope, profile: RequestProfile):
+        route = getattr(scope.get("route"), "path", scope["path"])
+        for statement, count in profile.repeated(self.repeat_threshold).items():
+            logger.warning(f"Possible N+1 in {scope['method']} {route}: statement ran {count} times: {statement}")
+        if self.dump_dir is not None:
+            self._seq += 1
+            path = self.dump_dir / f"{int(time.time() * 1000)}-{self._seq}.json"
+            path.write_text(json.dumps(profile.trace()))
@@ -0,0 +1,252 @@
+import logging
+import math
+import os
+import sqlite3
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app.cache import TTLCache
+from app.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITING = os.getenv("RATE_LIMITING", "true").lower() in ("1", "true", "yes")
+# "memory" keeps buckets per worker; "sqlite" shares them between the workers on one host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.db")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Behind a reverse proxy, limit on the address it appended to X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+# "<requests>/<seconds>": the bucket size and how long an empty bucket takes to refill.
+# Override per route and scope with RATE_LIMIT_<ROUTE>_<SCOPE>; "0" disables a rule.
+_DEFAULT_RULES = {
+    ("login", "ip"): "30/60",
+    # Failed attempts only, per (IP, username)
+    ("login", "user"): "10/60",
+    ("register", "ip"): "10/600",
+    ("chat", "ip"): "120/60",
+    ("chat", "user"): "60/60",
+}
+
+RATE_LIMITED = Counter("rate_limited_total", "Requests refused with 429, by route and scope", ("route", "scope"))
+RATE_LIMIT_ERRORS = Counter("rate_limit_backend_errors_total", "Rate limit checks skipped after a backend error")
+
+
+class Rule(NamedTuple):
+    limit: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return self.limit / self.period
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["Rule"]:
+        limit, _, period = spec.partition("/")
+        rule = cls(int(limit), float(period or 1))
+        if rule.limit <= 0:
+            return None
+        if rule.period <= 0:
+            raise ValueError(f"Invalid rate limit {spec!r}: the period must be positive")
+        return rule
+
+
+def default_rules() -> Dict[Tuple[str, str], Rule]:
+    rules = {}
+    for (route, scope), default in _DEFAULT_RULES.items():
+        rule = Rule.parse(os.getenv(f"RATE_LIMIT_{route.upper()}_{scope.upper()}", default))
+        if rule is not None:
+            rules[route, scope] = rule
+    return rules
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    rule: Rule
+    tokens: float
+    scope: str
+
+    @property
+    def remaining(self) -> int:
+        return max(0, int(self.tokens))
+
+    @property
+    def retry_after(self) -> int:
+        """Whole seconds until one token is available; 0 when allowed."""
+        if self.allowed:
+            return 0
+        return max(1, math.ceil((1 - self.tokens) / self.rule.rate))
+
+    def headers(self) -> Dict[str, str]:
+        """RateLimit-* fields as in the IETF httpapi draft, plus Retry-After on refusal."""
+        headers = {
+            "RateLimit-Limit": str(self.rule.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            # Seconds until the bucket is full again
+            "RateLimit-Reset": str(math.ceil((self.rule.limit - self.tokens) / self.rule.rate)),
+            "RateLimit-Policy": f"{self.rule.limit};w={self.rule.period:g}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+class MemoryBackend:
+    """Token buckets owned by the event loop.
+
+    ``take`` never awaits, so the read-refill-write of a bucket cannot
+    interleave with another request and no lock is needed. A bucket left
+    alone long enough to be full again expires, which is the same as never
+    having been used, so idle keys do not accumulate.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, timer=time.monotonic):
+        self._timer = timer
+        self._buckets = TTLCache(maxsize=max_keys)
+
+    async def take(self, key: str, rule: Rule, cost: float = 1.0) -> Tuple[bool, float]:
+        """(allowed, tokens left); a refused request takes nothing."""
+        now = self._timer()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(rule.limit)
+        else:
+            tokens = min(rule.limit, bucket[0] + (now - bucket[1]) * rule.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets.set(key, (tokens, now), ttl=(rule.limit - tokens) / rule.rate)
+        return allowed, tokens
+
+    def close(self):
+        self._buckets.clear()
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    allowed INTEGER NOT NULL,
+    expires REAL NOT NULL
+)
+"""
+
+# One atomic statement per check; SET expressions all see the row as it was
+_SQLITE_TAKE = """
+INSERT INTO rate_limit_buckets (key, tokens, updated, allowed, expires)
+VALUES (:key, :limit - :cost, :now, :limit >= :cost, :now + :cost / :rate)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = min(:limit, tokens + (:now - updated) * :rate)
+        - CASE WHEN min(:limit, tokens + (:now - updated) * :rate) >= :cost THEN :cost ELSE 0 END,
+    allowed = min(:limit, tokens + (:now - updated) * :rate) >= :cost,
+    updated = :now,
+    expires = :now + (:limit - min(:limit, tokens + (:now - updated) * :rate)
+        + CASE WHEN min(:limit, tokens + (:now - updated) * :rate) >= :cost THEN :cost ELSE 0 END) / :rate
+RETURNING allowed, tokens
+"""
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite file, shared by every worker on the host.
+
+    Each check is a single UPSERT ... RETURNING in autocommit mode, so
+    workers never see a half-applied update. It stands in for a networked
+    store such as Redis, which would implement the same ``take``. Calls run
+    inline: a local WAL-mode write takes tens of microseconds, less than
+    handing it to a thread would. There is no busy timeout, so a call never
+    blocks the event loop waiting on another worker's write: SQLITE_BUSY
+    raises at once and RateLimiter lets the request through. Full buckets
+    are pruned now and then.
+    """
+
+    PRUNE_EVERY = 10_000
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, busy_timeout: float = 0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._calls = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Counters, not records: losing the last writes in a power cut is fine
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(_SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def take(self, key: str, rule: Rule, cost: float = 1.0) -> Tuple[bool, float]:
+        conn = self._connection()
+        now = time.time()
+        allowed, tokens = conn.execute(
+            _SQLITE_TAKE, {"key": key, "limit": rule.limit, "rate": rule.rate, "cost": cost, "now": now}
+        ).fetchone()
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM rate_limit_buckets WHERE expires < ?", (now,))
+        return bool(allowed), tokens
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def make_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}, expected memory or sqlite")
+
+
+class RateLimiter:
+    """Per-route token buckets, keyed on client IP and on user.
+
+    A route may have a rule for either scope or both; a request is refused
+    as soon as one of its buckets is empty. Backend failures let the
+    request through rather than taking the endpoint down with them.
+    """
+
+    def __init__(self, backend, rules: Dict[Tuple[str, str], Rule], enabled: bool = RATE_LIMITING):
+        self.backend = backend
+        self.rules = rules
+        self.enabled = enabled
+
+    async def hit(self, route: str, ip: Optional[str] = None, user=None, cost: float = 1.0) -> Optional[Decision]:
+        """The decision with the fewest tokens left, or None if no rule applies.
+
+        With ``cost=0`` nothing is taken and only an already empty bucket refuses.
+        """
+        if not self.enabled:
+            return None
+        decision = None
+        for scope, identity in (("ip", ip), ("user", user)):
+            rule = self.rules.get((route, scope))
+            if rule is None or identity is None:
+                continue
+            try:
+                allowed, tokens = await self.backend.take(f"{route}:{scope}:{identity}", rule, cost)
+                if not cost:
+                    allowed = tokens >= 1
+            except Exception as e:
+                RATE_LIMIT_ERRORS.inc(1)
+                logger.warning(f"Rate limit check for {route}/{scope} failed: {e!r}")
+                continue
+            if not allowed:
+                RATE_LIMITED.inc(1, route, scope)
+                return Decision(False, rule, tokens, scope)
+            if decision is None or tokens / rule.limit < decision.tokens / decision.rule.limit:
+                decision = Decision(True, rule, tokens, scope)
+        return decision
+
+    def close(self):
+        self.backend.close()
+
+
+rate_limiter = RateLimiter(make_backend(), default_rules())
@@ -0,0 +1,64 @@
+from typing import Any, Iterable, List, Optional, Type
+
+import pydantic_core
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic_core produces the same output, a little slower
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes in the same shape Pydantic's JSON mode produces.
+
+    UTC datetimes end in ``Z``, enums become their values and microseconds
+    are only written when non-zero, so plain dicts of row values serialize
+    exactly like the corresponding response models.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return pydantic_core.to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson (or pydantic_core) instead of json.dumps."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_columns(model: Type[BaseModel], table) -> tuple:
+    """Table columns named like the model's fields, in field order.
+
+    Selecting these gives rows that ``rows_payload`` can emit without
+    building ORM objects or validating each row through the model.
+    """
+    return tuple(table.c[name] for name in model.model_fields)
+
+
+def rows_payload(rows: Iterable) -> List[dict]:
+    return [dict(row._mapping) for row in rows]
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """Return pre-shaped content directly, bypassing response_model validation.
+
+    The route keeps its ``response_model`` so the OpenAPI schema is
+    unchanged. Headers set on the injected ``response`` are carried over,
+    as FastAPI does for responses it builds itself.
+    """
+    result = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
+
+
+def json_bytes_response(body: bytes, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """Like ``json_response`` for a body that is already serialized, e.g. one shared by coalesced reads."""
+    result = Response(body, status_code=status_code, media_type="application/json")
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, String, cast, delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Seconds between full rollup rebuilds; 0 disables the job and relies on the
+# incremental updates alone
+BOOKING_STATS_REFRESH_SECONDS = float(os.getenv("BOOKING_STATS_REFRESH_SECONDS", "0"))
+BOOKING_STATS_MAX_DAYS = int(os.getenv("BOOKING_STATS_MAX_DAYS", "731"))
+
+# (user_id, day, status, service_type)
+StatsKey = Tuple[int, date, str, str]
+
+_stats = models.BookingStatsDaily.__table__
+_global_stats = models.BookingStatsDailyGlobal.__table__
+
+
+def _value(value) -> str:
+    return getattr(value, "value", value)
+
+
+def utc_day(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def stats_key(row) -> StatsKey:
+    """Rollup key for a booking row or RETURNING result."""
+    return (row.user_id, utc_day(row.created_at), _value(row.status), _value(row.service_type))
+
+
+def booking_deltas(added: Iterable = (), removed: Iterable = ()) -> Counter:
+    deltas = Counter()
+    for row in added:
+        deltas[stats_key(row)] += 1
+    for row in removed:
+        deltas[stats_key(row)] -= 1
+    return deltas
+
+
+def _upsert(dialect: str, table):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"No rollup upsert for dialect {dialect!r}")
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+
+
+async def apply_deltas(db: AsyncSession, deltas: Counter):
+    """Add count deltas to the per-user and global rollups inside the caller's transaction.
+
+    Keys are unique within one statement (Postgres rejects an ON CONFLICT
+    statement touching the same row twice), and each row is an atomic
+    increment, so concurrent writers do not lose updates. Rows go in key
+    order so writers lock shared global rows in the same order.
+    """
+    global_deltas = Counter()
+    for (_, day, status, service_type), delta in deltas.items():
+        global_deltas[day, status, service_type] += delta
+    rows = [
+        dict(user_id=user_id, day=day, status=status, service_type=service_type, count=delta)
+        for (user_id, day, status, service_type), delta in sorted(deltas.items())
+        if delta
+    ]
+    global_rows = [
+        dict(day=day, status=status, service_type=service_type, count=delta)
+        for (day, status, service_type), delta in sorted(global_deltas.items())
+        if delta
+    ]
+    dialect = db.bind.dialect.name
+    if rows:
+        await db.execute(_upsert(dialect, _stats), rows)
+    if global_rows:
+        await db.execute(_upsert(dialect, _global_stats), global_rows)
+
+
+def _day_expression(dialect: str):
+    if dialect == "postgresql":
+        return cast(func.timezone("UTC", models.Booking.created_at), Date)
+    return func.date(models.Booking.created_at)
+
+
+async def rebuild(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Recompute the rollup from bookings (all users, or one). Returns rows written.
+
+    The global rollup is then recomputed from the per-user one, which is far
+    smaller than bookings. Used to backfill, to repair drift, and by the
+    periodic refresh job. Runs in the caller's transaction; the caller commits.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        # Writers that already incremented commit first and are counted below; later
+        # ones wait and increment on top of the rebuilt rows
+        await db.execute(text("LOCK TABLE booking_stats_daily, booking_stats_daily_global IN EXCLUSIVE MODE"))
+    day = _day_expression(dialect)
+    status = cast(models.Booking.status, String)
+    service_type = cast(models.Booking.service_type, String)
+    source = select(
+        models.Booking.user_id, day, status, service_type, func.count()
+    ).group_by(models.Booking.user_id, day, status, service_type)
+    clear = delete(_stats)
+    if user_id is not None:
+        source = source.where(models.Booking.user_id == user_id)
+        clear = clear.where(_stats.c.user_id == user_id)
+
+    await db.execute(clear)
+    result = await db.execute(
+        insert(_stats).from_select(["user_id", "day", "status", "service_type", "count"], source)
+    )
+
+    await db.execute(delete(_global_stats))
+    await db.execute(
+        insert(_global_stats).from_select(
+            ["day", "status", "service_type", "count"],
+            select(_stats.c.day, _stats.c.status, _stats.c.service_type, func.sum(_stats.c.count))
+            .group_by(_stats.c.day, _stats.c.status, _stats.c.service_type),
+        )
+    )
+    return result.rowcount
+
+
+async def daily_counts(
+    db: AsyncSession, start: date, end: date, user_id: Optional[int] = None
+) -> List[Tuple[date, str, str, int]]:
+    """(day, status, service_type, count) for days in [start, end), for one user or, without user_id, all of them."""
+    if user_id is None:
+        table = _global_stats
+        query = select(table.c.day, table.c.status, table.c.service_type, table.c.count)
+    else:
+        table = _stats
+        query = select(table.c.day, table.c.status, table.c.service_type, table.c.count).where(table.c.user_id == user_id)
+    query = query.where(table.c.day >= start, table.c.day < end)
+    return [(row.day, row.status, row.service_type, int(row.count)) for row in await db.execute(query)]
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_counts(rows, bucket: str) -> Dict[date, Dict[str, Counter]]:
+    """Group daily rows into {bucket start: {"status": Counter, "service_type": Counter}}."""
+    buckets = {}
+    for day, status, service_type, count in rows:
+        if not count:
+            continue
+        entry = buckets.setdefault(bucket_start(day, bucket), {"status": Counter(), "service_type": Counter()})
+        entry["status"][status] += count
+        entry["service_type"][service_type] += count
+    return dict(sorted(buckets.items()))
+
+
+class RollupRefresher:
+    """Periodically rebuilds the booking rollup to correct any drift."""
+
+    def __init__(self, session_factory, interval: float = BOOKING_STATS_REFRESH_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="booking-stats-refresh")
+
+    async def refresh(self) -> int:
+        async with self.session_factory() as session:
+            written = await rebuild(session)
+            await session.commit()
+        return written
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                written = await self.refresh()
+                logger.info(f"Rebuilt booking stats rollup ({written} rows)")
+            except Exception as e:
+                logger.error(f"Booking stats refresh failed: {e!r}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+booking_stats_refresher = RollupRefresher(SessionLocal)
@@ -1,137 +1,678 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi import status as http_status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, delete, desc, func, insert, tuple_, update
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
-from datetime import datetime
-from app import models, deps
+from typing import List, NamedTuple, Optional
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from app import models, deps, rollups
 from app.schemas import schemas
+from app.conditional import digest_etag, http_date, is_conditional, not_modified_response, version_etag
+from app.export import export_response, time_range
+from app.db import SessionLocal
+from app.responses import dumps, json_bytes_response, json_response, model_columns, rows_payload
+from app.singleflight import read_coalescer
+from app.pagination import InvalidCursor, decode_timestamp_cursor, encode_cursor
+from app.scheduling import (
+    AVAILABILITY_MAX_DAYS, MAX_SERVICE_DURATION, SLOT_STEP_MINUTES,
+    IntervalSet, as_naive_utc, end_for, free_slots, service_duration,
+)
 
 router = APIRouter()
 
+def _slot_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Requested time slot is not available"
+    )
+
+def _is_slot_conflict(e: IntegrityError) -> bool:
+    """Whether the database rejected the write through the no-overlap constraint"""
+    return models.BOOKING_OVERLAP_CONSTRAINT in str(e.orig)
+
+def _schedule_window(user_id: int, service_type, start: datetime, end: datetime):
+    """Conditions matching a user's active bookings of a service that overlap [start, end)
+
+    Slots are per user: other users' bookings never conflict and never show as busy.
+    """
+    return (
+        models.Booking.user_id == user_id,
+        models.Booking.service_type == getattr(service_type, "value", service_type),
+        models.Booking.status.in_(models.ACTIVE_BOOKING_STATUSES),
+        # Bookings last at most MAX_SERVICE_DURATION, so this bounds the index range scan
+        models.Booking.scheduled_date > start - MAX_SERVICE_DURATION,
+        models.Booking.scheduled_date < end,
+        models.Booking.end_date > start,
+    )
+
+async def _has_conflict(
+    db: AsyncSession, user_id: int, service_type, start: datetime, end: datetime, exclude_id: int = None
+) -> bool:
+    query = select(models.Booking.id).where(*_schedule_window(user_id, service_type, start, end))
+    if exclude_id is not None:
+        query = query.where(models.Booking.id != exclude_id)
+    return await db.scalar(query.limit(1)) is not None
+
+async def _busy_intervals(db: AsyncSession, user_id: int, service_type, start: datetime, end: datetime) -> IntervalSet:
+    result = await db.execute(
+        select(models.Booking.scheduled_date, models.Booking.end_date)
+        .where(*_schedule_window(user_id, service_type, start, end))
+        .order_by(models.Booking.scheduled_date)
+    )
+    return IntervalSet(result.all())
+
+def _activates(values: dict) -> bool:
+    """Whether an update sets a status that holds the booking's slot"""
+    return values.get("status") in models.ACTIVE_BOOKING_STATUSES
+
+async def _apply_reschedule(db: AsyncSession, booking_id: int, user_id: int, values: dict):
+    """Set end_date for a changed schedule or service type, rejecting overlaps if it stays active"""
+    current = (await db.execute(
+        select(models.Booking.service_type, models.Booking.scheduled_date, models.Booking.status).where(
+            and_(models.Booking.id == booking_id, models.Booking.user_id == user_id)
+        )
+    )).one_or_none()
+    if current is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+
+    if "scheduled_date" in values:
+        values["scheduled_date"] = as_naive_utc(values["scheduled_date"])
+    service_type = values.get("service_type", current.service_type)
+    start = values.get("scheduled_date", current.scheduled_date)
+    end = end_for(service_type, start)
+    active = values.get("status", getattr(current.status, "value", current.status)) in models.ACTIVE_BOOKING_STATUSES
+    if active and await _has_conflict(db, user_id, service_type, start, end, exclude_id=booking_id):
+        raise _slot_conflict()
+    values["end_date"] = end
+
+async def _reactivation_conflicts(db: AsyncSession, booking_ids: List[int], user_id: int) -> set:
+    """Ids of inactive bookings whose slot was taken since, among those about to become active again"""
+    result = await db.execute(
+        select(models.Booking.id, models.Booking.service_type, models.Booking.scheduled_date, models.Booking.end_date)
+        .where(
+            models.Booking.id.in_(booking_ids),
+            models.Booking.user_id == user_id,
+            models.Booking.status.not_in(models.ACTIVE_BOOKING_STATUSES),
+        )
+    )
+    return {
+        row.id for row in result.all()
+        if await _has_conflict(db, user_id, row.service_type, row.scheduled_date, row.end_date, exclude_id=row.id)
+    }
+
 @router.post("/", response_model=schemas.BookingOut)
 async def create_booking(
     booking: schemas.BookingCreate,
-    current_user: models.User = Depends(deps.get_current_user),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(deps.get_db)
 ):
+    start = as_naive_utc(booking.scheduled_date)
+    end = end_for(booking.service_type, start)
+    if await _has_conflict(db, current_user.id, booking.service_type, start, end):
+        raise _slot_conflict()
+
     try:
         db_booking = models.Booking(
             user_id=current_user.id,
             service_type=booking.service_type,
             title=booking.title,
             details=booking.details or "",
-            scheduled_date=booking.scheduled_date,
+            scheduled_date=start,
+            end_date=end,
             status=models.BookingStatus.pending
         )
         db.add(db_booking)
-        await db.commit()
+        await db.flush()
         await db.refresh(db_booking)
+        await rollups.apply_deltas(db, rollups.booking_deltas(added=[db_booking]))
+        await db.commit()
+        read_coalescer.invalidate(current_user.id)
         return db_booking
     except IntegrityError as e:
         await db.rollback()
+        if _is_slot_conflict(e):
+            raise _slot_conflict()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to create booking: {str(e)}"
         )
 
-@router.get("/", response_model=schemas.PaginatedBookings)
-async def get_bookings(
-    page: int = 1,
-    per_page: int = 10,
+_booking_columns = tuple(models.Booking.__table__.c)
+# Just the BookingOut fields, for list pages serialized straight from rows
+_booking_out_columns = model_columns(schemas.BookingOut, models.Booking.__table__)
+
+# Columns identifying a booking's row in the stats rollup
+_stats_dims = (models.Booking.user_id, models.Booking.created_at, models.Booking.status, models.Booking.service_type)
+
+class _StatsDims(NamedTuple):
+    """A booking's rollup dimensions before an update moved it to another bucket"""
+    user_id: int
+    created_at: datetime
+    status: str
+    service_type: str
+
+async def _update_bookings(db: AsyncSession, conditions: list, values: dict):
+    """UPDATE ... RETURNING the matching bookings, plus their rollup dimensions from before the write.
+
+    The previous dimensions are only needed, and only returned, when the
+    update changes status or service type. On Postgres they come back from
+    the UPDATE itself, joined to a FOR UPDATE subquery so a concurrent change
+    cannot decrement the same old bucket twice. SQLite cannot return columns
+    of a FROM clause, so there they are read first; it serializes writers.
+    """
+    stmt = update(models.Booking).values(**values).execution_options(synchronize_session=False)
+    if "status" not in values and "service_type" not in values:
+        return (await db.execute(stmt.where(*conditions).returning(*_booking_columns))).all(), []
+    if db.bind.dialect.name == "postgresql":
+        old = (
+            select(models.Booking.id, models.Booking.status, models.Booking.service_type)
+            .where(*conditions)
+            .with_for_update()
+            .subquery("old")
+        )
+        rows = (await db.execute(
+            stmt.where(models.Booking.id == old.c.id).returning(
+                *_booking_columns, old.c.status.label("old_status"), old.c.service_type.label("old_service_type")
+            )
+        )).all()
+        return rows, [_StatsDims(row.user_id, row.created_at, row.old_status, row.old_service_type) for row in rows]
+    previous = (await db.execute(select(*_stats_dims).where(*conditions))).all()
+    return (await db.execute(stmt.where(*conditions).returning(*_booking_columns))).all(), previous
+
+def _batch_result(mode: schemas.BatchMode, results: list) -> schemas.BatchResult:
+    results.sort(key=lambda r: r.index)
+    succeeded = sum(1 for r in results if r.ok)
+    return schemas.BatchResult(mode=mode, succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+def _batch_ok(index: int, row) -> schemas.BatchItemResult:
+    return schemas.BatchItemResult(index=index, id=row.id, ok=True, booking=schemas.BookingOut.model_validate(row))
+
+@router.post("/batch", response_model=schemas.BatchResult)
+async def create_bookings_batch(
+    batch: schemas.BookingBatchCreate,
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    rows = []
+    for item in batch.items:
+        start = as_naive_utc(item.scheduled_date)
+        rows.append(dict(
+            user_id=current_user.id,
+            service_type=item.service_type,
+            title=item.title,
+            details=item.details or "",
+            scheduled_date=start,
+            end_date=end_for(item.service_type, start),
+            status=models.BookingStatus.pending
+        ))
+
+    # One range query per service type, then check items against the existing
+    # bookings and against each other in memory
+    results = []
+    accepted = {}
+    for service_type in {row["service_type"] for row in rows}:
+        group = [(i, row) for i, row in enumerate(rows) if row["service_type"] == service_type]
+        busy = await _busy_intervals(
+            db, current_user.id, service_type,
+            min(row["scheduled_date"] for _, row in group),
+            max(row["end_date"] for _, row in group)
+        )
+        for index, row in group:
+            if busy.overlaps(row["scheduled_date"], row["end_date"]):
+                results.append(schemas.BatchItemResult(index=index, ok=False, error="Requested time slot is not available"))
+            else:
+                busy.add(row["scheduled_date"], row["end_date"])
+                accepted[index] = row
+    if results and batch.mode == schemas.BatchMode.atomic:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Requested time slots are not available for items {sorted(r.index for r in results)}"
+        )
+    pending = sorted(accepted.items())
+    if not pending:
+        return _batch_result(batch.mode, results)
+
+    # Multi-row INSERT ... RETURNING, rows come back in parameter order
+    stmt = insert(models.Booking.__table__).returning(*_booking_columns, sort_by_parameter_order=True)
+    try:
+        created = (await db.execute(stmt, [row for _, row in pending])).all()
+        await rollups.apply_deltas(db, rollups.booking_deltas(added=created))
+        await db.commit()
+        read_coalescer.invalidate(current_user.id)
+        results += [_batch_ok(index, row) for (index, _), row in zip(pending, created)]
+        return _batch_result(batch.mode, results)
+    except IntegrityError as e:
+        await db.rollback()
+        if batch.mode == schemas.BatchMode.atomic:
+            if _is_slot_conflict(e):
+                raise _slot_conflict()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to create bookings: {str(e)}"
+            )
+
+    # Best effort: isolate the failing rows with one savepoint per item
+    inserted = []
+    for index, row in pending:
+        try:
+            async with db.begin_nested():
+                created = (await db.execute(stmt, [row])).one()
+            inserted.append(created)
+            results.append(_batch_ok(index, created))
+        except IntegrityError as e:
+            results.append(schemas.BatchItemResult(index=index, ok=False, error=str(e.orig)))
+    await rollups.apply_deltas(db, rollups.booking_deltas(added=inserted))
+    await db.commit()
+    read_coalescer.invalidate(current_user.id)
+    return _batch_result(batch.mode, results)
+
+@router.patch("/batch", response_model=schemas.BatchResult)
+async def update_bookings_batch(
+    batch: schemas.BookingBatchUpdate,
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    # Items carrying the same changes (e.g. status=confirmed) share one set-based UPDATE
+    groups = {}
+    for index, item in enumerate(batch.items):
+        changes = item.model_dump(exclude_unset=True, exclude_none=True, exclude={"id"})
+        key = tuple(sorted(changes.items()))
+        if "scheduled_date" in changes or "service_type" in changes:
+            # Rescheduling needs a per-booking end_date and conflict check
+            key = (index,) + key
+        groups.setdefault(key, []).append((index, item))
+
+    def group_update(entries, values):
+        ids = [item.id for _, item in entries]
+        return _update_bookings(db, [models.Booking.id.in_(ids), models.Booking.user_id == current_user.id], values)
+
+    results = []
+    deltas = Counter()
+    try:
+        for entries in groups.values():
+            values = _booking_update_values(entries[0][1], exclude={"id"})
+            if "scheduled_date" in values or "service_type" in values:
+                index, item = entries[0]
+                try:
+                    await _apply_reschedule(db, item.id, current_user.id, values)
+                except HTTPException as e:
+                    if batch.mode == schemas.BatchMode.atomic:
+                        await db.rollback()
+                        raise
+                    results.append(schemas.BatchItemResult(index=index, id=item.id, ok=False, error=e.detail))
+                    continue
+            elif _activates(values):
+                # Un-cancelling must not take a slot booked while the booking was inactive
+                taken = await _reactivation_conflicts(db, [item.id for _, item in entries], current_user.id)
+                if taken:
+                    if batch.mode == schemas.BatchMode.atomic:
+                        await db.rollback()
+                        raise _slot_conflict()
+                    results += [
+                        schemas.BatchItemResult(index=index, id=item.id, ok=False, error=_slot_conflict().detail)
+                        for index, item in entries if item.id in taken
+                    ]
+                    entries = [(index, item) for index, item in entries if item.id not in taken]
+                    if not entries:
+                        continue
+            if batch.mode == schemas.BatchMode.atomic:
+                updated, previous = await group_update(entries, values)
+            else:
+                try:
+                    async with db.begin_nested():
+                        updated, previous = await group_update(entries, values)
+                except IntegrityError:
+                    # Retry the group one item at a time to find the offending rows
+                    updated, previous = [], []
+                    for entry in entries:
+                        try:
+                            async with db.begin_nested():
+                                rows, before = await group_update([entry], values)
+                            updated += rows
+                            previous += before
+                        except IntegrityError as e:
+                            results.append(schemas.BatchItemResult(index=entry[0], id=entry[1].id, ok=False, error=str(e.orig)))
+            by_id = {row.id: row for row in updated}
+            if previous:
+                deltas.update(rollups.booking_deltas(added=updated, removed=previous))
+            for index, item in entries:
+                if item.id in by_id:
+                    results.append(_batch_ok(index, by_id[item.id]))
+                elif not any(r.index == index for r in results):
+                    results.append(schemas.BatchItemResult(index=index, id=item.id, ok=False, error="Booking not found"))
+    except IntegrityError as e:
+        await db.rollback()
+        if _is_slot_conflict(e):
+            raise _slot_conflict()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Database constraint violation: {str(e)}"
+        )
+
+    missing = [r.id for r in results if not r.ok]
+    if missing and batch.mode == schemas.BatchMode.atomic:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Bookings not found: {missing}")
+    await rollups.apply_deltas(db, deltas)
+    await db.commit()
+    read_coalescer.invalidate(current_user.id)
+    return _batch_result(batch.mode, results)
+
+@router.delete("/batch", response_model=schemas.BatchResult)
+async def delete_bookings_batch(
+    ids: List[int] = Query(..., max_length=schemas.BOOKING_BATCH_MAX_ITEMS),
+    mode: schemas.BatchMode = schemas.BatchMode.atomic,
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    removed = (await db.execute(
+        delete(models.Booking)
+        .where(models.Booking.id.in_(ids), models.Booking.user_id == current_user.id)
+        .returning(models.Booking.id, *_stats_dims)
+        .execution_options(synchronize_session=False)
+    )).all()
+    deleted = {row.id for row in removed}
+    missing = [booking_id for booking_id in ids if booking_id not in deleted]
+    if missing and mode == schemas.BatchMode.atomic:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Bookings not found: {missing}")
+    await rollups.apply_deltas(db, rollups.booking_deltas(removed=removed))
+    await db.commit()
+    read_coalescer.invalidate(current_user.id)
+
+    results = [
+        schemas.BatchItemResult(
+            index=index, id=booking_id, ok=booking_id in deleted,
+            error=None if booking_id in deleted else "Booking not found"
+        )
+        for index, booking_id in enumerate(ids)
+    ]
+    return _batch_result(mode, results)
+
+@router.get("/export")
+async def export_bookings(
+    format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+    gzip: bool = False,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
     status: Optional[schemas.BookingStatus] = None,
     service_type: Optional[schemas.ServiceType] = None,
-    current_user: models.User = Depends(deps.get_current_user),
-    db: AsyncSession = Depends(deps.get_db)
+    current_user: deps.Principal = Depends(deps.get_current_principal)
 ):
-    query = select(models.Booking).where(models.Booking.user_id == current_user.id)
+    """Stream all of the user's bookings, optionally filtered on scheduled_date"""
+    query = select(*_booking_columns).where(
+        models.Booking.user_id == current_user.id,
+        *time_range(models.Booking.scheduled_date, date_from, date_to),
+    )
     if status:
         query = query.where(models.Booking.status == status.value)
     if service_type:
         query = query.where(models.Booking.service_type == service_type.value)
+    return export_response(query.order_by(models.Booking.id), format.value, gzip, "bookings")
+
+@router.get("/availability", response_model=schemas.Availability)
+async def get_availability(
+    date_from: datetime = Query(..., alias="from"),
+    date_to: datetime = Query(..., alias="to"),
+    service_type: Optional[schemas.ServiceType] = None,
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """The current user's free start times in [from, to), per service type, on a SLOT_STEP_MINUTES grid"""
+    start, end = as_naive_utc(date_from), as_naive_utc(date_to)
+    if end <= start or end - start > timedelta(days=AVAILABILITY_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'to' must be after 'from' and at most {AVAILABILITY_MAX_DAYS} days later"
+        )
+
+    slots = []
+    for kind in ([service_type] if service_type else list(schemas.ServiceType)):
+        busy = await _busy_intervals(db, current_user.id, kind, start, end)
+        slots += [
+            schemas.AvailabilitySlot(service_type=kind, start=slot_start, end=slot_end)
+            for slot_start, slot_end in free_slots(busy, start, end, service_duration(kind))
+        ]
+    return schemas.Availability(start=start, end=end, slot_step_minutes=SLOT_STEP_MINUTES, slots=slots)
 
-    count_query = select(func.count(models.Booking.id)).where(models.Booking.user_id == current_user.id)
+@router.get("/stats", response_model=schemas.BookingStats)
+async def get_booking_stats(
+    bucket: schemas.StatsBucket = schemas.StatsBucket.day,
+    scope: schemas.StatsScope = schemas.StatsScope.user,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Booking counts by status and service type per day/week/month of creation (UTC), for [from, to)
+
+    Served from the booking_stats_daily rollups, so the cost is proportional to
+    the number of days in range rather than the number of bookings or users.
+    scope=global is restricted to admins (ADMIN_USER_IDS).
+    """
+    end = date_to or (datetime.now(timezone.utc).date() + timedelta(days=1))
+    start = date_from or (end - timedelta(days=30))
+    if end <= start or (end - start).days > rollups.BOOKING_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'to' must be after 'from' and at most {rollups.BOOKING_STATS_MAX_DAYS} days later"
+        )
+
+    if scope == schemas.StatsScope.global_ and not deps.is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Global stats are restricted to admins")
+    user_id = current_user.id if scope == schemas.StatsScope.user else None
+    rows = await rollups.daily_counts(db, start, end, user_id=user_id)
+    buckets = [
+        schemas.BookingStatsBucket(
+            start=bucket_start,
+            total=sum(counts["status"].values()),
+            by_status=dict(counts["status"]),
+            by_service_type=dict(counts["service_type"]),
+        )
+        for bucket_start, counts in rollups.bucket_counts(rows, bucket.value).items()
+    ]
+    return schemas.BookingStats(bucket=bucket, scope=scope, start=start, end=end, buckets=buckets)
+
+@router.get("/", response_model=schemas.PaginatedBookings)
+async def get_bookings(
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(10, ge=1, le=100),
+    status: Optional[schemas.BookingStatus] = None,
+    service_type: Optional[schemas.ServiceType] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: deps.Principal = Depends(deps.get_current_principal)
+):
+    filters = [models.Booking.user_id == current_user.id]
     if status:
-        count_query = count_query.where(models.Booking.status == status.value)
+        filters.append(models.Booking.status == status.value)
     if service_type:
-        count_query = count_query.where(models.Booking.service_type == service_type.value)
+        filters.append(models.Booking.service_type == service_type.value)
+    filter_key = (status, service_type)
 
-    total = (await db.execute(count_query)).scalar() or 0
-    offset = (page - 1) * per_page
+    total = pages = None
+    if include_total:
+        # One aggregate gives the total and a validator for the whole filtered set:
+        # inserts and deletes move the count, every write bumps a version
+        async def load_aggregate():
+            async with SessionLocal() as session:
+                return tuple((await session.execute(
+                    select(
+                        func.count(models.Booking.id),
+                        func.max(models.Booking.updated_at),
+                        func.coalesce(func.sum(models.Booking.version), 0),
+                    ).where(*filters)
+                )).one())
 
-    result = await db.execute(
-        query.order_by(desc(models.Booking.created_at)).offset(offset).limit(per_page)
-    )
-    bookings = result.scalars().all()
-
-    pages = (total + per_page - 1) // per_page if total else 0
-    return schemas.PaginatedBookings(
-        items=bookings,
-        total=total,
-        page=page,
-        per_page=per_page,
-        pages=pages
-    )
+        total, last_modified, version_sum = await read_coalescer.do(
+            current_user.id, ("bookings:aggregate", filter_key), load_aggregate
+        )
+        etag = digest_etag(current_user.id, str(request.url.query), total, last_modified, version_sum)
+        not_modified = not_modified_response(request, response, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        pages = (total + per_page - 1) // per_page if total else 0
+
+    query = select(*_booking_out_columns).where(*filters)
+    if cursor:
+        # Keyset mode: seek past the last row seen instead of counting an OFFSET
+        try:
+            last_created_at, last_id = decode_timestamp_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+        query = query.where(
+            tuple_(models.Booking.created_at, models.Booking.id) < tuple_(last_created_at, last_id)
+        )
+    else:
+        query = query.offset((page - 1) * per_page)
+
+    async def load_page() -> bytes:
+        # One extra row tells us whether there is a next page without a COUNT
+        async with SessionLocal() as session:
+            result = await session.execute(
+                query.order_by(desc(models.Booking.created_at), desc(models.Booking.id)).limit(per_page + 1)
+            )
+            bookings = result.all()
+        next_cursor = None
+        if len(bookings) > per_page:
+            bookings = bookings[:per_page]
+            next_cursor = encode_cursor(bookings[-1].created_at, bookings[-1].id)
+        # Same shape as schemas.PaginatedBookings, without validating every row through it
+        return dumps({
+            "items": rows_payload(bookings),
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": pages,
+            "next_cursor": next_cursor,
+        })
+
+    page_key = ("bookings:list", filter_key, cursor or page, per_page, total)
+    return json_bytes_response(await read_coalescer.do(current_user.id, page_key, load_page), response)
 
 @router.get("/{booking_id}", response_model=schemas.BookingOut)
 async def get_booking(
     booking_id: int,
-    current_user: models.User = Depends(deps.get_current_user),
-    db: AsyncSession = Depends(deps.get_db)
+    request: Request,
+    response: Response,
+    current_user: deps.Principal = Depends(deps.get_current_principal)
 ):
-    result = await db.execute(
-        select(models.Booking).where(
-            and_(models.Booking.id == booking_id, models.Booking.user_id == current_user.id)
-        )
-    )
-    booking = result.scalar_one_or_none()
-    if not booking:
+    owned = and_(models.Booking.id == booking_id, models.Booking.user_id == current_user.id)
+
+    if is_conditional(request):
+        # Revalidation: compare the version first, load and serialize the row only on a miss
+        async def load_validator():
+            async with SessionLocal() as session:
+                row = (await session.execute(
+                    select(models.Booking.version, models.Booking.updated_at).where(owned)
+                )).one_or_none()
+            return None if row is None else tuple(row)
+
+        validator = await read_coalescer.do(current_user.id, ("bookings:validator", booking_id), load_validator)
+        if validator is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+        version, updated_at = validator
+        not_modified = not_modified_response(request, response, version_etag(version), updated_at)
+        if not_modified is not None:
+            return not_modified
+
+    async def load_booking():
+        # Plain row, no ORM identity map, serialized once for every request sharing it
+        async with SessionLocal() as session:
+            booking = (await session.execute(select(*_booking_out_columns).where(owned))).one_or_none()
+        if booking is None:
+            return None
+        return booking.version, booking.updated_at, dumps(rows_payload([booking])[0])
+
+    loaded = await read_coalescer.do(current_user.id, ("bookings:get", booking_id), load_booking)
+    if loaded is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
-    return booking
+    version, updated_at, body = loaded
+    not_modified = not_modified_response(request, response, version_etag(version), updated_at)
+    if not_modified is not None:
+        return not_modified
+    return json_bytes_response(body, response)
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Extract the expected booking version from an If-Match header ("*" matches any)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid If-Match header: {if_match}"
+        )
+
+def _booking_update_values(booking_update: schemas.BookingUpdate, exclude=None) -> dict:
+    """Column values for an UPDATE from a partial BookingUpdate"""
+    # Get update data using model_dump instead of deprecated dict()
+    update_data = booking_update.model_dump(exclude_unset=True, exclude_none=True, exclude=exclude)
+
+    values = {}
+    for field, value in update_data.items():
+        if field in ['service_type', 'status'] and hasattr(value, 'value'):
+            # Handle enum values properly
+            values[field] = value.value
+        else:
+            values[field] = value
+
+    values["updated_at"] = func.now()
+    values["version"] = models.Booking.version + 1
+    return values
+
+async def _raise_missing_or_conflict(db: AsyncSession, booking_id: int, user_id: int, expected_version):
+    """Tell a missing booking (404) apart from a stale If-Match (412) after a no-op write"""
+    if expected_version is not None:
+        exists = await db.scalar(
+            select(models.Booking.id).where(
+                and_(models.Booking.id == booking_id, models.Booking.user_id == user_id)
+            )
+        )
+        if exists is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Booking was modified by another request"
+            )
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
 
 @router.put("/{booking_id}", response_model=schemas.BookingOut)
 async def update_booking(
     booking_id: int,
     booking_update: schemas.BookingUpdate,
-    current_user: models.User = Depends(deps.get_current_user),
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(deps.get_db)
 ):
-    try:
-        result = await db.execute(
-            select(models.Booking).where(
-                and_(models.Booking.id == booking_id, models.Booking.user_id == current_user.id)
-            )
-        )
-        booking = result.scalar_one_or_none()
-        if not booking:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    expected_version = _parse_if_match(if_match)
+    conditions = [models.Booking.id == booking_id, models.Booking.user_id == current_user.id]
+    if expected_version is not None:
+        conditions.append(models.Booking.version == expected_version)
 
-        # Get update data using model_dump instead of deprecated dict()
-        update_data = booking_update.model_dump(exclude_unset=True, exclude_none=True)
-        
-        # Update fields with proper enum handling
-        for field, value in update_data.items():
-            if hasattr(booking, field):
-                if field in ['service_type', 'status']:
-                    # Handle enum values properly
-                    if hasattr(value, 'value'):
-                        setattr(booking, field, value.value)
-                    elif isinstance(value, str):
-                        # Convert string to enum if needed
-                        setattr(booking, field, value)
-                    else:
-                        setattr(booking, field, value)
-                else:
-                    setattr(booking, field, value)
-        
-        # Ensure updated_at is set
-        booking.updated_at = datetime.utcnow()
-        
-        await db.commit()
-        await db.refresh(booking)
-        return booking
-        
+    values = _booking_update_values(booking_update)
+    if "scheduled_date" in values or "service_type" in values:
+        await _apply_reschedule(db, booking_id, current_user.id, values)
+    elif _activates(values) and await _reactivation_conflicts(db, [booking_id], current_user.id):
+        raise _slot_conflict()
+
+    try:
+        # Ownership check, write and read-back in a single round trip
+        updated, previous = await _update_bookings(db, conditions, values)
+        booking = updated[0] if updated else None
+        if booking is not None:
+            if previous:
+                await rollups.apply_deltas(db, rollups.booking_deltas(added=updated, removed=previous))
+            await db.commit()
+            read_coalescer.invalidate(current_user.id)
     except ValueError as e:
         await db.rollback()
         raise HTTPException(
@@ -140,6 +681,8 @@ async def update_booking(
         )
     except IntegrityError as e:
         await db.rollback()
+        if _is_slot_conflict(e):
+            raise _slot_conflict()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Database constraint violation: {str(e)}"
@@ -150,22 +693,35 @@ async def update_booking(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update booking: {str(e)}"
         )
+
+    if booking is None:
+        await _raise_missing_or_conflict(db, booking_id, current_user.id, expected_version)
+    response.headers["ETag"] = version_etag(booking.version)
+    response.headers["Last-Modified"] = http_date(booking.updated_at)
+    return schemas.BookingOut.model_validate(booking)
     
 @router.delete("/{booking_id}")
 async def delete_booking(
     booking_id: int,
-    current_user: models.User = Depends(deps.get_current_user),
+    if_match: Optional[str] = Header(None),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(deps.get_db)
 ):
-    result = await db.execute(
-        select(models.Booking).where(
-            and_(models.Booking.id == booking_id, models.Booking.user_id == current_user.id)
-        )
-    )
-    booking = result.scalar_one_or_none()
-    if not booking:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    expected_version = _parse_if_match(if_match)
+    conditions = [models.Booking.id == booking_id, models.Booking.user_id == current_user.id]
+    if expected_version is not None:
+        conditions.append(models.Booking.version == expected_version)
+
+    deleted = (await db.execute(
+        delete(models.Booking)
+        .where(*conditions)
+        .returning(*_stats_dims)
+        .execution_options(synchronize_session=False)
+    )).one_or_none()
+    if deleted is None:
+        await _raise_missing_or_conflict(db, booking_id, current_user.id, expected_version)
 
-    await db.delete(booking)
+    await rollups.apply_deltas(db, rollups.booking_deltas(removed=[deleted]))
     await db.commit()
-    return {"message": "Booking deleted successfully"}
\ No newline at end of file
+    read_coalescer.invalidate(current_user.id)
+    return {"message": "Booking deleted successfully"}
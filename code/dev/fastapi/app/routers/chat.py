@@ -1,80 +1,342 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import tuple_
 from app import deps, models
+from app.db import SessionLocal
 from app.schemas.chat import ChatMessageIn, ChatMessageOut, Sentiment, ChatHistoryCreate, ChatHistoryOut
-from app.schemas.schemas import UserOut
+from app.schemas.schemas import UserOut, ExportFormat
+from app.export import export_response, time_range
+from app.responses import dumps, json_response, model_columns, rows_payload
+from app.pagination import InvalidCursor, decode_timestamp_cursor, encode_cursor
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from datetime import datetime, timezone
 from fastapi.responses import JSONResponse
-import requests,os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from app.sentiment import sentiment_backend
+from app.writebehind import WriteBehindFull, chat_history_writer
+from app.embeddings import get_encoder, to_bytes
+from app.vector_index import chat_vector_index
+from app.admission import route_limiters
+from app.ratelimit import rate_limiter
+from app.streaming import (
+    STREAM_REJECTED, EventStreamResponse, SlowClient, send_within, sse_event, stream_connections
+)
+import asyncio
+import json
+import logging
+import os
+import re
+import time
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-HF_SENTIMENT_URL = "https://api-inference.huggingface.co/models/distilbert-base-uncased-finetuned-sst-2-english"
-HF_API_TOKEN = os.getenv("HF_API_TOKEN")
+CHAT_HISTORY_DEFAULT_LIMIT = int(os.getenv("CHAT_HISTORY_DEFAULT_LIMIT", "50"))
+# Hard server-side cap, whatever the client asks for
+CHAT_HISTORY_MAX_LIMIT = int(os.getenv("CHAT_HISTORY_MAX_LIMIT", "200"))
 
-def analyze_sentiment(text: str):
-    headers = {"Authorization": f"Bearer {HF_API_TOKEN}"} if HF_API_TOKEN else {}
-    try:
-        response = requests.post(HF_SENTIMENT_URL, headers=headers, json={"inputs": text}, timeout=10)
-        response.raise_for_status()
-        result = response.json()
-        label = result[0][0]["label"].lower()
-        score = result[0][0]["score"]
-        return Sentiment(label=label, score=score)
-    except Exception:
-        return None
-
-@router.post("/chat", response_model=ChatMessageOut)
-async def chat_message(
-    payload: ChatMessageIn,
-    db: AsyncSession = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
-):
-    user_message = payload.message
-    if not user_message:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Message required"
-        )
+SUGGESTION_COUNT = 3
+# Past messages less similar than this are not offered as suggestions
+SUGGESTION_MIN_SIMILARITY = float(os.getenv("SUGGESTION_MIN_SIMILARITY", "0.3"))
+DEFAULT_SUGGESTIONS = [
+    "Tell me a joke",
+    "Translate to French",
+    "What's the weather?"
+]
 
-    ai_response = f"You said: '{user_message}'. How else can I help you?"
+# An idle WebSocket is closed after this long without a message
+CHAT_WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("CHAT_WS_IDLE_TIMEOUT_SECONDS", "300"))
+CHAT_WS_MAX_MESSAGE_CHARS = int(os.getenv("CHAT_WS_MAX_MESSAGE_CHARS", "4000"))
 
-    sentiment = analyze_sentiment(user_message)
+_REPLY_TOKEN = re.compile(r"\s*\S+")
+_history_out_columns = model_columns(ChatHistoryOut, models.ChatHistory.__table__)
 
-    suggestions = [
-        "Tell me a joke",
-        "Translate to French",
-        "What's the weather?"
-    ]
+async def analyze_sentiment(text: str):
+    return await sentiment_backend.analyze(text)
+
+async def similar_suggestions(db: AsyncSession, vector, user_id: int, message: str) -> List[str]:
+    """The user's past messages most similar to this one, topped up with the defaults"""
+    hits = chat_vector_index.search(vector, SUGGESTION_COUNT * 4, user_id=user_id)
+    ids = [row_id for row_id, score in hits if score >= SUGGESTION_MIN_SIMILARITY]
+    suggestions = []
+    if ids:
+        rows = await db.execute(
+            select(models.ChatHistory.id, models.ChatHistory.message).where(
+                models.ChatHistory.id.in_(ids), models.ChatHistory.user_id == user_id
+            )
+        )
+        by_id = {row.id: row.message for row in rows}
+        seen = {" ".join(message.casefold().split())}
+        for row_id in ids:
+            text = by_id.get(row_id)
+            key = " ".join(text.casefold().split()) if text else None
+            if key and key not in seen:
+                seen.add(key)
+                suggestions.append(text)
+            if len(suggestions) == SUGGESTION_COUNT:
+                return suggestions
+    return suggestions + [s for s in DEFAULT_SUGGESTIONS if s not in suggestions][:SUGGESTION_COUNT - len(suggestions)]
 
-    vector = [0.1, 0.2, 0.3]
+def reply_text(message: str) -> str:
+    return f"You said: '{message}'. How else can I help you?"
 
-    # Save chat history
-    chat_entry = models.ChatHistory(
-        user_id=current_user.id if current_user else None,
-        message=user_message,
-        response=ai_response
+async def reply_tokens(message: str) -> AsyncIterator[str]:
+    """The reply a word at a time, each as soon as it is produced"""
+    for token in _REPLY_TOKEN.findall(reply_text(message)):
+        yield token
+
+async def _suggestions(db: AsyncSession, user_id: int, message: str):
+    if not chat_vector_index.ready:
+        return list(DEFAULT_SUGGESTIONS), None
+    embedding = get_encoder().encode(message)
+    return await similar_suggestions(db, embedding, user_id, message), embedding
+
+async def reply_extras(db: AsyncSession, user_id: int, message: str):
+    """Sentiment, suggestions and the message embedding; the sentiment call overlaps the suggestion lookup"""
+    sentiment, (suggestions, embedding) = await asyncio.gather(
+        analyze_sentiment(message), _suggestions(db, user_id, message)
     )
+    return sentiment, suggestions, embedding
+
+async def persist_history(db: AsyncSession, user_id: int, message: str, reply: str, embedding):
+    """Save one exchange; raises WriteBehindFull when the write-behind buffer stays full"""
+    stored_embedding = to_bytes(embedding) if embedding is not None else None
+    if chat_history_writer.running:
+        await chat_history_writer.put(dict(
+            user_id=user_id,
+            message=message,
+            response=reply,
+            timestamp=datetime.now(timezone.utc),
+            embedding=stored_embedding
+        ))
+        return
+    chat_entry = models.ChatHistory(user_id=user_id, message=message, response=reply, embedding=stored_embedding)
     db.add(chat_entry)
     await db.commit()
-    await db.refresh(chat_entry)
+    if embedding is not None:
+        chat_vector_index.add(chat_entry.id, chat_entry.user_id, embedding)
+
+async def reply_events(user_id: int, message: str) -> AsyncIterator[Tuple[str, Any]]:
+    """(event, data) pairs: reply tokens, then sentiment, suggestions, vector and done.
+
+    Streams outlive the request's session, so they use their own. History is
+    saved once the consumer has taken the done event; a stream abandoned
+    before that is not recorded.
+    """
+    async def extras():
+        async with SessionLocal() as session:
+            return await reply_extras(session, user_id, message)
+
+    # Sentiment and suggestions are worked out while the tokens go out
+    pending = asyncio.ensure_future(extras())
+    try:
+        parts = []
+        async for token in reply_tokens(message):
+            parts.append(token)
+            yield "token", {"text": token}
+        sentiment, suggestions, embedding = await pending
+    finally:
+        pending.cancel()
+
+    reply = "".join(parts)
+    yield "sentiment", sentiment.model_dump() if sentiment is not None else None
+    yield "suggestions", suggestions
+    yield "vector", embedding.tolist() if embedding is not None else None
+    yield "done", {"text": reply}
+
+    try:
+        async with SessionLocal() as session:
+            await persist_history(session, user_id, message, reply, embedding)
+    except WriteBehindFull:
+        logger.warning(f"Chat history buffer full, streamed reply for user {user_id} not saved")
+
+def _required_message(message: Optional[str]) -> str:
+    if not message:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Message required"
+        )
+    return message
+
+@router.post("/chat", response_model=ChatMessageOut, dependencies=[Depends(deps.user_rate_limit("chat"))])
+async def chat_message(
+    payload: ChatMessageIn,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: deps.Principal = Depends(deps.get_current_principal)
+):
+    user_message = _required_message(payload.message)
+    ai_response = reply_text(user_message)
+    sentiment, suggestions, embedding = await reply_extras(db, current_user.id, user_message)
+
+    # Save chat history; the response does not need the inserted row
+    try:
+        await persist_history(db, current_user.id, user_message, ai_response, embedding)
+    except WriteBehindFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Chat history buffer is full, please retry",
+            headers={"Retry-After": "1"}
+        )
 
     return ChatMessageOut(
         text=ai_response,
         sentiment=sentiment,
         suggestions=suggestions,
-        vector=vector
+        vector=embedding.tolist() if embedding is not None else None
+    )
+
+@router.post("/chat/stream", dependencies=[Depends(deps.user_rate_limit("chat"))])
+async def chat_stream(
+    payload: ChatMessageIn,
+    response: Response,
+    current_user: deps.Principal = Depends(deps.get_current_principal)
+):
+    """Server-Sent Events variant of ``POST /chat``: ``token`` events, then ``sentiment``,
+    ``suggestions``, ``vector`` and ``done``"""
+    user_message = _required_message(payload.message)
+    rejected = stream_connections.try_acquire(current_user.id)
+    if rejected is not None:
+        STREAM_REJECTED.inc(1, rejected)
+        if rejected == "user_full":
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many open chat streams"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+    async def body():
+        async for event, data in reply_events(current_user.id, user_message):
+            yield sse_event(event, data)
+
+    return EventStreamResponse(
+        body(), on_close=lambda: stream_connections.release(current_user.id), headers=dict(response.headers)
     )
 
+async def _receive_text(websocket: WebSocket) -> str:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+    if message.get("text") is not None:
+        return message["text"]
+    return (message.get("bytes") or b"").decode("utf-8", errors="replace")
+
+async def _send_event(websocket: WebSocket, event: str, data: Any):
+    await send_within(websocket.send_text(dumps({"event": event, "data": data}).decode()))
+
+@router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Many chat messages over one authenticated connection.
+
+    Authenticate with ``?token=`` (browsers cannot set headers on a
+    WebSocket) or an Authorization header. Send ``{"message": "..."}``; each
+    one is answered with the same events as ``/chat/stream``, as
+    ``{"event": ..., "data": ...}`` frames. Messages are handled one at a
+    time, so a client is never more than one reply ahead of what it has read.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        claims = deps.decode_token(token or "")
+        principal = await deps.principal_for_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    rejected = stream_connections.try_acquire(principal.id)
+    if rejected is not None:
+        STREAM_REJECTED.inc(1, rejected)
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    limiter = route_limiters["chat"]
+    try:
+        await websocket.accept()
+        while True:
+            try:
+                raw = await asyncio.wait_for(_receive_text(websocket), CHAT_WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                return
+            if claims.get("exp") is not None and time.time() >= claims["exp"]:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired")
+                return
+            if len(raw) > CHAT_WS_MAX_MESSAGE_CHARS:
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                return
+            try:
+                user_message = json.loads(raw).get("message")
+            except (ValueError, AttributeError):
+                user_message = None
+            if not isinstance(user_message, str) or not user_message:
+                await _send_event(websocket, "error", {"detail": "Message required"})
+                continue
+
+            # Each reply counts against the same rate limit and admission budget as POST /chat
+            decision = await rate_limiter.hit("chat", ip=deps.client_ip(websocket), user=principal.id)
+            if decision is not None and not decision.allowed:
+                await _send_event(websocket, "error", {
+                    "detail": "Too many requests, please retry later",
+                    "retry_after": decision.retry_after
+                })
+                continue
+            if await limiter.acquire() is not None:
+                await _send_event(websocket, "error", {"detail": "Server is busy, please retry"})
+                continue
+            try:
+                async for event, data in reply_events(principal.id, user_message):
+                    await _send_event(websocket, event, data)
+            finally:
+                limiter.release()
+    except WebSocketDisconnect:
+        pass
+    except SlowClient:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    finally:
+        stream_connections.release(principal.id)
+
 @router.get("/chat/history", response_model=list[ChatHistoryOut])
 async def get_chat_history(
+    response: Response,
+    limit: int = Query(CHAT_HISTORY_DEFAULT_LIMIT, ge=1, le=CHAT_HISTORY_MAX_LIMIT),
+    before: Optional[str] = None,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_user)
+    current_user: deps.Principal = Depends(deps.get_current_principal)
 ):
-    q = select(models.ChatHistory).where(models.ChatHistory.user_id == current_user.id).order_by(models.ChatHistory.timestamp.desc())
+    """Newest-first page of the user's history; pass X-Next-Cursor back as ``before``"""
+    q = select(*_history_out_columns).where(models.ChatHistory.user_id == current_user.id)
+    if before:
+        try:
+            last_timestamp, last_id = decode_timestamp_cursor(before)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        q = q.where(
+            tuple_(models.ChatHistory.timestamp, models.ChatHistory.id) < tuple_(last_timestamp, last_id)
+        )
+    q = q.order_by(models.ChatHistory.timestamp.desc(), models.ChatHistory.id.desc()).limit(limit + 1)
     res = await db.execute(q)
-    return res.scalars().all()
\ No newline at end of file
+    entries = res.all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(entries[-1].timestamp, entries[-1].id)
+    return json_response(rows_payload(entries), response)
+
+@router.get("/chat/history/export")
+async def export_chat_history(
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    current_user: deps.Principal = Depends(deps.get_current_principal)
+):
+    """Stream the user's full chat history, optionally filtered on timestamp"""
+    columns = [c for c in models.ChatHistory.__table__.c if c.name != "embedding"]
+    query = select(*columns).where(
+        models.ChatHistory.user_id == current_user.id,
+        *time_range(models.ChatHistory.timestamp, date_from, date_to),
+    )
+    return export_response(query.order_by(models.ChatHistory.id), format.value, gzip, "chat_history")
@@ -0,0 +1,145 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, literal, literal_column, tuple_, union_all
+from typing import Optional
+import os
+from app import deps, models
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.schemas.search import SearchHit, SearchResults, SearchScope
+from app.search_index import InvertedIndex, prefix_tsquery, query_terms
+
+router = APIRouter()
+
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+SNIPPET_LENGTH = 160
+
+# Sort key for the result kind; hits are ordered by (rank, kind, id) descending
+KIND_BOOKING = 1
+KIND_CHAT = 0
+KIND_NAMES = {KIND_BOOKING: "booking", KIND_CHAT: "chat"}
+
+def _snippet(text: Optional[str]) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= SNIPPET_LENGTH else text[:SNIPPET_LENGTH - 1] + "…"
+
+def _decode_search_cursor(cursor: str):
+    try:
+        rank, kind, row_id = decode_cursor(cursor)
+        return float(rank), int(kind), int(row_id)
+    except (InvalidCursor, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {cursor}")
+
+def _postgres_query(terms, scope: SearchScope, user_id: int):
+    """Ranked union over the generated tsvector columns, served by their GIN indexes"""
+    tsquery = func.to_tsquery("simple", prefix_tsquery(terms))
+    sources = []
+    if scope in (SearchScope.all, SearchScope.bookings):
+        vector = literal_column("bookings.search_vector")
+        sources.append(
+            select(
+                literal(KIND_BOOKING).label("kind"),
+                models.Booking.id.label("id"),
+                func.ts_rank_cd(vector, tsquery).label("rank"),
+                models.Booking.title.label("title"),
+                models.Booking.details.label("body"),
+                models.Booking.created_at.label("timestamp"),
+            ).where(models.Booking.user_id == user_id, vector.op("@@")(tsquery))
+        )
+    if scope in (SearchScope.all, SearchScope.chat):
+        vector = literal_column("chat_history.search_vector")
+        sources.append(
+            select(
+                literal(KIND_CHAT).label("kind"),
+                models.ChatHistory.id.label("id"),
+                func.ts_rank_cd(vector, tsquery).label("rank"),
+                models.ChatHistory.message.label("title"),
+                models.ChatHistory.response.label("body"),
+                models.ChatHistory.timestamp.label("timestamp"),
+            ).where(models.ChatHistory.user_id == user_id, vector.op("@@")(tsquery))
+        )
+    return union_all(*sources).subquery() if len(sources) > 1 else sources[0].subquery()
+
+async def _postgres_search(db, terms, scope, user_id, after, limit):
+    hits = _postgres_query(terms, scope, user_id)
+    query = select(hits)
+    if after is not None:
+        query = query.where(tuple_(hits.c.rank, hits.c.kind, hits.c.id) < tuple_(*after))
+    query = query.order_by(hits.c.rank.desc(), hits.c.kind.desc(), hits.c.id.desc()).limit(limit + 1)
+    return (await db.execute(query)).all()
+
+async def _in_memory_search(db, terms, scope, user_id, after, limit):
+    """Fallback for databases without full-text search (SQLite in tests).
+
+    Builds an inverted index over the user's rows on every call, so it is
+    only meant for small test databases.
+    """
+    rows = {}
+    index = InvertedIndex()
+    if scope in (SearchScope.all, SearchScope.bookings):
+        result = await db.execute(
+            select(models.Booking.id, models.Booking.title, models.Booking.details, models.Booking.created_at)
+            .where(models.Booking.user_id == user_id)
+        )
+        for row in result:
+            rows[(KIND_BOOKING, row.id)] = (row.title, row.details, row.created_at)
+            index.add((KIND_BOOKING, row.id), f"{row.title or ''} {row.details}")
+    if scope in (SearchScope.all, SearchScope.chat):
+        result = await db.execute(
+            select(models.ChatHistory.id, models.ChatHistory.message, models.ChatHistory.response,
+                   models.ChatHistory.timestamp)
+            .where(models.ChatHistory.user_id == user_id)
+        )
+        for row in result:
+            rows[(KIND_CHAT, row.id)] = (row.message, row.response, row.timestamp)
+            index.add((KIND_CHAT, row.id), f"{row.message} {row.response}")
+
+    ranked = sorted(
+        ((score, kind, row_id) for (kind, row_id), score in index.search(terms)),
+        reverse=True,
+    )
+    if after is not None:
+        ranked = [key for key in ranked if key < after]
+    return [
+        (kind, row_id, score, *rows[(kind, row_id)])
+        for score, kind, row_id in ranked[:limit + 1]
+    ]
+
+@router.get("/", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: SearchScope = SearchScope.all,
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """Prefix full-text search over the user's bookings and chat history, best match first"""
+    terms = query_terms(q)
+    if not terms:
+        return SearchResults(items=[])
+    after = _decode_search_cursor(cursor) if cursor else None
+
+    if db.bind.dialect.name == "postgresql":
+        rows = await _postgres_search(db, terms, scope, current_user.id, after, limit)
+    else:
+        rows = await _in_memory_search(db, terms, scope, current_user.id, after, limit)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        kind, row_id, rank = rows[-1][0], rows[-1][1], rows[-1][2]
+        next_cursor = encode_cursor(rank, kind, row_id)
+
+    items = [
+        SearchHit(
+            kind=KIND_NAMES[kind],
+            id=row_id,
+            rank=rank,
+            title=title,
+            snippet=_snippet(body),
+            timestamp=timestamp,
+        )
+        for kind, row_id, rank, title, body, timestamp in rows
+    ]
+    return SearchResults(items=items, next_cursor=next_cursor)
@@ -1,37 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 from app import models, security, deps
+from app.conditional import digest_etag, not_modified_response
+from app.db import SessionLocal
+from app.responses import dumps, json_bytes_response
+from app.singleflight import read_coalescer
 from app.schemas import schemas
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/register", response_model=schemas.UserOut)
+@router.post("/register", response_model=schemas.UserOut, dependencies=[Depends(deps.rate_limit("register"))])
 async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(deps.get_db)):
-    # Check if username already exists
-    q = select(models.User).where(models.User.username == user_in.username)
-    res = await db.execute(q)
-    if res.scalar_one_or_none():
+    # Check username and email uniqueness in one round trip
+    q = select(models.User.username, models.User.email).where(
+        or_(models.User.username == user_in.username, models.User.email == user_in.email)
+    )
+    existing = (await db.execute(q)).all()
+    if any(row.username == user_in.username for row in existing):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Username already registered"
         )
-    
-    # Check if email already exists
-    q_email = select(models.User).where(models.User.email == user_in.email)
-    res_email = await db.execute(q_email)
-    if res_email.scalar_one_or_none():
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Email already registered"
         )
 
+    hashed_password = await security.get_password_hash_async(user_in.password)
+
     try:
         user = models.User(
             username=user_in.username,
-            hashed_password=security.get_password_hash(user_in.password),
+            hashed_password=hashed_password,
             full_name=user_in.full_name,
             email=user_in.email,
         )
@@ -47,21 +55,67 @@ async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(deps.
         )
 
 @router.post("/login", response_model=schemas.Token)
-async def login(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(deps.get_db)):
+async def login(
+    user_credentials: schemas.UserLogin,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db)
+):
+    # Before any query or hashing: every attempt counts against the client's IP
+    await deps.enforce_rate_limit(request, response, "login")
+    # Only failed attempts count per (IP, username), so neither the user's own logins
+    # nor someone guessing from elsewhere can lock the account out
+    attempt = deps.failure_key(request, user_credentials.username)
+    await deps.check_failure_limit("login", attempt)
     q = select(models.User).where(models.User.username == user_credentials.username)
     res = await db.execute(q)
     user = res.scalar_one_or_none()
     
-    if not user or not security.verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await security.verify_password_async(user_credentials.password, user.hashed_password):
+        await deps.record_failure("login", attempt)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    username = user.username
+
+    # Opt-in: upgrade hashes made with outdated settings while we have the plaintext
+    if security.PASSWORD_REHASH_ON_LOGIN and security.password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await security.get_password_hash_async(user_credentials.password)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Password rehash failed for user {username}: {e!r}")
     
-    access_token = security.create_access_token(data={"sub": user.username})
+    access_token = security.create_access_token(data={"sub": username})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.UserOut)
-async def read_users_me(current_user: models.User = Depends(deps.get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(
+    request: Request,
+    response: Response,
+    principal: deps.Principal = Depends(deps.get_current_principal)
+):
+    async def load_user():
+        q = select(
+            models.User.id, models.User.username, models.User.email,
+            models.User.full_name, models.User.created_at, models.User.updated_at
+        ).where(models.User.id == principal.id)
+        async with SessionLocal() as session:
+            user = (await session.execute(q)).one_or_none()
+        if user is None:
+            return None
+        return user.id, user.updated_at, dumps(schemas.UserOut.model_validate(user).model_dump(mode="json"))
+
+    loaded = await read_coalescer.do(principal.id, ("users:me",), load_user)
+    if loaded is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    user_id, updated_at, body = loaded
+    not_modified = not_modified_response(request, response, digest_etag(user_id, updated_at), updated_at)
+    if not_modified is not None:
+        return not_modified
+    return json_bytes_response(body, response)
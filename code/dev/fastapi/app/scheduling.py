@@ -0,0 +1,104 @@
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from app.models import ServiceType
+
+# How long each kind of booking occupies its calendar
+SERVICE_DURATIONS = {
+    ServiceType.consultation: timedelta(minutes=60),
+    ServiceType.delivery: timedelta(minutes=120),
+    ServiceType.meeting: timedelta(minutes=60),
+    ServiceType.project: timedelta(minutes=240),
+}
+MAX_SERVICE_DURATION = max(SERVICE_DURATIONS.values())
+
+# Granularity of the start times offered by the availability endpoint
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "30"))
+AVAILABILITY_MAX_DAYS = int(os.getenv("AVAILABILITY_MAX_DAYS", "31"))
+
+
+def service_duration(service_type) -> timedelta:
+    """Duration for a models.ServiceType, schemas.ServiceType or its string value."""
+    value = getattr(service_type, "value", service_type)
+    return SERVICE_DURATIONS[ServiceType(value)]
+
+
+def end_for(service_type, start: datetime) -> datetime:
+    return start + service_duration(service_type)
+
+
+def as_naive_utc(value: datetime) -> datetime:
+    """bookings.scheduled_date is a naive (UTC) timestamp; normalize aware inputs to match."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class IntervalSet:
+    """Sorted, merged half-open intervals with O(log n) overlap queries.
+
+    Used to compute free slots from a day's bookings and to detect conflicts
+    inside a batch before it reaches the database.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]] = ()):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # First interval ending after `start` is the only candidate
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def add(self, start: datetime, end: datetime):
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def gaps(self, window_start: datetime, window_end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Free intervals inside ``[window_start, window_end)``."""
+        free = []
+        cursor = window_start
+        i = bisect_right(self.ends, window_start)
+        while i < len(self.starts) and self.starts[i] < window_end:
+            if self.starts[i] > cursor:
+                free.append((cursor, self.starts[i]))
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < window_end:
+            free.append((cursor, window_end))
+        return free
+
+
+def free_slots(
+    busy: IntervalSet,
+    window_start: datetime,
+    window_end: datetime,
+    duration: timedelta,
+    step: Optional[timedelta] = None,
+) -> List[Tuple[datetime, datetime]]:
+    """Start/end pairs on a ``step`` grid where a booking of ``duration`` fits."""
+    step = step or timedelta(minutes=SLOT_STEP_MINUTES)
+    slots = []
+    for gap_start, gap_end in busy.gaps(window_start, window_end):
+        # Align to the grid, counted from the start of the window
+        offset = (gap_start - window_start) % step
+        start = gap_start if not offset else gap_start + (step - offset)
+        while start + duration <= gap_end:
+            slots.append((start, start + duration))
+            start += step
+    return slots
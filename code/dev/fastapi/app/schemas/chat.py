@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
+from datetime import datetime
 
 class ChatMessageIn(BaseModel):
     message: str
@@ -20,8 +21,10 @@ class ChatHistoryCreate(BaseModel):
     response: str
 
 class ChatHistoryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
-    user_id: int
+    user_id: Optional[int] = None
     message: str
     response: str
-    timestamp: str
\ No newline at end of file
+    timestamp: datetime
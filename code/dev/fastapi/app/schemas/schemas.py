@@ -1,6 +1,6 @@
-from pydantic import BaseModel, field_validator, ConfigDict, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator, ConfigDict, EmailStr
+from typing import Optional, List, Dict
+from datetime import date, datetime
 from enum import Enum
 
 class ServiceType(str, Enum):
@@ -73,10 +73,23 @@ class BookingOut(BaseModel):
     title: Optional[str] = None
     details: str
     scheduled_date: datetime
+    end_date: Optional[datetime] = None
     status: BookingStatus
+    version: int
     created_at: datetime
     updated_at: datetime
 
+class AvailabilitySlot(BaseModel):
+    service_type: ServiceType
+    start: datetime
+    end: datetime
+
+class Availability(BaseModel):
+    start: datetime
+    end: datetime
+    slot_step_minutes: int
+    slots: List[AvailabilitySlot]
+
 class UserOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: int
@@ -88,10 +101,68 @@ class UserOut(BaseModel):
 
 class PaginatedBookings(BaseModel):
     items: List[BookingOut]
-    total: int
+    # total/pages are None when the caller opts out with include_total=false
+    total: Optional[int] = None
     page: int
     per_page: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+BOOKING_BATCH_MAX_ITEMS = 500
+
+class BatchMode(str, Enum):
+    atomic = "atomic"            # all items succeed or none are applied
+    best_effort = "best_effort"  # apply what can be applied, report the rest
+
+class BookingBatchCreate(BaseModel):
+    items: List[BookingCreate] = Field(..., min_length=1, max_length=BOOKING_BATCH_MAX_ITEMS)
+    mode: BatchMode = BatchMode.atomic
+
+class BookingBatchUpdateItem(BookingUpdate):
+    id: int
+
+class BookingBatchUpdate(BaseModel):
+    items: List[BookingBatchUpdateItem] = Field(..., min_length=1, max_length=BOOKING_BATCH_MAX_ITEMS)
+    mode: BatchMode = BatchMode.atomic
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+    booking: Optional[BookingOut] = None
+
+class BatchResult(BaseModel):
+    mode: BatchMode
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+class StatsBucket(str, Enum):
+    day = "day"
+    week = "week"    # weeks start on Monday
+    month = "month"
+
+class StatsScope(str, Enum):
+    user = "user"
+    global_ = "global"
+
+class BookingStatsBucket(BaseModel):
+    start: date
+    total: int
+    by_status: Dict[str, int]
+    by_service_type: Dict[str, int]
+
+class BookingStats(BaseModel):
+    bucket: StatsBucket
+    scope: StatsScope
+    start: date
+    end: date
+    buckets: List[BookingStatsBucket]
 
 class UserBase(BaseModel):
     username: str
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from enum import Enum
+
+class SearchScope(str, Enum):
+    all = "all"
+    bookings = "bookings"
+    chat = "chat"
+
+class SearchHit(BaseModel):
+    kind: str  # "booking" or "chat"
+    id: int
+    rank: float
+    title: Optional[str] = None
+    snippet: str
+    timestamp: Optional[datetime] = None
+
+class SearchResults(BaseModel):
+    items: List[SearchHit]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,82 @@
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Hashable, Iterable, List, Tuple
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Query terms beyond this are ignored, on both the Postgres and in-memory paths
+MAX_QUERY_TERMS = 8
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold()) if text else []
+
+
+def query_terms(q: str) -> List[str]:
+    return tokenize(q)[:MAX_QUERY_TERMS]
+
+
+def prefix_tsquery(terms: List[str]) -> str:
+    """to_tsquery() input where every term must match as a prefix: 'foo:* & bar:*'.
+
+    Terms come from ``tokenize`` (word characters only), so they cannot carry
+    tsquery operators.
+    """
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+class InvertedIndex:
+    """Small in-memory inverted index with prefix matching.
+
+    Stand-in for the Postgres tsvector/GIN search on databases without it
+    (SQLite in tests). Every query term must match some indexed term as a
+    prefix, like a ``term:*`` tsquery joined with ``&``.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)  # term -> {doc key: term frequency}
+        self._vocabulary: List[str] = []   # sorted terms, for prefix ranges
+        self._dirty = False
+        self._docs = 0
+
+    def add(self, key: Hashable, text: str):
+        self._docs += 1
+        for term in tokenize(text):
+            postings = self._postings[term]
+            if not postings:
+                self._dirty = True
+            postings[key] = postings.get(key, 0) + 1
+
+    def add_many(self, docs: Iterable[Tuple[Hashable, str]]):
+        for key, text in docs:
+            self.add(key, text)
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._dirty:
+            self._vocabulary = sorted(self._postings)
+            self._dirty = False
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\U0010ffff")
+        return self._vocabulary[start:end]
+
+    def search(self, terms: List[str]) -> List[Tuple[Hashable, float]]:
+        """(key, score) for documents matching every term, best first."""
+        if not terms or not self._docs:
+            return []
+        scores = None
+        for prefix in terms:
+            matched = defaultdict(float)
+            for term in self._expand(prefix):
+                postings = self._postings[term]
+                idf = math.log(1 + self._docs / len(postings))
+                for key, tf in postings.items():
+                    matched[key] += (1 + math.log(tf)) * idf
+            if scores is None:
+                scores = matched
+            else:
+                scores = {key: score + matched[key] for key, score in scores.items() if key in matched}
+            if not scores:
+                return []
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,18 +1,94 @@
-from passlib.context import CryptContext
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt
+import jwt
 
 SECRET_KEY = "super-secret-key"  # Use env var in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt is CPU bound, so it runs in a bounded pool instead of on the event loop
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+PASSWORD_REHASH_ON_LOGIN = os.getenv("PASSWORD_REHASH_ON_LOGIN", "false").lower() in ("1", "true", "yes")
+
+_pwd_context = None
+
+def get_pwd_context():
+    # passlib and its bcrypt backend load on first use, not at worker import time
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+class HashingSaturated(Exception):
+    """Raised when every hashing worker is busy and the wait queue is full."""
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def password_needs_rehash(hashed_password) -> bool:
+    return get_pwd_context().needs_update(hashed_password)
+
+class _BoundedExecutor:
+    """Executor wrapper that caps in-flight jobs at ``workers + max_queue``."""
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Invalid PASSWORD_HASH_EXECUTOR: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.max_queue:
+            raise HashingSaturated()
+        loop = asyncio.get_running_loop()
+        job = self._get_executor().submit(fn, *args)
+        self.pending += 1
+        # Released when the job itself ends, not when its caller stops waiting:
+        # a cancelled caller leaves a running bcrypt job occupying its worker
+        job.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(job)
+
+    def _release(self, loop):
+        # Runs on a pool thread; count on the event loop's thread
+        try:
+            loop.call_soon_threadsafe(self._job_done)
+        except RuntimeError:  # loop already closed at shutdown
+            pass
+
+    def _job_done(self):
+        self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+hash_executor = _BoundedExecutor(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await hash_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await hash_executor.run(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -22,4 +98,4 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+from typing import List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from app.cache import TTLCache
+from app.schemas.chat import Sentiment
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HF_SENTIMENT_URL = os.getenv(
+    "HF_SENTIMENT_URL",
+    "https://api-inference.huggingface.co/models/distilbert-base-uncased-finetuned-sst-2-english",
+)
+HF_API_TOKEN = os.getenv("HF_API_TOKEN")
+
+SENTIMENT_TIMEOUT_SECONDS = float(os.getenv("SENTIMENT_TIMEOUT_SECONDS", "2.0"))
+SENTIMENT_MAX_CONNECTIONS = int(os.getenv("SENTIMENT_MAX_CONNECTIONS", "20"))
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "4096"))
+SENTIMENT_CACHE_TTL_SECONDS = float(os.getenv("SENTIMENT_CACHE_TTL_SECONDS", "3600"))
+
+# remote (Hugging Face endpoint) | local (in-process model) | off
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "remote").lower()
+# Model file for the local backend (see app/sentiment_model.py); without one
+# the local backend builds a model from the seed lexicon
+SENTIMENT_MODEL_PATH = os.getenv("SENTIMENT_MODEL_PATH")
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for a message: case-folded with collapsed whitespace."""
+    return " ".join(text.casefold().split())
+
+
+class SentimentBackend:
+    """Sentiment engine interface; this base class is the "off" backend."""
+
+    name = "off"
+
+    async def start(self):
+        """Load models or open connections before the first request."""
+
+    async def analyze(self, text: str) -> Optional[Sentiment]:
+        return None
+
+    async def analyze_many(self, texts: Sequence[str]) -> List[Optional[Sentiment]]:
+        return [await self.analyze(text) for text in texts]
+
+    async def aclose(self):
+        pass
+
+
+class SentimentClient(SentimentBackend):
+    """Async client for the remote sentiment endpoint.
+
+    One pooled ``httpx.AsyncClient`` is shared by all requests, every call is
+    bounded by a deadline, and results are cached on the normalized message
+    text. Concurrent lookups of the same text share a single network call.
+    """
+
+    name = "remote"
+
+    def __init__(
+        self,
+        url: str = HF_SENTIMENT_URL,
+        api_token: Optional[str] = HF_API_TOKEN,
+        timeout: float = SENTIMENT_TIMEOUT_SECONDS,
+        max_connections: int = SENTIMENT_MAX_CONNECTIONS,
+        cache_size: int = SENTIMENT_CACHE_SIZE,
+        cache_ttl: float = SENTIMENT_CACHE_TTL_SECONDS,
+    ):
+        self.url = url
+        self.api_token = api_token
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._inflight = {}
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # Imported on first use so workers that never chat do not pay for it
+            import httpx
+
+            headers = {"Authorization": f"Bearer {self.api_token}"} if self.api_token else {}
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def analyze(self, text: str) -> Optional[Sentiment]:
+        key = normalize_text(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, text))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so a cancelled request does not abort the call for the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, text: str) -> Optional[Sentiment]:
+        try:
+            response = await asyncio.wait_for(
+                self._get_client().post(self.url, json={"inputs": text}),
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            result = response.json()
+            sentiment = Sentiment(label=result[0][0]["label"].lower(), score=result[0][0]["score"])
+        except Exception as e:
+            logger.warning(f"Sentiment analysis failed: {e!r}")
+            return None
+        self.cache.set(key, sentiment)
+        return sentiment
+
+    async def analyze_many(self, texts: Sequence[str]) -> List[Optional[Sentiment]]:
+        return list(await asyncio.gather(*(self.analyze(text) for text in texts)))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LocalSentiment(SentimentBackend):
+    """In-process hashed n-gram model: microseconds per message, no network.
+
+    Scoring is synchronous NumPy work well below a millisecond even for
+    batches of hundreds of messages, so it runs on the event loop.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path: Optional[str] = SENTIMENT_MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+
+    def load(self):
+        # Imported here so that NumPy is only loaded by workers using this backend
+        from app.sentiment_model import HashedLinearModel
+
+        if self.model_path and os.path.exists(self.model_path):
+            self.model = HashedLinearModel.load(self.model_path)
+            logger.info(f"Loaded sentiment model from {self.model_path}")
+        else:
+            if self.model_path:
+                logger.warning(f"Sentiment model {self.model_path} not found, using the seed lexicon")
+            self.model = HashedLinearModel.from_lexicon()
+
+    async def start(self):
+        if self.model is None:
+            self.load()
+
+    def score(self, texts: Sequence[str]) -> List[Sentiment]:
+        if self.model is None:
+            self.load()
+        return [Sentiment(label=label, score=score) for label, score in self.model.predict(texts)]
+
+    async def analyze(self, text: str) -> Optional[Sentiment]:
+        return self.score([text])[0]
+
+    async def analyze_many(self, texts: Sequence[str]) -> List[Optional[Sentiment]]:
+        return self.score(texts) if texts else []
+
+
+def make_backend(name: str = SENTIMENT_BACKEND) -> SentimentBackend:
+    if name == "remote":
+        return SentimentClient()
+    if name == "local":
+        return LocalSentiment()
+    if name == "off":
+        return SentimentBackend()
+    raise ValueError(f"Unknown SENTIMENT_BACKEND {name!r}; expected remote, local or off")
+
+
+sentiment_backend = make_backend()
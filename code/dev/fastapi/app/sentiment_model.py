@@ -0,0 +1,222 @@
+import math
+import re
+import zlib
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# 2**18 weights: a dense float32 vector of 1 MiB in memory, far less on disk
+DEFAULT_FEATURES = 1 << 18
+MODEL_FORMAT_VERSION = 1
+
+_TOKEN = re.compile(r"[\w']+", re.UNICODE)
+NEGATIONS = frozenset({"not", "no", "never", "don't", "dont", "didn't", "didnt", "isn't", "isnt",
+                       "wasn't", "wasnt", "can't", "cant", "won't", "wont", "nothing", "hardly"})
+
+# Seed lexicon for building a model without training data. Weights are log-odds
+# contributions; negated words ("not good") get the opposite sign.
+LEXICON = {
+    # positive
+    "good": 1.5, "great": 2.0, "excellent": 2.5, "amazing": 2.5, "awesome": 2.5, "perfect": 2.5,
+    "love": 2.0, "loved": 2.0, "like": 0.8, "liked": 1.0, "nice": 1.2, "happy": 1.8, "glad": 1.5,
+    "thanks": 1.2, "thank": 1.2, "helpful": 1.8, "friendly": 1.5, "fast": 1.0, "quick": 1.0,
+    "easy": 1.0, "recommend": 1.5, "satisfied": 1.8, "wonderful": 2.2, "fantastic": 2.3,
+    "best": 1.8, "smooth": 1.2, "pleased": 1.6, "appreciate": 1.5, "resolved": 1.2, "works": 0.8,
+    "polite": 1.2, "professional": 1.2, "reliable": 1.4, "punctual": 1.2, "ok": 0.3,
+    "fine": 0.4, "beautiful": 1.8, "enjoyed": 1.8, "impressive": 1.8, "convenient": 1.2,
+    # negative
+    "bad": -1.8, "terrible": -2.5, "awful": -2.5, "horrible": -2.5, "worst": -2.5, "poor": -1.6,
+    "hate": -2.2, "hated": -2.2, "angry": -2.0, "upset": -1.8, "disappointed": -2.0,
+    "disappointing": -2.0, "slow": -1.2, "late": -1.2, "delay": -1.0, "delayed": -1.3,
+    "broken": -1.8, "wrong": -1.5, "problem": -1.0, "issue": -0.8, "error": -1.0, "fail": -1.6,
+    "failed": -1.6, "cancel": -0.6, "cancelled": -0.8, "refund": -0.8, "rude": -2.2,
+    "useless": -2.2, "unhelpful": -2.0, "annoying": -1.8, "frustrated": -2.0, "frustrating": -2.0,
+    "complaint": -1.5, "expensive": -0.8, "never": -0.6, "unacceptable": -2.3, "waste": -2.0,
+    "confusing": -1.3, "difficult": -1.0, "missing": -1.0, "lost": -1.0, "sad": -1.5, "worse": -2.0,
+}
+
+
+def _hash(feature: str, n_features: int) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % n_features
+
+
+def features(text: str) -> List[str]:
+    """Unigrams and bigrams; tokens after a negation carry a ``not_`` mark up to the next punctuation."""
+    feats = []
+    for clause in re.split(r"[.,;:!?]+", text.casefold()):
+        tokens = _TOKEN.findall(clause)
+        negated = False
+        previous = None
+        for token in tokens:
+            feats.append(f"not_{token}" if negated else token)
+            if previous is not None:
+                feats.append(f"{previous} {token}")
+            if token in NEGATIONS:
+                negated = True
+            previous = token
+    return feats
+
+
+class HashedLinearModel:
+    """Logistic regression over hashed word n-grams, scored with NumPy.
+
+    The model is one weight per hash bucket plus a bias; a message's score is
+    the sum of the weights its features hash to. Batches are scored with a
+    single gather and ``np.add.reduceat`` over the concatenated indices.
+    """
+
+    def __init__(self, weights, bias: float = 0.0):
+        self.weights = weights
+        self.bias = float(bias)
+        self.n_features = len(weights)
+
+    @classmethod
+    def from_lexicon(cls, lexicon: Dict[str, float] = LEXICON, n_features: int = DEFAULT_FEATURES):
+        import numpy as np
+
+        weights = np.zeros(n_features, dtype=np.float32)
+        for word, weight in lexicon.items():
+            weights[_hash(word, n_features)] += weight
+            weights[_hash(f"not_{word}", n_features)] -= weight
+        return cls(weights)
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        n_features: int = DEFAULT_FEATURES,
+        epochs: int = 5,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        batch_size: int = 256,
+        seed: int = 0,
+    ):
+        """Fit on (text, label) pairs, label 1 positive / 0 negative, with minibatch SGD."""
+        import numpy as np
+
+        indices, offsets = cls._encode(texts, n_features)
+        y = np.asarray(labels, dtype=np.float32)
+        model = cls(np.zeros(n_features, dtype=np.float32))
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                rows = [indices[offsets[i]:offsets[i + 1]] for i in batch]
+                lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+                flat = np.concatenate(rows) if len(rows) else np.empty(0, dtype=np.int64)
+                z = model._logits(flat, lengths)
+                error = (1.0 / (1.0 + np.exp(-z)) - y[batch]).astype(np.float32)
+                step = learning_rate / len(batch)
+                np.add.at(model.weights, flat, -step * np.repeat(error, lengths))
+                model.weights *= np.float32(1.0 - learning_rate * l2)
+                model.bias -= step * float(error.sum())
+        return model
+
+    @staticmethod
+    def _encode(texts: Iterable[str], n_features: int):
+        import numpy as np
+
+        rows = [[_hash(f, n_features) for f in features(text)] for text in texts]
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        flat = np.fromiter((i for r in rows for i in r), dtype=np.int64, count=int(offsets[-1]))
+        return flat, offsets
+
+    def save(self, path: str):
+        """Store only the non-zero weights, as float16, in a compressed .npz."""
+        import numpy as np
+
+        nonzero = np.flatnonzero(self.weights).astype(np.uint32)
+        np.savez_compressed(
+            path,
+            format_version=np.int32(MODEL_FORMAT_VERSION),
+            n_features=np.int64(self.n_features),
+            bias=np.float32(self.bias),
+            indices=nonzero,
+            values=self.weights[nonzero].astype(np.float16),
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        import numpy as np
+
+        with np.load(path) as data:
+            if int(data["format_version"]) != MODEL_FORMAT_VERSION:
+                raise ValueError(f"Unsupported sentiment model format in {path}")
+            weights = np.zeros(int(data["n_features"]), dtype=np.float32)
+            weights[data["indices"]] = data["values"].astype(np.float32)
+            return cls(weights, float(data["bias"]))
+
+    def _logits(self, flat, lengths):
+        import numpy as np
+
+        sums = np.zeros(len(lengths), dtype=np.float32)
+        nonempty = lengths > 0
+        if nonempty.any():
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+            sums[nonempty] = np.add.reduceat(self.weights[flat], starts)
+        return sums + np.float32(self.bias)
+
+    def predict_proba(self, texts: Sequence[str]):
+        """Probability that each text is positive, as a float32 array."""
+        import numpy as np
+
+        if len(texts) == 1:
+            # Skip the batch bookkeeping, which dominates for a single message
+            indices = [_hash(f, self.n_features) for f in features(texts[0])]
+            z = self.bias + (float(self.weights[indices].sum()) if indices else 0.0)
+            return np.array([1.0 / (1.0 + math.exp(-z))], dtype=np.float32)
+        flat, offsets = self._encode(texts, self.n_features)
+        z = self._logits(flat, np.diff(offsets))
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(label, confidence) per text, labelled like the remote endpoint."""
+        return [
+            ("positive", float(p)) if p >= 0.5 else ("negative", float(1.0 - p))
+            for p in self.predict_proba(texts)
+        ]
+
+
+def read_labeled(path: str) -> Tuple[List[str], List[int]]:
+    """Tab-separated ``text<TAB>label`` lines; label is 1/0 or positive/negative. A header line is skipped."""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            text, _, label = line.rstrip("\n").rpartition("\t")
+            label = label.strip().lower()
+            if label in ("1", "positive", "pos"):
+                labels.append(1)
+            elif label in ("0", "negative", "neg"):
+                labels.append(0)
+            else:
+                continue
+            texts.append(text)
+    return texts, labels
+
+
+def accuracy(model: HashedLinearModel, texts: Sequence[str], labels: Sequence[int]) -> float:
+    probabilities = model.predict_proba(texts)
+    correct = sum(int(p >= 0.5) == label for p, label in zip(probabilities, labels))
+    return correct / len(labels) if labels else math.nan
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the local sentiment model file")
+    parser.add_argument("--out", required=True, help="output .npz path (SENTIMENT_MODEL_PATH)")
+    parser.add_argument("--train", help="labeled TSV to train on; without it the seed lexicon is used")
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES)
+    parser.add_argument("--epochs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.train:
+        texts, labels = read_labeled(args.train)
+        model = HashedLinearModel.train(texts, labels, n_features=args.features, epochs=args.epochs)
+        print(f"trained on {len(texts)} examples, training accuracy {accuracy(model, texts, labels):.3f}")
+    else:
+        model = HashedLinearModel.from_lexicon(n_features=args.features)
+    model.save(args.out)
+    print(f"wrote {args.out}")
@@ -0,0 +1,112 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.cache import TTLCache
+from app.metrics import Counter
+
+READ_COALESCING = os.getenv("READ_COALESCING", "true").lower() in ("1", "true", "yes")
+# Keep coalesced results this long after the load finishes; 0 only shares in-flight loads
+READ_MICROCACHE_TTL_SECONDS = float(os.getenv("READ_MICROCACHE_TTL_SECONDS", "0"))
+READ_MICROCACHE_MAX_ENTRIES = int(os.getenv("READ_MICROCACHE_MAX_ENTRIES", "4096"))
+# Owners whose generation is remembered, and for how long after their last write
+READ_GENERATIONS_MAX_OWNERS = int(os.getenv("READ_GENERATIONS_MAX_OWNERS", "100000"))
+READ_GENERATIONS_TTL_SECONDS = float(os.getenv("READ_GENERATIONS_TTL_SECONDS", "3600"))
+
+READ_LOADS = Counter("read_loads_total", "Coalescable reads that ran their query, by route", ("route",))
+READ_SHARED = Counter(
+    "read_shared_total", "Coalescable reads served from another request's load, by route and source", ("route", "source")
+)
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Concurrent identical reads share one load, optionally cached briefly.
+
+    Calls are keyed on (owner, generation, key), where the key names the
+    route and its normalized parameters. The first caller starts the load
+    in a task of its own, so a caller that disconnects does not cancel it
+    for the others waiting on it.
+
+    ``invalidate(owner)`` bumps the owner's generation: later calls get a
+    new key and never join a load that may predate the write, and such a
+    load's result is not cached.
+
+    Generations are kept in a bounded cache. When an owner's entry is
+    evicted its generation falls back to 0, so its cached values are dropped
+    and its in-flight loads detached first: a pre-write result can neither
+    be cached nor joined under the reused key.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = READ_COALESCING,
+        ttl: float = READ_MICROCACHE_TTL_SECONDS,
+        maxsize: int = READ_MICROCACHE_MAX_ENTRIES,
+        max_owners: int = READ_GENERATIONS_MAX_OWNERS,
+    ):
+        self.enabled = enabled
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._generations = TTLCache(
+            maxsize=max_owners, ttl=READ_GENERATIONS_TTL_SECONDS, on_evict=lambda owner, _: self._forget(owner)
+        )
+
+    def generation(self, owner: Hashable) -> int:
+        return self._generations.get(owner, 0)
+
+    def invalidate(self, owner: Hashable):
+        self._generations.set(owner, self.generation(owner) + 1)
+        self.cache.discard_where(lambda key, _: key[0] == owner)
+
+    def _forget(self, owner: Hashable):
+        self.cache.discard_where(lambda key, _: key[0] == owner)
+        for full_key in [key for key in self._inflight if key[0] == owner]:
+            del self._inflight[full_key]
+
+    async def do(self, owner: Hashable, key: Tuple, load: Callable[[], Awaitable[Any]]) -> Any:
+        route = key[0]
+        if not self.enabled:
+            READ_LOADS.inc(1, route)
+            return await load()
+
+        full_key = (owner, self.generation(owner), key)
+        value = self.cache.get(full_key, _MISSING)
+        if value is not _MISSING:
+            READ_SHARED.inc(1, route, "cache")
+            return value
+
+        task = self._inflight.get(full_key)
+        if task is None:
+            READ_LOADS.inc(1, route)
+            task = asyncio.ensure_future(self._load(full_key, load))
+            self._inflight[full_key] = task
+            task.add_done_callback(lambda done: self._finished(full_key, done))
+        else:
+            READ_SHARED.inc(1, route, "in_flight")
+        return await asyncio.shield(task)
+
+    async def _load(self, full_key: Tuple, load: Callable[[], Awaitable[Any]]) -> Any:
+        value = await load()
+        owner, generation, _ = full_key
+        # A detached load may have been replaced under the same key
+        if generation == self.generation(owner) and self._inflight.get(full_key) is asyncio.current_task():
+            self.cache.set(full_key, value)
+        return value
+
+    def _finished(self, full_key: Tuple, task: asyncio.Future):
+        if self._inflight.get(full_key) is task:
+            del self._inflight[full_key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "cached": len(self.cache),
+            "owners": len(self._generations),
+            "ttl": self.cache.ttl,
+        }
+
+
+# Per-user reads of bookings and the profile; owner is the user id
+read_coalescer = SingleFlight()
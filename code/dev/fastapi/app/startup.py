@@ -0,0 +1,94 @@
+"""Schema handling at worker startup.
+
+STARTUP_SCHEMA_MODE picks what the lifespan does with the database schema:
+
+    create_all  create missing tables from the models (local development)
+    verify      require the database to be at the Alembic head revision, fail fast otherwise
+    skip        touch nothing; migrations are someone else's job
+
+The default is create_all when APP_ENV=development and verify everywhere else.
+
+create_all does not record an Alembic revision, so a database it built fails
+verify and `alembic upgrade head` (the tables already exist). To adopt such a
+database into migrations, stamp it once at the head its tables were built
+from, then upgrade as usual:
+
+    alembic stamp head
+"""
+import logging
+import os
+import resource
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import text
+from app.db import Base
+
+logger = logging.getLogger(__name__)
+
+APP_ENV = os.getenv("APP_ENV", "production").lower()
+
+STARTUP_SCHEMA_MODE = os.getenv(
+    "STARTUP_SCHEMA_MODE", "create_all" if APP_ENV == "development" else "verify"
+).lower()
+
+_ADOPT_HINT = "run `alembic upgrade head` (or `alembic stamp head` if create_all built this schema)"
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+class SchemaMismatch(RuntimeError):
+    """Raised in verify mode when the database is not at the expected revision."""
+
+
+class StartupTimer:
+    """Wall-clock breakdown of worker startup, by phase."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def report(self) -> str:
+        total = sum(self.phases.values())
+        parts = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+        return f"total={total * 1000:.1f}ms ({parts}), max_rss={max_rss_mb():.1f}MB"
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if os.uname().sysname == "Darwin" else rss / 1024
+
+
+def alembic_heads() -> set:
+    # Alembic is only needed for verify mode, so it is not imported at module load
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+
+
+async def prepare_schema(conn, mode: str = STARTUP_SCHEMA_MODE):
+    if mode == "create_all":
+        await conn.run_sync(Base.metadata.create_all)
+        logger.info("Database tables created successfully")
+    elif mode == "verify":
+        expected = alembic_heads()
+        try:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars().all())
+        except Exception as e:
+            raise SchemaMismatch(f"No alembic_version table ({e.__class__.__name__}); {_ADOPT_HINT}") from e
+        if current != expected:
+            raise SchemaMismatch(
+                f"Database is at revision {sorted(current)}, code expects {sorted(expected)}; {_ADOPT_HINT}"
+            )
+        logger.info(f"Database schema at Alembic head {sorted(current)}")
+    elif mode != "skip":
+        raise ValueError(f"Invalid STARTUP_SCHEMA_MODE: {mode}")
@@ -0,0 +1,107 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.metrics import Counter, Gauge
+from app.responses import dumps
+
+CHAT_STREAM_MAX_CONNECTIONS = int(os.getenv("CHAT_STREAM_MAX_CONNECTIONS", "500"))
+CHAT_STREAM_MAX_PER_USER = int(os.getenv("CHAT_STREAM_MAX_PER_USER", "4"))
+# A client that cannot take a single event within this long is disconnected
+CHAT_STREAM_SEND_TIMEOUT_SECONDS = float(os.getenv("CHAT_STREAM_SEND_TIMEOUT_SECONDS", "10"))
+
+STREAM_CONNECTIONS = Gauge("chat_stream_connections", "Open streaming chat connections")
+STREAM_REJECTED = Counter(
+    "chat_stream_rejected_total", "Streaming chat connections refused or dropped, by reason", ("reason",)
+)
+
+
+class SlowClient(Exception):
+    """Raised when a client did not accept an event within the send timeout."""
+
+
+class ConnectionLimiter:
+    """Caps concurrent long-lived connections, overall and per user.
+
+    Unlike admission control nothing waits here: a connection over either
+    cap is refused at once, since a stream may stay open for minutes.
+    """
+
+    def __init__(self, limit: int, per_user: int):
+        self.limit = limit
+        self.per_user = per_user
+        self.open = 0
+        self._by_user: Dict[Any, int] = {}
+
+    def try_acquire(self, user_id) -> Optional[str]:
+        """None once admitted, otherwise the reason ("server_full" or "user_full")."""
+        if self.open >= self.limit:
+            return "server_full"
+        held = self._by_user.get(user_id, 0)
+        if held >= self.per_user:
+            return "user_full"
+        self.open += 1
+        self._by_user[user_id] = held + 1
+        STREAM_CONNECTIONS.inc(1)
+        return None
+
+    def release(self, user_id):
+        self.open -= 1
+        held = self._by_user.pop(user_id, 1) - 1
+        if held:
+            self._by_user[user_id] = held
+        STREAM_CONNECTIONS.dec(1)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "per_user": self.per_user, "open": self.open}
+
+
+stream_connections = ConnectionLimiter(CHAT_STREAM_MAX_CONNECTIONS, CHAT_STREAM_MAX_PER_USER)
+
+
+async def send_within(awaitable, timeout: float = CHAT_STREAM_SEND_TIMEOUT_SECONDS):
+    """Await one send, raising SlowClient if the client stopped reading."""
+    try:
+        await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        STREAM_REJECTED.inc(1, "slow_client")
+        raise SlowClient()
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Event; the JSON payload never contains a newline."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class EventStreamResponse(StreamingResponse):
+    """``text/event-stream`` response with a deadline on every send.
+
+    Events are produced only as fast as the client reads them, so a slow
+    reader holds at most one event plus the socket buffers; one that stops
+    reading altogether is dropped after the send timeout. ``on_close`` runs
+    however the stream ends, including when it never started.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, content, on_close=None, send_timeout: float = CHAT_STREAM_SEND_TIMEOUT_SECONDS, **kwargs):
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers.update(kwargs.pop("headers", None) or {})
+        super().__init__(content, headers=headers, **kwargs)
+        self.on_close = on_close
+        self.send_timeout = send_timeout
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+    async def stream_response(self, send):
+        async def timed_send(message):
+            await send_within(send(message), self.send_timeout)
+
+        await super().stream_response(timed_send)
@@ -0,0 +1,410 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app import models
+from app.db import SessionLocal
+from app.embeddings import from_bytes, get_encoder
+
+logger = logging.getLogger(__name__)
+
+CHAT_EMBEDDINGS = os.getenv("CHAT_EMBEDDINGS", "true").lower() in ("1", "true", "yes")
+# Directory for the persisted index; workers memory-map it at startup instead of
+# rebuilding from the database. Unset keeps the index in memory only.
+CHAT_VECTOR_INDEX_PATH = os.getenv("CHAT_VECTOR_INDEX_PATH")
+# Snapshot layout under CHAT_VECTOR_INDEX_PATH: MANIFEST names the current
+# snapshot directory; WRITER_LOCK is held by the one process allowed to save
+MANIFEST = "MANIFEST.json"
+SNAPSHOT_PREFIX = "snapshot-"
+WRITER_LOCK = "writer.lock"
+# How often to pick up rows written by other workers or the write-behind queue
+CHAT_VECTOR_SYNC_SECONDS = float(os.getenv("CHAT_VECTOR_SYNC_SECONDS", "5"))
+# IVF partitioning: 0 lists keeps exact brute-force search
+CHAT_VECTOR_IVF_LISTS = int(os.getenv("CHAT_VECTOR_IVF_LISTS", "0"))
+CHAT_VECTOR_IVF_NPROBE = int(os.getenv("CHAT_VECTOR_IVF_NPROBE", "8"))
+# Candidate sets smaller than this are always scanned exactly
+IVF_MIN_CANDIDATES = 20_000
+SYNC_BATCH = 10_000
+# Rows with ids this far below the newest indexed id are re-checked on sync,
+# since ids can commit out of order
+SYNC_OVERLAP = 1_000
+
+
+class VectorIndex:
+    """In-memory nearest-neighbour index over unit-norm float32 vectors.
+
+    Similarity is the dot product (cosine for normalized vectors), computed
+    as one matrix-vector product over the candidate rows. Rows are appended
+    incrementally into arrays grown by doubling; per-user row lists let a
+    search scan only one user's vectors. Optional IVF partitioning (spherical
+    k-means) restricts large scans to the ``nprobe`` closest partitions.
+    """
+
+    ARRAYS = ("vectors", "ids", "user_ids", "centroids", "assign")
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        import numpy as np
+
+        self.dim = dim
+        self.size = 0
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.user_ids = np.zeros(capacity, dtype=np.int64)
+        self.centroids = None
+        self.assign = None
+        # user id -> row numbers; arrays are built lazily for search and dropped on insert
+        self._user_rows: Dict[int, List[int]] = {}
+        self._user_rows_cache: Dict[int, object] = {}
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def max_id(self) -> int:
+        return int(self.ids[:self.size].max()) if self.size else 0
+
+    def _reserve(self, extra: int):
+        import numpy as np
+
+        needed = self.size + extra
+        capacity = max(len(self.ids), 1)
+        if needed <= capacity and self.vectors.flags.writeable:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Also copies memory-mapped (read-only) arrays into memory on first insert
+        for name in ("vectors", "ids", "user_ids", "assign"):
+            current = getattr(self, name)
+            if current is None:
+                continue
+            grown = np.zeros((capacity,) + current.shape[1:], dtype=current.dtype)
+            grown[:self.size] = current[:self.size]
+            setattr(self, name, grown)
+
+    def add(self, ids, user_ids, vectors):
+        """Append rows; ``user_ids`` may contain None (stored as -1)."""
+        import numpy as np
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        n = len(vectors)
+        if not n:
+            return
+        self._reserve(n)
+        start, end = self.size, self.size + n
+        self.vectors[start:end] = vectors
+        self.ids[start:end] = ids
+        self.user_ids[start:end] = [-1 if u is None else u for u in user_ids]
+        if self.centroids is not None:
+            self.assign[start:end] = np.argmax(vectors @ self.centroids.T, axis=1)
+        for row, user_id in zip(range(start, end), self.user_ids[start:end].tolist()):
+            rows = self._user_rows.get(user_id)
+            if rows is None:
+                loaded = self._user_rows_cache.get(user_id)
+                rows = self._user_rows[user_id] = loaded.tolist() if loaded is not None else []
+            rows.append(row)
+            self._user_rows_cache.pop(user_id, None)
+        self.size = end
+
+    def contains_recent(self, ids, window: int) -> List[bool]:
+        """Whether each id is among the last ``window`` rows added (for sync de-duplication)."""
+        import numpy as np
+
+        recent = self.ids[max(0, self.size - window):self.size]
+        return np.isin(np.asarray(ids, dtype=np.int64), recent).tolist()
+
+    def _rows_for_user(self, user_id: int):
+        import numpy as np
+
+        rows = self._user_rows_cache.get(user_id)
+        if rows is None:
+            rows = np.asarray(self._user_rows.get(user_id, ()), dtype=np.int64)
+            self._user_rows_cache[user_id] = rows
+        return rows
+
+    def build_ivf(self, n_lists: int, iterations: int = 10, sample: int = 100_000, seed: int = 0):
+        """Partition the vectors with spherical k-means trained on a sample."""
+        import numpy as np
+
+        if self.size < n_lists:
+            return
+        rng = np.random.default_rng(seed)
+        data = self.vectors[:self.size]
+        train = data[rng.choice(self.size, size=min(sample, self.size), replace=False)]
+        centroids = train[rng.choice(len(train), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, train)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty partitions keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.assign = np.zeros(len(self.ids), dtype=np.int32)
+        for start in range(0, self.size, 65_536):
+            chunk = data[start:start + 65_536]
+            self.assign[start:start + len(chunk)] = np.argmax(chunk @ self.centroids.T, axis=1)
+
+    def search(
+        self,
+        query,
+        k: int = 10,
+        user_id: Optional[int] = None,
+        nprobe: int = CHAT_VECTOR_IVF_NPROBE,
+    ) -> List[Tuple[int, float]]:
+        """(id, similarity) of the ``k`` most similar rows, best first, optionally one user's only."""
+        import numpy as np
+
+        if not self.size:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        rows = self._rows_for_user(user_id) if user_id is not None else None
+        candidates = self.size if rows is None else len(rows)
+        if self.centroids is not None and candidates >= IVF_MIN_CANDIDATES:
+            probes = np.argpartition(-(self.centroids @ query), min(nprobe, len(self.centroids)) - 1)[:nprobe]
+            assign = self.assign[:self.size] if rows is None else self.assign[rows]
+            selected = np.flatnonzero(np.isin(assign, probes))
+            rows = selected if rows is None else rows[selected]
+        if rows is None:
+            scores = self.vectors[:self.size] @ query
+        elif not len(rows):
+            return []
+        else:
+            scores = self.vectors[rows] @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hit_rows = top if rows is None else rows[top]
+        return list(zip(self.ids[hit_rows].tolist(), scores[top].tolist()))
+
+    def _arrays(self) -> Dict[str, object]:
+        arrays = {name: getattr(self, name) for name in self.ARRAYS if getattr(self, name) is not None}
+        return {name: value if name == "centroids" else value[:self.size] for name, value in arrays.items()}
+
+    def save(self, path: str) -> str:
+        """Write a new snapshot under ``path`` and point the manifest at it; returns its name.
+
+        The arrays go to a temporary directory that is renamed into place whole,
+        then the manifest is replaced with a single rename, so a reader sees
+        either the previous snapshot or this one, never a mix of the two.
+        Only one process may save into a given ``path`` (see ChatVectorIndex).
+        """
+        import numpy as np
+
+        os.makedirs(path, exist_ok=True)
+        previous = read_manifest(path)
+        version = f"{SNAPSHOT_PREFIX}{time.time_ns()}"
+        staging = os.path.join(path, f".{version}.tmp")
+        os.makedirs(staging)
+        arrays = self._arrays()
+        for name, value in arrays.items():
+            with open(os.path.join(staging, f"{name}.npy"), "wb") as f:
+                np.save(f, value)
+                f.flush()
+                os.fsync(f.fileno())
+        os.rename(staging, os.path.join(path, version))
+
+        manifest = {"version": version, "size": self.size, "dim": self.dim, "arrays": sorted(arrays)}
+        tmp = os.path.join(path, f"{MANIFEST}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, MANIFEST))
+
+        # Workers may still have the previous snapshot mapped, so it is kept until the next save
+        keep = {version, previous["version"] if previous else None}
+        for entry in os.listdir(path):
+            if entry.lstrip(".").startswith(SNAPSHOT_PREFIX) and entry not in keep:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+        return version
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """Open the snapshot the manifest points at; with ``mmap`` the arrays are mapped, not read.
+
+        Raises ValueError when the arrays do not agree with the manifest or with each other.
+        """
+        import numpy as np
+
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"No vector index manifest in {path}")
+        size, dim, names = manifest["size"], manifest["dim"], set(manifest["arrays"])
+        if not {"vectors", "ids", "user_ids"} <= names or ("centroids" in names) != ("assign" in names):
+            raise ValueError(f"Vector index snapshot {manifest['version']} has arrays {sorted(names)}")
+        snapshot = os.path.join(path, manifest["version"])
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(snapshot, f"{name}.npy"), mmap_mode=None if name == "centroids" else mode)
+            for name in names
+        }
+        expected = {"vectors": (size, dim), "ids": (size,), "user_ids": (size,), "assign": (size,)}
+        if "centroids" in arrays:
+            expected["centroids"] = (arrays["centroids"].shape[0], dim)
+        for name, value in arrays.items():
+            if value.shape != expected[name]:
+                raise ValueError(
+                    f"Vector index snapshot {manifest['version']}: {name} has shape {value.shape}, expected {expected[name]}"
+                )
+
+        index = cls(dim, capacity=1)
+        for name, value in arrays.items():
+            setattr(index, name, value)
+        index.size = size
+        order = np.argsort(index.user_ids, kind="stable")
+        users, starts = np.unique(index.user_ids[order], return_index=True)
+        for user_id, rows in zip(users.tolist(), np.split(order, starts[1:])):
+            index._user_rows_cache[user_id] = rows
+        return index
+
+
+def read_manifest(path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ChatVectorIndex:
+    """Process-wide index of chat message embeddings, kept in sync with chat_history.
+
+    With a ``path``, every worker loads the current snapshot at startup, but
+    only the first to start holds the writer lock and saves one when it stops.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        enabled: bool = CHAT_EMBEDDINGS,
+        path: Optional[str] = CHAT_VECTOR_INDEX_PATH,
+        sync_interval: float = CHAT_VECTOR_SYNC_SECONDS,
+        ivf_lists: int = CHAT_VECTOR_IVF_LISTS,
+    ):
+        self.enabled = enabled
+        self.path = path
+        self.sync_interval = sync_interval
+        self.ivf_lists = ivf_lists
+        self.index: Optional[VectorIndex] = None
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._writer_lock = None
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def start(self):
+        if not self.enabled or self.index is not None:
+            return
+        encoder = get_encoder()
+        if self.path:
+            self._claim_writer()
+            if read_manifest(self.path) is not None:
+                try:
+                    self.index = VectorIndex.load(self.path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring vector index at {self.path}: {e}")
+            if self.index is not None and self.index.dim != encoder.dim:
+                logger.warning(f"Ignoring vector index at {self.path}: dimension {self.index.dim} != {encoder.dim}")
+                self.index = None
+        if self.index is None:
+            self.index = VectorIndex(encoder.dim)
+        await self.sync()
+        if self.ivf_lists and self.index.centroids is None:
+            self.index.build_ivf(self.ivf_lists)
+        logger.info(f"Chat vector index ready with {len(self.index)} vectors")
+        if self.sync_interval > 0:
+            self._task = asyncio.create_task(self._run(), name="chat-vector-sync")
+
+    @property
+    def is_writer(self) -> bool:
+        return self._writer_lock is not None
+
+    def _claim_writer(self):
+        """Become the one process that saves snapshots, if no other process already is"""
+        import fcntl
+
+        os.makedirs(self.path, exist_ok=True)
+        handle = open(os.path.join(self.path, WRITER_LOCK), "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return
+        self._writer_lock = handle
+
+    async def sync(self) -> int:
+        """Add chat_history rows not yet indexed; rows stored without an embedding are encoded here."""
+        encoder = get_encoder()
+        added = 0
+        after = max(0, self.index.max_id - SYNC_OVERLAP)
+        async with self._session_factory() as session:
+            while True:
+                rows = (await session.execute(
+                    select(
+                        models.ChatHistory.id, models.ChatHistory.user_id,
+                        models.ChatHistory.message, models.ChatHistory.embedding,
+                    )
+                    .where(models.ChatHistory.id > after)
+                    .order_by(models.ChatHistory.id)
+                    .limit(SYNC_BATCH)
+                )).all()
+                if not rows:
+                    break
+                after = rows[-1].id
+                seen = self.index.contains_recent([row.id for row in rows], SYNC_OVERLAP + SYNC_BATCH)
+                rows = [row for row, present in zip(rows, seen) if not present]
+                if rows:
+                    missing = [row.message for row in rows if row.embedding is None]
+                    encoded = iter(encoder.encode_many(missing)) if missing else iter(())
+                    vectors = [
+                        from_bytes(row.embedding) if row.embedding is not None else next(encoded)
+                        for row in rows
+                    ]
+                    self.index.add([row.id for row in rows], [row.user_id for row in rows], vectors)
+                    added += len(rows)
+        return added
+
+    def add(self, row_id: int, user_id: Optional[int], vector):
+        if self.index is not None:
+            self.index.add([row_id], [user_id], [vector])
+
+    def search(self, vector, k: int, user_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        if self.index is None:
+            return []
+        return self.index.search(vector, k, user_id=user_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Chat vector index sync failed: {e!r}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer_lock is not None:
+            try:
+                if self.index is not None:
+                    self.index.save(self.path)
+            finally:
+                # Closing the file releases the lock
+                self._writer_lock.close()
+                self._writer_lock = None
+
+
+chat_vector_index = ChatVectorIndex()
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from app.db import SessionLocal
+from app import models
+
+logger = logging.getLogger(__name__)
+
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+CHAT_WRITE_BEHIND_MAX_BATCH = int(os.getenv("CHAT_WRITE_BEHIND_MAX_BATCH", "500"))
+CHAT_WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITE_BEHIND_FLUSH_INTERVAL", "0.05"))
+CHAT_WRITE_BEHIND_MAX_QUEUE = int(os.getenv("CHAT_WRITE_BEHIND_MAX_QUEUE", "10000"))
+# How long a request may wait for room in a full queue before getting a 503
+CHAT_WRITE_BEHIND_PUT_TIMEOUT = float(os.getenv("CHAT_WRITE_BEHIND_PUT_TIMEOUT", "1.0"))
+FLUSH_RETRIES = 3
+# How soon rows held back after a failed flush are retried when no new rows arrive
+HELD_RETRY_SECONDS = 1.0
+# The database rejected the rows themselves; sending them again cannot succeed
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+class WriteBehindFull(Exception):
+    """Raised when the buffer stayed full for longer than the put timeout."""
+
+
+class WriteBehindQueue:
+    """Bounded in-process buffer that batches rows into multi-row INSERTs.
+
+    Rows are flushed when ``max_batch`` rows are waiting or ``flush_interval``
+    seconds after the first row of a batch arrived. ``stop()`` drains the
+    buffer, so a graceful shutdown does not lose accepted rows.
+
+    A batch the database rejects (constraint or data error) is split in
+    halves until the offending rows are isolated; only those are dropped.
+    A batch that fails for any other reason, such as the database being
+    down, is held and retried in INSERTs of its own, never together with
+    new rows.
+    """
+
+    def __init__(
+        self,
+        table,
+        session_factory=SessionLocal,
+        enabled: bool = CHAT_WRITE_BEHIND,
+        max_batch: int = CHAT_WRITE_BEHIND_MAX_BATCH,
+        flush_interval: float = CHAT_WRITE_BEHIND_FLUSH_INTERVAL,
+        max_queue: int = CHAT_WRITE_BEHIND_MAX_QUEUE,
+        put_timeout: float = CHAT_WRITE_BEHIND_PUT_TIMEOUT,
+    ):
+        self.table = table
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        # Rows whose flush failed every retry while the database was unavailable
+        self._held: list = []
+        self.counters = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "flushes": 0,
+            "flush_seconds_total": 0.0,
+            "flush_seconds_max": 0.0,
+            "last_flush_seconds": 0.0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def held(self) -> int:
+        return len(self._held)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled, "depth": self.depth, "held": self.held, "capacity": self.max_queue,
+            **self.counters,
+        }
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name=f"write-behind:{self.table.name}")
+
+    async def put(self, row: dict):
+        """Buffer a row; callers should write directly when not ``running``."""
+        try:
+            # put() only suspends while the queue is full: that is the backpressure
+            await asyncio.wait_for(self._queue.put(row), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            self.counters["rejected"] += 1
+            raise WriteBehindFull()
+        self.counters["enqueued"] += 1
+
+    async def stop(self):
+        """Stop accepting rows and flush everything already buffered.
+
+        Rows held back by failed flushes get one last attempt; only rows
+        that still cannot be written are counted as dropped.
+        """
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._held:
+            await self._retry_held()
+        if self._held:
+            self.counters["dropped"] += len(self._held)
+            logger.error(f"Write-behind queue for {self.table.name} lost {len(self._held)} rows at shutdown")
+            self._held = []
+        logger.info(f"Write-behind queue for {self.table.name} drained: {self.stats()}")
+
+    async def _run(self):
+        while True:
+            batch = await self._take_batch()
+            try:
+                if self._held:
+                    await self._retry_held()
+                if self._held:
+                    # Still unavailable: do not spend another round of retries on new rows
+                    self._hold(batch)
+                elif batch:
+                    self._hold(await self._write(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _take_batch(self) -> list:
+        try:
+            # With rows held back, wake up to retry them even if nothing new arrives
+            first = await asyncio.wait_for(self._queue.get(), HELD_RETRY_SECONDS if self._held else None)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        if self._queue.qsize() < self.max_batch - 1 and not self._closing:
+            await asyncio.sleep(self.flush_interval)
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _hold(self, rows: list):
+        """Keep rows for a later retry, up to the queue's capacity."""
+        self._held.extend(rows)
+        overflow = len(self._held) - self.max_queue
+        if overflow > 0:
+            del self._held[self.max_queue:]
+            self.counters["dropped"] += overflow
+            logger.error(f"Write-behind queue for {self.table.name} dropped {overflow} rows")
+
+    async def _retry_held(self):
+        """Write held rows in batches of their own, stopping at the first that still fails."""
+        rows, self._held = self._held, []
+        for start in range(0, len(rows), self.max_batch):
+            failed = await self._write(rows[start:start + self.max_batch])
+            if failed:
+                self._held = failed + rows[start + self.max_batch:]
+                return
+
+    async def _write(self, rows: list) -> list:
+        """Insert ``rows``, dropping any the database rejects; returns the rows to hold for a retry."""
+        try:
+            await self._flush(rows)
+        except ROW_ERRORS as e:
+            if len(rows) == 1:
+                self.counters["dropped"] += 1
+                logger.error(f"Write-behind queue for {self.table.name} dropped a row the database rejected: {e}")
+                return []
+            middle = len(rows) // 2
+            return await self._write(rows[:middle]) + await self._write(rows[middle:])
+        except Exception as e:
+            logger.error(
+                f"Write-behind flush of {len(rows)} {self.table.name} rows failed, holding them: {e}", exc_info=True
+            )
+            return rows
+        return []
+
+    async def _flush(self, batch: list):
+        """One multi-row INSERT, retried on errors other than ``ROW_ERRORS``; raises the last error."""
+        started = time.perf_counter()
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                async with self._session_factory() as session:
+                    await session.execute(insert(self.table), batch)
+                    await session.commit()
+                break
+            except ROW_ERRORS:
+                raise
+            except Exception as e:
+                if attempt == FLUSH_RETRIES:
+                    raise
+                logger.warning(f"Write-behind flush attempt {attempt} failed, retrying: {e!r}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+        elapsed = time.perf_counter() - started
+        self.counters["flushed"] += len(batch)
+        self.counters["flushes"] += 1
+        self.counters["flush_seconds_total"] += elapsed
+        self.counters["flush_seconds_max"] = max(self.counters["flush_seconds_max"], elapsed)
+        self.counters["last_flush_seconds"] = elapsed
+
+
+chat_history_writer = WriteBehindQueue(models.ChatHistory.__table__)
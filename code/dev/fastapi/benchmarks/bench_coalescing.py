@@ -0,0 +1,145 @@
+"""How many SQL statements a burst of identical concurrent reads costs.
+
+Fires N identical requests at once at GET /users/me, GET /bookings/ and
+GET /bookings/{id}, with a cold principal cache, and counts the statements
+the engine executes, with read coalescing on and then off. With coalescing
+the whole burst should cost what a single request does. Finally checks that
+a write is visible to the very next read.
+
+    python -m benchmarks.bench_coalescing
+    python -m benchmarks.bench_coalescing --burst 200 --database-url postgresql+asyncpg://...
+
+Exits 1 if a coalesced burst ran more statements than one request needs.
+Requires httpx and (for SQLite) aiosqlite on top of the app's own dependencies.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+PASSWORD = "bench-password-123"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--burst", type=int, default=50, help="identical requests fired at once")
+    parser.add_argument("--bookings", type=int, default=30)
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    if args.database_url is None:
+        db_path = Path(tempfile.mkdtemp(prefix="cservice-bench-")) / "bench.db"
+        args.database_url = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.update(
+        DATABASE_URL=args.database_url,
+        DB_ECHO="off",
+        SENTIMENT_BACKEND="off",
+        # Measure coalescing, not shedding
+        ADMISSION_CONTROL="false",
+    )
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_):
+        self.count += 1
+
+
+async def burst(client, counter, path: str, headers: dict, n: int):
+    from app.deps import principal_cache
+
+    principal_cache.clear()
+    before = counter.count
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(client.get(path, headers=headers) for _ in range(n)))
+    elapsed = (time.perf_counter() - started) * 1e3
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+    assert len({r.content for r in responses}) == 1, "coalesced responses differ"
+    return counter.count - before, elapsed
+
+
+async def run(args) -> bool:
+    import httpx
+    from app.db import engine
+    from app.deps import principal_lookups
+    from app.main import app
+    from app.singleflight import read_coalescer
+
+    def coalesce(enabled: bool):
+        read_coalescer.enabled = principal_lookups.enabled = enabled
+
+    ok = True
+    async with app.router.lifespan_context(app):
+        counter = StatementCounter(engine)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            username = f"coalesce_{uuid.uuid4().hex[:8]}"
+            (await client.post(
+                "/users/register",
+                json={"username": username, "email": f"{username}@example.com", "password": PASSWORD},
+            )).raise_for_status()
+            login = await client.post("/users/login", json={"username": username, "password": PASSWORD})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            booking_ids = []
+            for i in range(args.bookings):
+                response = await client.post("/bookings/", headers=headers, json={
+                    "service_type": "consultation",
+                    "title": f"Coalescing booking {i}",
+                    "details": "Created by the benchmark suite",
+                    "scheduled_date": f"2031-01-{1 + i % 28:02d}T{8 + i // 28:02d}:00:00",
+                })
+                response.raise_for_status()
+                booking_ids.append(response.json()["id"])
+
+            # Statements one request needs: the principal lookup plus the route's own
+            paths = {
+                "/users/me": 2,
+                "/bookings/?per_page=20": 3,
+                f"/bookings/{booking_ids[0]}": 2,
+            }
+            print(f"{'route':<28}{'burst':>7}{'coalesced':>11}{'ms':>8}{'uncoalesced':>13}{'ms':>8}")
+            for path, expected in paths.items():
+                coalesce(True)
+                shared, shared_ms = await burst(client, counter, path, headers, args.burst)
+                coalesce(False)
+                alone, alone_ms = await burst(client, counter, path, headers, args.burst)
+                coalesce(True)
+                print(f"{path.split('?')[0][:27]:<28}{args.burst:>7}{shared:>11}{shared_ms:>8.1f}{alone:>13}{alone_ms:>8.1f}")
+                if shared > expected:
+                    print(f"  expected at most {expected} statements for the coalesced burst")
+                    ok = False
+
+            # A write must invalidate what the reads above shared
+            path = f"/bookings/{booking_ids[0]}"
+            version = (await client.get(path, headers=headers)).json()["version"]
+            (await client.put(path, headers=headers, json={"details": "updated"})).raise_for_status()
+            after = (await client.get(path, headers=headers)).json()
+            if after["version"] == version or after["details"] != "updated":
+                print("  read after write returned stale data")
+                ok = False
+            else:
+                print("read after write: fresh")
+    return ok
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Measure the per-request cost of MetricsMiddleware.
+
+Drives a trivial ASGI app directly (no server, no sockets) with and without the
+middleware so the difference is the middleware alone.
+
+    python -m benchmarks.bench_metrics_overhead [iterations]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from app.metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/bookings/{booking_id}"
+
+
+async def _endpoint(scope, receive, send):
+    scope["route"] = _Route()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def _time_app(app, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        scope = {"type": "http", "method": "GET", "path": "/bookings/42"}
+        started = time.perf_counter()
+        await app(scope, _receive, _send)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def main(iterations: int = 200_000):
+    wrapped = MetricsMiddleware(_endpoint)
+    # Warm up both paths before measuring
+    await _time_app(_endpoint, 1000)
+    await _time_app(wrapped, 1000)
+
+    bare = await _time_app(_endpoint, iterations)
+    instrumented = await _time_app(wrapped, iterations)
+
+    bare_us = statistics.fmean(bare) * 1e6
+    instrumented_us = statistics.fmean(instrumented) * 1e6
+    p99 = lambda samples: statistics.quantiles(samples, n=100)[98] * 1e6
+    print(f"iterations:             {iterations}")
+    print(f"bare app:               {bare_us:.2f} us/request (p99 {p99(bare):.2f} us)")
+    print(f"with MetricsMiddleware: {instrumented_us:.2f} us/request (p99 {p99(instrumented):.2f} us)")
+    print(f"overhead:               {instrumented_us - bare_us:.2f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
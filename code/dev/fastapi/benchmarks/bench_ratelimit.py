@@ -0,0 +1,109 @@
+"""Per-request cost of rate limiting.
+
+Times one check (a per-IP and a per-user bucket, as on /chat) against the
+in-memory and SQLite backends over many distinct clients, then the FastAPI
+glue around it: building the headers, setting them on the response and
+raising 429 when refused.
+
+    python -m benchmarks.bench_ratelimit
+    python -m benchmarks.bench_ratelimit --checks 200000 --clients 50000
+
+Exits 1 if the in-memory path, glue included, averages 50 us or more.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BUDGET_US = 50.0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    return parser.parse_args()
+
+
+def summary(samples) -> str:
+    q = statistics.quantiles(samples, n=100)
+    return f"mean {statistics.fmean(samples):6.2f} us  p50 {q[49]:6.2f} us  p99 {q[98]:6.2f} us"
+
+
+async def time_checks(check, n: int, clients: int):
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        await check(i % clients)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+async def bench_backend(name: str, backend, args):
+    from app.ratelimit import RateLimiter, Rule
+
+    # Generous enough that most checks pass, tight enough that some are refused
+    rules = {("chat", "ip"): Rule(120, 60), ("chat", "user"): Rule(60, 60)}
+    limiter = RateLimiter(backend, rules, enabled=True)
+
+    async def check(i):
+        decision = await limiter.hit("chat", ip=f"10.0.{i >> 8 & 255}.{i & 255}", user=i)
+        decision.headers()
+
+    samples = await time_checks(check, args.checks, args.clients)
+    backend.close()
+    print(f"{name:<10} {summary(samples)}")
+    return statistics.fmean(samples)
+
+
+async def bench_dependency(args):
+    from fastapi import HTTPException, Request, Response
+    from app import deps
+    from app.ratelimit import MemoryBackend, Rule
+
+    deps.rate_limiter.backend = MemoryBackend()
+    deps.rate_limiter.rules = {("chat", "ip"): Rule(120, 60), ("chat", "user"): Rule(60, 60)}
+    deps.rate_limiter.enabled = True
+    requests = [
+        Request({"type": "http", "method": "POST", "path": "/chat", "headers": [],
+                 "client": (f"10.1.{i >> 8 & 255}.{i & 255}", 50000)})
+        for i in range(min(args.clients, 65536))
+    ]
+    refused = 0
+
+    async def check(i):
+        nonlocal refused
+        try:
+            await deps.enforce_rate_limit(requests[i % len(requests)], Response(), "chat", user=i)
+        except HTTPException:
+            refused += 1
+
+    samples = await time_checks(check, args.checks, args.clients)
+    print(f"{'dependency':<10} {summary(samples)}  ({refused} refused)")
+    return statistics.fmean(samples)
+
+
+async def run(args) -> bool:
+    from app.ratelimit import MemoryBackend, SQLiteBackend
+
+    print(f"{args.checks:,} checks over {args.clients:,} clients, per-IP and per-user buckets")
+    memory = await bench_backend("memory", MemoryBackend(), args)
+    with tempfile.TemporaryDirectory() as path:
+        await bench_backend("sqlite", SQLiteBackend(os.path.join(path, "rate_limits.db")), args)
+    dependency = await bench_dependency(args)
+    ok = max(memory, dependency) < BUDGET_US
+    print(f"in-memory path {'within' if ok else 'OVER'} the {BUDGET_US:.0f} us budget")
+    return ok
+
+
+def main():
+    args = parse_args()
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
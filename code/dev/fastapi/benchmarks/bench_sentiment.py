@@ -0,0 +1,83 @@
+"""Accuracy and throughput of the local sentiment engine.
+
+Accuracy is measured on a labeled TSV (``text<TAB>label``; defaults to the
+small customer-service sample in benchmarks/data), both for the seed-lexicon
+model and, with --cross-validate, for models trained on the other folds.
+Throughput is measured for single messages through the backend interface and
+for batches through the model directly.
+
+    python -m benchmarks.bench_sentiment
+    python -m benchmarks.bench_sentiment --data sst2_dev.tsv --cross-validate 5
+    python -m benchmarks.bench_sentiment --model models/sentiment.npz
+
+Requires NumPy.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+from app.sentiment import LocalSentiment
+from app.sentiment_model import HashedLinearModel, accuracy, read_labeled
+
+DEFAULT_DATA = Path(__file__).resolve().parent / "data" / "sentiment_sample.tsv"
+BATCH_SIZES = (1, 32, 256, 1024)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA)
+    parser.add_argument("--model", help="model file to evaluate instead of the seed lexicon")
+    parser.add_argument("--cross-validate", type=int, default=0, metavar="FOLDS")
+    parser.add_argument("--messages", type=int, default=20_000, help="messages scored per throughput run")
+    return parser.parse_args()
+
+
+def cross_validate(texts, labels, folds: int) -> float:
+    scores = []
+    for fold in range(folds):
+        train = [i for i in range(len(texts)) if i % folds != fold]
+        test = [i for i in range(len(texts)) if i % folds == fold]
+        model = HashedLinearModel.train([texts[i] for i in train], [labels[i] for i in train])
+        scores.append(accuracy(model, [texts[i] for i in test], [labels[i] for i in test]))
+    return statistics.fmean(scores)
+
+
+async def single_message_us(backend: LocalSentiment, texts, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        await backend.analyze(texts[i % len(texts)])
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def batch_us(model: HashedLinearModel, texts, batch_size: int, count: int) -> float:
+    batch = [texts[i % len(texts)] for i in range(batch_size)]
+    rounds = max(1, count // batch_size)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        model.predict(batch)
+    return (time.perf_counter() - started) / (rounds * batch_size) * 1e6
+
+
+def main():
+    args = parse_args()
+    texts, labels = read_labeled(args.data)
+    backend = LocalSentiment(model_path=args.model)
+    started = time.perf_counter()
+    backend.load()
+    print(f"model load: {(time.perf_counter() - started) * 1e3:.1f} ms ({'file' if args.model else 'seed lexicon'})")
+
+    print(f"dataset: {args.data.name}, {len(texts)} examples")
+    print(f"accuracy: {accuracy(backend.model, texts, labels):.3f}")
+    if args.cross_validate:
+        print(f"accuracy, trained ({args.cross_validate}-fold): {cross_validate(texts, labels, args.cross_validate):.3f}")
+
+    print(f"single message via backend.analyze: {asyncio.run(single_message_us(backend, texts, args.messages)):.1f} us")
+    for size in BATCH_SIZES:
+        per_message = batch_us(backend.model, texts, size, args.messages)
+        print(f"batch {size:>5}: {per_message:.2f} us/message, {1e6 / per_message:,.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare the two ways of producing a list response body.
+
+    model:  ORM objects -> Pydantic validation (from_attributes) -> JSONResponse
+    fast:   select(columns) rows -> dicts -> FastJSONResponse (orjson if installed)
+
+for GET /bookings/ and GET /chat/history pages of 10, 100 and 1000 items. Rows
+come from an in-memory SQLite database, so the query and row handling are
+part of the measurement, network and HTTP are not.
+
+    python -m benchmarks.bench_serialization [iterations]
+
+Requires aiosqlite on top of the app's own dependencies (app.db builds its
+engine at import time).
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("DB_ECHO", "off")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import models  # noqa: E402
+from app.db import Base  # noqa: E402
+from app.responses import FastJSONResponse, model_columns, orjson, rows_payload  # noqa: E402
+from app.schemas.chat import ChatHistoryOut  # noqa: E402
+from app.schemas.schemas import BookingOut, PaginatedBookings  # noqa: E402
+
+SIZES = (10, 100, 1000)
+
+
+def seed(engine, rows: int):
+    Base.metadata.create_all(engine)
+    now = datetime(2030, 1, 1)
+    with Session(engine) as session:
+        session.execute(insert(models.User), [dict(
+            id=1, username="bench", email="bench@example.com", hashed_password="x",
+            created_at=now, updated_at=now,
+        )])
+        session.execute(insert(models.Booking), [dict(
+            user_id=1, service_type=models.ServiceType.consultation, title=f"Booking {i}",
+            details="Created by the serialization benchmark", scheduled_date=now + timedelta(hours=i),
+            end_date=now + timedelta(hours=i, minutes=60), status=models.BookingStatus.pending,
+            created_at=now + timedelta(seconds=i), updated_at=now + timedelta(seconds=i),
+        ) for i in range(rows)])
+        session.execute(insert(models.ChatHistory), [dict(
+            user_id=1, message=f"message {i}", response=f"You said: 'message {i}'. How else can I help you?",
+            timestamp=now + timedelta(seconds=i),
+        ) for i in range(rows)])
+        session.commit()
+
+
+def bookings_model(session, limit: int) -> bytes:
+    items = session.scalars(
+        select(models.Booking).order_by(models.Booking.created_at.desc(), models.Booking.id.desc()).limit(limit)
+    ).all()
+    page = PaginatedBookings(items=items, total=len(items), page=1, per_page=limit, pages=1)
+    return JSONResponse(page.model_dump(mode="json")).body
+
+
+def bookings_fast(session, limit: int) -> bytes:
+    rows = session.execute(
+        select(*model_columns(BookingOut, models.Booking.__table__))
+        .order_by(models.Booking.created_at.desc(), models.Booking.id.desc()).limit(limit)
+    ).all()
+    return FastJSONResponse({
+        "items": rows_payload(rows), "total": len(rows), "page": 1, "per_page": limit,
+        "pages": 1, "next_cursor": None,
+    }).body
+
+
+def history_model(session, limit: int) -> bytes:
+    entries = session.scalars(
+        select(models.ChatHistory).order_by(models.ChatHistory.timestamp.desc()).limit(limit)
+    ).all()
+    return JSONResponse([ChatHistoryOut.model_validate(e).model_dump(mode="json") for e in entries]).body
+
+
+def history_fast(session, limit: int) -> bytes:
+    rows = session.execute(
+        select(*model_columns(ChatHistoryOut, models.ChatHistory.__table__))
+        .order_by(models.ChatHistory.timestamp.desc()).limit(limit)
+    ).all()
+    return FastJSONResponse(rows_payload(rows)).body
+
+
+def time_path(engine, fn, limit: int, iterations: int) -> float:
+    """Mean seconds per call, with a fresh session (empty identity map) per call."""
+    total = 0.0
+    for _ in range(iterations):
+        with Session(engine) as session:
+            started = time.perf_counter()
+            fn(session, limit)
+            total += time.perf_counter() - started
+    return total / iterations
+
+
+def main(iterations: int = 200):
+    engine = create_engine("sqlite://")
+    seed(engine, max(SIZES))
+    print(f"json encoder: {'orjson' if orjson is not None else 'pydantic_core'}, iterations: {iterations}")
+    print(f"{'endpoint':<14} {'items':>6} {'model ms':>10} {'fast ms':>10} {'speedup':>8}")
+    for name, model_fn, fast_fn in (
+        ("bookings", bookings_model, bookings_fast),
+        ("chat_history", history_model, history_fast),
+    ):
+        for size in SIZES:
+            with Session(engine) as session:
+                # Both paths must produce the same document
+                assert json.loads(model_fn(session, size)) == json.loads(fast_fn(session, size)), name
+            slow = time_path(engine, model_fn, size, iterations)
+            fast = time_path(engine, fast_fn, size, iterations)
+            print(f"{name:<14} {size:>6} {slow * 1e3:>10.3f} {fast * 1e3:>10.3f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
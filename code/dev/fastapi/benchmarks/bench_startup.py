@@ -0,0 +1,70 @@
+"""Measure cold-start time and memory of an app worker.
+
+Each sample is a fresh interpreter that imports ``app.main`` and runs the
+lifespan startup, mirroring what every gunicorn/uvicorn worker does.
+
+    python -m benchmarks.bench_startup [samples]
+    STARTUP_SCHEMA_MODE=verify python -m benchmarks.bench_startup
+
+Set PYTHONPROFILEIMPORTTIME=1 to also get ``-X importtime`` output on stderr.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+_CHILD = r"""
+import asyncio, json, resource, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def run_lifespan():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(run_lifespan())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "total_ms": (ready - started) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(__import__("sys").modules),
+}))
+"""
+
+
+def sample(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD],
+        env=env,
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    if env.get("PYTHONPROFILEIMPORTTIME"):
+        sys.stderr.write(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(samples: int = 10):
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'startup.db'}"
+    env.setdefault("APP_ENV", "development")
+    env.setdefault("DB_ECHO", "off")
+    env.setdefault("STARTUP_SCHEMA_MODE", "create_all")
+
+    runs = [sample(env) for _ in range(samples)]
+    print(f"samples: {samples}  schema mode: {env['STARTUP_SCHEMA_MODE']}")
+    for key in ("import_ms", "lifespan_ms", "total_ms", "max_rss_mb", "modules"):
+        values = [run[key] for run in runs]
+        print(f"{key:<12} median {statistics.median(values):>9.1f}   min {min(values):>9.1f}   max {max(values):>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,120 @@
+"""Latency of the chat embedding encoder and the vector similarity index.
+
+Builds indexes of 100k to 1M synthetic, clustered 128-d unit vectors and
+reports insert throughput, brute-force and IVF query latency (with IVF
+recall@10 against the exact result), per-user search latency, and how long
+a worker takes to memory-map a saved index.
+
+    python -m benchmarks.bench_vector_index
+    python -m benchmarks.bench_vector_index --sizes 100000 1000000 --ivf-lists 1024 --nprobe 16
+
+Requires NumPy; imports the app modules, so the app's dependencies too.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.embeddings import HashedEncoder
+from app.vector_index import VectorIndex
+
+DIM = 128
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 300_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--ivf-lists", type=int, default=0, help="defaults to ~sqrt(size)")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--k", type=int, default=10)
+    return parser.parse_args()
+
+
+def clustered_vectors(n: int, clusters: int = 500, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def timed_ms(fn, queries):
+    samples, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(fn(query))
+        samples.append((time.perf_counter() - started) * 1e3)
+    return samples, results
+
+
+def summary(samples) -> str:
+    p95 = statistics.quantiles(samples, n=20)[18]
+    return f"p50 {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms"
+
+
+def bench_encoder():
+    encoder = HashedEncoder(DIM)
+    texts = [f"Can I move my consultation booking {i} to next Tuesday afternoon?" for i in range(5000)]
+    started = time.perf_counter()
+    for text in texts[:2000]:
+        encoder.encode(text)
+    single = (time.perf_counter() - started) / 2000 * 1e6
+    started = time.perf_counter()
+    encoder.encode_many(texts)
+    batch = (time.perf_counter() - started) / len(texts) * 1e6
+    print(f"encoder: {single:.1f} us/message single, {batch:.1f} us/message batched")
+
+
+def bench_size(n: int, args):
+    vectors = clustered_vectors(n)
+    user_ids = np.arange(n) % args.users
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, n, args.queries)] + 0.1 * rng.standard_normal((args.queries, DIM)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    index = VectorIndex(DIM)
+    started = time.perf_counter()
+    for start in range(0, n, 10_000):
+        index.add(np.arange(start, min(start + 10_000, n)), user_ids[start:start + 10_000].tolist(),
+                  vectors[start:start + 10_000])
+    add_seconds = time.perf_counter() - started
+    print(f"\n{n:,} vectors: inserted in {add_seconds:.2f}s ({n / add_seconds:,.0f} vectors/s)")
+
+    exact_ms, exact = timed_ms(lambda q: index.search(q, args.k), queries)
+    print(f"  brute force      {summary(exact_ms)}")
+
+    user_ms, _ = timed_ms(lambda q: index.search(q, args.k, user_id=int(rng.integers(args.users))), queries)
+    print(f"  per user (~{n // args.users:,} rows) {summary(user_ms)}")
+
+    lists = args.ivf_lists or int(np.sqrt(n))
+    started = time.perf_counter()
+    index.build_ivf(lists)
+    print(f"  IVF build ({lists} lists): {time.perf_counter() - started:.2f}s")
+    ivf_ms, approx = timed_ms(lambda q: index.search(q, args.k, nprobe=args.nprobe), queries)
+    recall = statistics.fmean(
+        len({i for i, _ in a} & {i for i, _ in e}) / len(e) for a, e in zip(approx, exact)
+    )
+    print(f"  IVF nprobe={args.nprobe:<4} {summary(ivf_ms)}  recall@{args.k} {recall:.3f}")
+
+    with tempfile.TemporaryDirectory() as path:
+        index.save(path)
+        started = time.perf_counter()
+        loaded = VectorIndex.load(path)
+        load_ms = (time.perf_counter() - started) * 1e3
+        first_ms, _ = timed_ms(lambda q: loaded.search(q, args.k), queries[:1])
+        print(f"  mmap load {load_ms:.1f} ms, first query {first_ms[0]:.1f} ms")
+
+
+def main():
+    args = parse_args()
+    bench_encoder()
+    for n in args.sizes:
+        bench_size(n, args)
+
+
+if __name__ == "__main__":
+    main()
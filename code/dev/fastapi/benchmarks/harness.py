@@ -0,0 +1,141 @@
+"""Shared helpers for the benchmark scripts: timing, percentiles, baselines."""
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    concurrency: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    throughput_rps: float
+    max_loop_lag_ms: float
+
+    def row(self) -> str:
+        return (
+            f"{self.name:<18} {self.requests:>7} {self.errors:>6} {self.p50_ms:>9.2f} {self.p95_ms:>9.2f} "
+            f"{self.p99_ms:>9.2f} {self.throughput_rps:>10.1f} {self.max_loop_lag_ms:>10.2f}"
+        )
+
+
+HEADER = (
+    f"{'scenario':<18} {'reqs':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} "
+    f"{'p99 ms':>9} {'req/s':>10} {'lag ms':>10}"
+)
+
+
+def percentile(sorted_samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+class LoopLagSampler:
+    """Samples event loop scheduling delay while a scenario runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, loop.time() - expected)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def run_scenario(
+    name: str,
+    operation: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int,
+) -> ScenarioResult:
+    """Run ``operation(i)`` for i in range(requests) with ``concurrency`` workers.
+
+    ``operation`` returns True on success; exceptions count as errors.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await operation(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    with LoopLagSampler() as lag:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return ScenarioResult(
+        name=name,
+        requests=requests,
+        errors=errors,
+        concurrency=concurrency,
+        mean_ms=statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p95_ms=percentile(latencies, 0.95) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        max_ms=(latencies[-1] if latencies else 0.0) * 1000,
+        throughput_rps=requests / elapsed if elapsed else 0.0,
+        max_loop_lag_ms=lag.max_lag * 1000,
+    )
+
+
+def save_baseline(path: Path, results: list, meta: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta, "results": [asdict(r) for r in results]}, indent=2))
+
+
+def compare_to_baseline(path: Path, results: list, tolerance: float) -> list:
+    """Return human-readable regressions against a stored baseline.
+
+    A scenario regresses when its p95 grows, or its throughput drops, by more
+    than ``tolerance`` (0.2 = 20%) relative to the baseline.
+    """
+    baseline = {r["name"]: r for r in json.loads(path.read_text())["results"]}
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if base["p95_ms"] and result.p95_ms > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result.name}: p95 {base['p95_ms']:.2f} -> {result.p95_ms:.2f} ms")
+        if base["throughput_rps"] and result.throughput_rps < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: throughput {base['throughput_rps']:.1f} -> {result.throughput_rps:.1f} req/s"
+            )
+        if result.errors > base["errors"]:
+            regressions.append(f"{result.name}: errors {base['errors']} -> {result.errors}")
+    return regressions
@@ -0,0 +1,61 @@
+"""Local stand-in for the Hugging Face sentiment endpoint.
+
+Answers every POST with an HF-shaped payload after an optional delay, so the
+benchmarks exercise the real HTTP client path without leaving the machine.
+"""
+import asyncio
+import json
+import threading
+import time
+
+
+def make_app(latency: float = 0.0):
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+        if latency:
+            await asyncio.sleep(latency)
+        body = json.dumps([[{"label": "POSITIVE", "score": 0.98}, {"label": "NEGATIVE", "score": 0.02}]]).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+class StubSentimentServer:
+    """Runs the stub under uvicorn on its own thread and event loop."""
+
+    def __init__(self, port: int, latency: float = 0.0):
+        import uvicorn
+
+        self.url = f"http://127.0.0.1:{port}/sentiment"
+        config = uvicorn.Config(make_app(latency), host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="stub-sentiment", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Stub sentiment server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
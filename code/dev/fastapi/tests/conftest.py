@@ -0,0 +1,119 @@
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+# The app reads its settings at import time, so configure it before any test imports it
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp(prefix='cservice-test-')) / 'test.db'}"
+)
+os.environ.setdefault("APP_ENV", "development")
+os.environ.setdefault("DB_ECHO", "off")
+os.environ.setdefault("SENTIMENT_BACKEND", "off")
+os.environ.setdefault("RATE_LIMITING", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+
+@pytest.fixture
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ApiClient:
+    """Synchronous facade over an httpx client bound to the app's event loop.
+
+    The app's lifespan starts background tasks on one loop, so every request
+    has to run on that same loop. Each call runs in a task that inherits the
+    caller's context, which is what lets ``query_budget`` see its statements.
+    """
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+
+    def request(self, method: str, url: str, **kwargs):
+        return self.loop.run_until_complete(self.client.request(method, url, **kwargs))
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def api():
+    import httpx
+    from app import profiling
+    from app.db import engine
+    from app.main import app
+
+    if not profiling.SQL_PROFILE:
+        # Budgets only need statements recorded, not the profiling middleware
+        profiling.instrument_engine(engine.sync_engine)
+    loop = asyncio.new_event_loop()
+    lifespan = app.router.lifespan_context(app)
+    loop.run_until_complete(lifespan.__aenter__())
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    try:
+        yield ApiClient(loop, client)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.run_until_complete(lifespan.__aexit__(None, None, None))
+        loop.close()
+
+
+@pytest.fixture(scope="session")
+def new_user(api):
+    """Register a fresh user and return the Authorization headers for it"""
+
+    def register() -> dict:
+        username = f"test_{uuid.uuid4().hex[:8]}"
+        password = "test-password-123"
+        api.post(
+            "/users/register", json={"username": username, "email": f"{username}@example.com", "password": password}
+        ).raise_for_status()
+        response = api.post("/users/login", json={"username": username, "password": password})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register
+
+
+@pytest.fixture(scope="session")
+def auth_headers(new_user) -> dict:
+    return new_user()
+
+
+@pytest.fixture
+def query_budget(api):
+    """``with query_budget(2, "GET /bookings/{id}"): api.get(...)`` fails the test past the budget.
+
+    The principal cache is cleared first, so budgets include the auth
+    lookup a request pays when its token is not cached.
+    """
+    from app.deps import principal_cache
+    from app.profiling import query_budget
+
+    @contextmanager
+    def budget(max_queries: int, name: str = "query budget"):
+        principal_cache.clear()
+        with query_budget(max_queries, name) as profile:
+            yield profile
+
+    return budget
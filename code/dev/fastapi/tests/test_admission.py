@@ -0,0 +1,165 @@
+import asyncio
+
+import httpx
+
+from app.admission import ADMISSION_REJECTED, ADMISSION_RETRY_AFTER_SECONDS, AdmissionMiddleware, ConcurrencyLimiter
+
+
+def held_app(release: asyncio.Event):
+    """ASGI app whose /slow requests hold their slot until ``release`` is set"""
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/slow":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+def client_for(limiter: ConcurrencyLimiter, release: asyncio.Event) -> httpx.AsyncClient:
+    app = AdmissionMiddleware(held_app(release), limiters={name: limiter for name in ("read", "write", "chat", "auth")})
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def scenario():
+        release = asyncio.Event()
+        limiter = ConcurrencyLimiter("test_full", limit=1, max_queue=1, timeout=5)
+        async with client_for(limiter, release) as client:
+            holder = asyncio.create_task(client.get("/slow"))
+            await until(lambda: limiter.in_flight == 1)
+            waiter = asyncio.create_task(client.get("/fast"))
+            await until(lambda: limiter.queued == 1)
+
+            shed = await client.get("/fast")
+            assert shed.status_code == 503
+            assert shed.headers["retry-after"] == str(ADMISSION_RETRY_AFTER_SECONDS)
+
+            release.set()
+            assert [(await task).status_code for task in (holder, waiter)] == [200, 200]
+        assert limiter.in_flight == 0 and limiter.queued == 0
+
+    asyncio.run(scenario())
+    assert ADMISSION_REJECTED._values[("test_full", "queue_full")] == 1
+
+
+def test_waiting_past_the_timeout_is_shed():
+    async def scenario():
+        release = asyncio.Event()
+        limiter = ConcurrencyLimiter("test_timeout", limit=1, max_queue=4, timeout=0.05)
+        async with client_for(limiter, release) as client:
+            holder = asyncio.create_task(client.get("/slow"))
+            await until(lambda: limiter.in_flight == 1)
+
+            shed = await client.get("/fast")
+            assert shed.status_code == 503
+            assert limiter.queued == 0
+
+            release.set()
+            assert (await holder).status_code == 200
+
+    asyncio.run(scenario())
+    assert ADMISSION_REJECTED._values[("test_timeout", "timeout")] == 1
+
+
+def test_released_slots_go_to_the_oldest_waiter():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test_fifo", limit=1, max_queue=4, timeout=5)
+        assert await limiter.acquire() is None
+        admitted = []
+
+        async def wait(name):
+            assert await limiter.acquire() is None
+            admitted.append(name)
+
+        first = asyncio.create_task(wait("first"))
+        await until(lambda: limiter.queued == 1)
+        second = asyncio.create_task(wait("second"))
+        await until(lambda: limiter.queued == 2)
+
+        limiter.release()
+        await first
+        assert admitted == ["first"] and limiter.in_flight == 1
+
+        # A newcomer queues behind "second" instead of taking the next slot
+        newcomer = asyncio.create_task(wait("newcomer"))
+        await until(lambda: limiter.queued == 2)
+        limiter.release()
+        await second
+        limiter.release()
+        await newcomer
+        assert admitted == ["first", "second", "newcomer"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test_cancel", limit=1, max_queue=4, timeout=5)
+        assert await limiter.acquire() is None
+        gone = asyncio.create_task(limiter.acquire())
+        await until(lambda: limiter.queued == 1)
+        next_in_line = asyncio.create_task(limiter.acquire())
+        await until(lambda: limiter.queued == 2)
+
+        # The slot is handed to the first waiter just as its client goes away
+        limiter.release()
+        gone.cancel()
+        results = await asyncio.gather(gone, asyncio.wait_for(asyncio.shield(next_in_line), 0.1), return_exceptions=True)
+
+        # Exactly one of them holds the slot; it is never lost
+        assert limiter.in_flight == 1
+        if isinstance(results[0], asyncio.CancelledError):
+            assert results[1] is None
+        else:
+            assert results[0] is None and limiter.queued == 1
+            limiter.release()
+            assert await next_in_line is None
+        limiter.release()
+        assert limiter.in_flight == 0 and limiter.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_before_the_handoff_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test_cancel_queued", limit=1, max_queue=4, timeout=5)
+        assert await limiter.acquire() is None
+        gone = asyncio.create_task(limiter.acquire())
+        await until(lambda: limiter.queued == 1)
+        next_in_line = asyncio.create_task(limiter.acquire())
+        await until(lambda: limiter.queued == 2)
+
+        gone.cancel()
+        await asyncio.gather(gone, return_exceptions=True)
+        assert limiter.queued == 1
+
+        limiter.release()
+        assert await next_in_line is None
+        assert limiter.in_flight == 1 and limiter.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_health_and_preflight_are_exempt():
+    async def scenario():
+        release = asyncio.Event()
+        limiter = ConcurrencyLimiter("test_exempt", limit=1, max_queue=0, timeout=5)
+        async with client_for(limiter, release) as client:
+            holder = asyncio.create_task(client.get("/slow"))
+            await until(lambda: limiter.in_flight == 1)
+
+            assert (await client.get("/fast")).status_code == 503
+            assert (await client.get("/health")).status_code == 200
+            assert (await client.options("/fast")).status_code == 200
+
+            release.set()
+            await holder
+
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+from app import deps
+from tests.test_bookings import book
+
+
+def totals(api, headers, scope: str = "user") -> dict:
+    response = api.get(f"/bookings/stats?scope={scope}", headers=headers)
+    response.raise_for_status()
+    by_status = {}
+    for bucket in response.json()["buckets"]:
+        for status, count in bucket["by_status"].items():
+            by_status[status] = by_status.get(status, 0) + count
+    return by_status
+
+
+def test_global_stats_are_admin_only(api, auth_headers, monkeypatch):
+    assert api.get("/bookings/stats?scope=global", headers=auth_headers).status_code == 403
+
+    monkeypatch.setattr(deps, "ADMIN_USER_IDS", frozenset({api.get("/users/me", headers=auth_headers).json()["id"]}))
+    assert api.get("/bookings/stats?scope=global", headers=auth_headers).status_code == 200
+
+
+def test_global_stats_sum_over_users(api, auth_headers, new_user, monkeypatch):
+    monkeypatch.setattr(deps, "ADMIN_USER_IDS", frozenset({api.get("/users/me", headers=auth_headers).json()["id"]}))
+    before = totals(api, auth_headers, "global")
+    book(api, auth_headers, "2032-06-01T10:00:00", "project")
+    book(api, new_user(), "2032-06-02T10:00:00", "project")
+
+    assert totals(api, auth_headers, "global").get("pending", 0) == before.get("pending", 0) + 2
+
+
+def test_status_change_moves_the_rollup_count(api, new_user):
+    headers = new_user()
+    booking = book(api, headers, "2032-06-03T10:00:00", "delivery")
+    assert totals(api, headers) == {"pending": 1}
+
+    api.put(f"/bookings/{booking['id']}", headers=headers, json={"status": "confirmed"}).raise_for_status()
+    assert totals(api, headers) == {"confirmed": 1}
+
+    response = api.request("PATCH", "/bookings/batch", headers=headers, json={
+        "items": [{"id": booking["id"], "status": "completed"}],
+    })
+    response.raise_for_status()
+    assert totals(api, headers) == {"completed": 1}
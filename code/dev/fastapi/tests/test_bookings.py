@@ -0,0 +1,92 @@
+from sqlalchemy import text
+
+from app import models
+from app.db import engine
+from app.routers import bookings
+
+
+def book(api, headers, scheduled_date: str, service_type: str = "meeting") -> dict:
+    response = api.post("/bookings/", headers=headers, json={
+        "service_type": service_type, "title": "Slot test", "scheduled_date": scheduled_date,
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+def test_uncancelling_rechecks_the_slot(api, auth_headers):
+    first = book(api, auth_headers, "2032-05-01T10:00:00")
+    api.put(f"/bookings/{first['id']}", headers=auth_headers, json={"status": "cancelled"}).raise_for_status()
+    book(api, auth_headers, "2032-05-01T10:30:00")
+
+    response = api.put(f"/bookings/{first['id']}", headers=auth_headers, json={"status": "pending"})
+    assert response.status_code == 409
+    assert api.get(f"/bookings/{first['id']}", headers=auth_headers).json()["status"] == "cancelled"
+
+
+def test_batch_uncancelling_rechecks_the_slot(api, auth_headers):
+    taken = book(api, auth_headers, "2032-05-02T10:00:00")
+    free = book(api, auth_headers, "2032-05-03T10:00:00")
+    for booking in (taken, free):
+        api.put(f"/bookings/{booking['id']}", headers=auth_headers, json={"status": "cancelled"}).raise_for_status()
+    book(api, auth_headers, "2032-05-02T10:00:00")
+
+    items = [{"id": taken["id"], "status": "confirmed"}, {"id": free["id"], "status": "confirmed"}]
+    response = api.request("PATCH", "/bookings/batch", headers=auth_headers, json={"items": items})
+    assert response.status_code == 409
+
+    response = api.request("PATCH", "/bookings/batch", headers=auth_headers, json={"items": items, "mode": "best_effort"})
+    assert response.status_code == 200
+    assert [(r["id"], r["ok"]) for r in response.json()["results"]] == [(taken["id"], False), (free["id"], True)]
+
+
+def test_cancelled_and_completed_bookings_free_their_slot(api, auth_headers):
+    first = book(api, auth_headers, "2032-05-04T10:00:00")
+    api.put(f"/bookings/{first['id']}", headers=auth_headers, json={"status": "completed"}).raise_for_status()
+    book(api, auth_headers, "2032-05-04T10:00:00")
+
+
+def test_slots_are_per_user(api, auth_headers, new_user):
+    other = new_user()
+    book(api, auth_headers, "2032-05-05T10:00:00")
+    book(api, other, "2032-05-05T10:00:00")
+
+    def free_starts(headers):
+        response = api.get("/bookings/availability", headers=headers, params={
+            "from": "2032-05-05T09:00:00", "to": "2032-05-05T12:00:00", "service_type": "meeting",
+        })
+        response.raise_for_status()
+        return {slot["start"][:16] for slot in response.json()["slots"]}
+
+    assert "2032-05-05T10:00" not in free_starts(auth_headers)
+    assert "2032-05-05T10:00" in free_starts(new_user())
+
+
+def test_exclusion_violation_maps_to_409(api, auth_headers, monkeypatch):
+    # Stand-in for the Postgres exclusion constraint, hit when a concurrent
+    # insert slips past the application-level check
+    async def install(statement):
+        async with engine.begin() as conn:
+            await conn.execute(text(statement))
+
+    api.loop.run_until_complete(install(
+        "CREATE TRIGGER emulate_booking_overlap BEFORE INSERT ON bookings "
+        "WHEN EXISTS (SELECT 1 FROM bookings o WHERE o.user_id = NEW.user_id "
+        "AND o.service_type = NEW.service_type AND o.status IN ('pending', 'confirmed') "
+        "AND o.scheduled_date < NEW.end_date AND o.end_date > NEW.scheduled_date) "
+        "BEGIN SELECT RAISE(ABORT, 'conflicting key value violates exclusion constraint "
+        f"\"{models.BOOKING_OVERLAP_CONSTRAINT}\"'); END"
+    ))
+    try:
+        book(api, auth_headers, "2032-05-06T10:00:00")
+
+        async def no_conflict(*args, **kwargs):
+            return False
+
+        monkeypatch.setattr(bookings, "_has_conflict", no_conflict)
+        response = api.post("/bookings/", headers=auth_headers, json={
+            "service_type": "meeting", "title": "Slot test", "scheduled_date": "2032-05-06T10:30:00",
+        })
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Requested time slot is not available"
+    finally:
+        api.loop.run_until_complete(install("DROP TRIGGER emulate_booking_overlap"))
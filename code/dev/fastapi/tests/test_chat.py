@@ -0,0 +1,193 @@
+import asyncio
+import json
+import time
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+from app import streaming
+from app.embeddings import get_encoder
+from app.main import app
+from app.routers import chat as chat_router
+from app.streaming import ConnectionLimiter, EventStreamResponse, SlowClient, sse_event, stream_connections
+from app.vector_index import chat_vector_index
+
+
+def chat(api, headers, message: str) -> dict:
+    response = api.post("/chat", headers=headers, json={"message": message})
+    response.raise_for_status()
+    return response.json()
+
+
+def test_suggestions_never_include_other_users_messages(api, new_user):
+    alice, bob = new_user(), new_user()
+    secret = "How do I reset the router password for account 4411"
+    chat(api, alice, secret)
+    row_id = api.get("/chat/history", headers=alice).json()[0]["id"]
+    bob_id = api.get("/users/me", headers=bob).json()["id"]
+
+    # Even an index entry filed under the wrong user must not leak the message
+    chat_vector_index.add(row_id, bob_id, get_encoder().encode(secret))
+    assert secret not in chat(api, bob, "reset the router password for account 4411")["suggestions"]
+
+
+REPLY_EVENTS = ["sentiment", "suggestions", "vector", "done"]
+
+
+def sse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def event_names(events) -> list:
+    """Event names with the run of token events collapsed to one"""
+    names = [name for name, _ in events]
+    return [name for i, name in enumerate(names) if name != "token" or i == 0 or names[i - 1] != "token"]
+
+
+def history_messages(api, headers) -> list:
+    return [row["message"] for row in api.get("/chat/history", headers=headers).json()]
+
+
+class WebSocketSession:
+    """Drives the app's /chat/ws endpoint over raw ASGI messages on the test loop"""
+
+    def __init__(self, api, token: str = "", block_sends: bool = False):
+        self.api = api
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        self.block_sends = block_sends
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": "/chat/ws", "raw_path": b"/chat/ws", "root_path": "",
+            "query_string": f"token={token}".encode(), "headers": [(b"host", b"test")],
+            "client": ("127.0.0.1", 50000), "server": ("test", 80), "subprotocols": [],
+        }
+        self.inbox.put_nowait({"type": "websocket.connect"})
+        self.task = api.loop.create_task(app(scope, self.inbox.get, self._send))
+
+    async def _send(self, message):
+        if self.block_sends and message["type"] == "websocket.send":
+            await asyncio.Event().wait()
+        await self.outbox.put(message)
+
+    def next(self) -> dict:
+        return self.api.loop.run_until_complete(asyncio.wait_for(self.outbox.get(), 5))
+
+    def send(self, payload: dict):
+        self.inbox.put_nowait({"type": "websocket.receive", "text": json.dumps(payload)})
+
+    def reply(self, message: str) -> list:
+        self.send({"message": message})
+        events = []
+        while not events or events[-1][0] != "done":
+            frame = json.loads(self.next()["text"])
+            events.append((frame["event"], frame["data"]))
+        return events
+
+    def disconnect(self):
+        self.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        self.api.loop.run_until_complete(asyncio.wait_for(self.task, 5))
+
+
+def token_of(headers: dict) -> str:
+    return headers["Authorization"].split(" ", 1)[1]
+
+
+def test_sse_stream_sends_tokens_then_extras_and_saves_history(api, new_user):
+    headers = new_user()
+    response = api.post("/chat/stream", headers=headers, json={"message": "Where is my order?"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = sse_events(response.text)
+    assert event_names(events) == ["token"] + REPLY_EVENTS
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    assert events[-1] == ("done", {"text": tokens})
+    assert history_messages(api, headers) == ["Where is my order?"]
+
+
+def test_websocket_answers_each_message_and_saves_history(api, new_user):
+    headers = new_user()
+    ws = WebSocketSession(api, token_of(headers))
+    assert ws.next()["type"] == "websocket.accept"
+
+    ws.send({"message": ""})
+    assert json.loads(ws.next()["text"]) == {"event": "error", "data": {"detail": "Message required"}}
+    for message in ("First question", "Second question"):
+        assert event_names(ws.reply(message)) == ["token"] + REPLY_EVENTS
+    ws.disconnect()
+
+    assert history_messages(api, headers) == ["Second question", "First question"]
+    assert stream_connections.open == 0
+
+
+def test_websocket_with_a_bad_token_is_closed_with_1008(api):
+    ws = WebSocketSession(api, "not-a-token")
+    assert ws.next() == {"type": "websocket.close", "code": 1008, "reason": ""}
+    api.loop.run_until_complete(ws.task)
+
+
+def test_websocket_closes_once_the_token_expires(api, new_user, monkeypatch):
+    headers = new_user()
+    ws = WebSocketSession(api, token_of(headers))
+    assert ws.next()["type"] == "websocket.accept"
+
+    monkeypatch.setattr(chat_router, "time", SimpleNamespace(time=lambda: time.time() + 10 * 365 * 86400))
+    ws.send({"message": "Still there?"})
+    assert ws.next() == {"type": "websocket.close", "code": 1008, "reason": "Token expired"}
+    api.loop.run_until_complete(ws.task)
+    assert stream_connections.open == 0
+
+
+def test_stream_connections_are_capped_per_user(api, new_user, monkeypatch):
+    limiter = ConnectionLimiter(limit=10, per_user=1)
+    monkeypatch.setattr(chat_router, "stream_connections", limiter)
+    headers, other = new_user(), new_user()
+
+    ws = WebSocketSession(api, token_of(headers))
+    assert ws.next()["type"] == "websocket.accept"
+    assert api.post("/chat/stream", headers=headers, json={"message": "hi"}).status_code == 429
+    second = WebSocketSession(api, token_of(headers))
+    assert second.next()["code"] == 1013
+    assert api.post("/chat/stream", headers=other, json={"message": "hi"}).status_code == 200
+
+    ws.disconnect()
+    assert limiter.open == 0
+    assert api.post("/chat/stream", headers=headers, json={"message": "hi"}).status_code == 200
+
+
+def test_websocket_client_that_stops_reading_is_dropped(api, new_user, monkeypatch):
+    headers = new_user()
+    monkeypatch.setattr(chat_router, "send_within", partial(streaming.send_within, timeout=0.05))
+    ws = WebSocketSession(api, token_of(headers), block_sends=True)
+    assert ws.next()["type"] == "websocket.accept"
+
+    ws.send({"message": "Hello?"})
+    assert ws.next()["code"] == 1013
+    api.loop.run_until_complete(ws.task)
+    assert stream_connections.open == 0
+
+
+def test_event_stream_drops_a_client_that_stops_reading():
+    closed = []
+
+    async def events():
+        for i in range(100):
+            yield sse_event("token", {"text": str(i)})
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            await asyncio.Event().wait()
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    response = EventStreamResponse(events(), on_close=lambda: closed.append(True), send_timeout=0.05)
+    with pytest.raises(SlowClient):
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    assert closed == [True]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from app.db import POOL_CHECKOUT_WAIT, DatabaseSettings, TimedQueuePool, pool_stats
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def checkout(pool):
+    # The async-adapted pool waits through the asyncio bridge, as inside an AsyncSession
+    return asyncio.run(greenlet_spawn(pool.connect))
+
+
+def test_connect_errors_are_not_counted_as_pool_timeouts():
+    def refuse():
+        raise ConnectionRefusedError("database is down")
+
+    pool = TimedQueuePool(refuse, pool_size=1, max_overflow=0, timeout=0.01)
+    before = pool_stats.timeouts
+    with pytest.raises(ConnectionRefusedError):
+        checkout(pool)
+    assert pool_stats.timeouts == before
+
+
+def test_exhausted_pool_counts_a_timeout():
+    pool = TimedQueuePool(FakeConnection, pool_size=1, max_overflow=0, timeout=0.01)
+
+    async def scenario():
+        held = await greenlet_spawn(pool.connect)
+        try:
+            with pytest.raises(PoolTimeoutError):
+                await greenlet_spawn(pool.connect)
+        finally:
+            await greenlet_spawn(held.close)
+
+    before = pool_stats.timeouts
+    asyncio.run(scenario())
+    assert pool_stats.timeouts == before + 1
+
+
+def test_checkout_waits_are_recorded_in_the_histogram():
+    pool = TimedQueuePool(FakeConnection, pool_size=1, max_overflow=0, timeout=0.01)
+    before = sum(sum(series[:-1]) for series in POOL_CHECKOUT_WAIT._series.values())
+    asyncio.run(greenlet_spawn(lambda: pool.connect().close()))
+    assert sum(sum(series[:-1]) for series in POOL_CHECKOUT_WAIT._series.values()) == before + 1
+
+
+def test_pool_metrics_export_counters_and_a_wait_histogram(api):
+    text = api.get("/metrics").text
+    assert "# TYPE db_pool_checkouts_total counter" in text
+    assert "# TYPE db_pool_timeouts_total counter" in text
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in text
+    assert 'db_pool_checkout_wait_seconds_bucket{le="+Inf"}' in text
+
+
+def test_unknown_db_echo_is_rejected_with_the_accepted_values(monkeypatch):
+    monkeypatch.setenv("DB_ECHO", "yes")
+    with pytest.raises(ValueError, match="off, false, info, true, debug"):
+        DatabaseSettings.from_env()
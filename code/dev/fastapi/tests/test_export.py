@@ -0,0 +1,76 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from app import models
+from app.db import SessionLocal
+from tests.test_bookings import book
+
+
+def ndjson(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_booking_export_accepts_an_aware_range(api, new_user):
+    headers = new_user()
+    inside = book(api, headers, "2033-01-01T10:00:00", "consultation")
+    book(api, headers, "2033-01-02T10:00:00", "consultation")
+
+    # 2033-01-01T11:00+02:00 is 09:00 UTC, so only the first booking is in range
+    response = api.get(
+        "/bookings/export",
+        params={"from": "2033-01-01T11:00:00+02:00", "to": "2033-01-02T00:00:00Z"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert [row["id"] for row in ndjson(response)] == [inside["id"]]
+
+
+def test_chat_export_accepts_an_aware_range(api, new_user):
+    headers = new_user()
+    user_id = api.get("/users/me", headers=headers).json()["id"]
+
+    async def add_history():
+        async with SessionLocal() as session:
+            await session.execute(insert(models.ChatHistory), [
+                {"user_id": user_id, "message": message, "response": "ok",
+                 "timestamp": datetime(2033, 2, day, 12, tzinfo=timezone.utc)}
+                for day, message in ((1, "early"), (2, "late"))
+            ])
+            await session.commit()
+
+    api.loop.run_until_complete(add_history())
+    response = api.get(
+        "/chat/history/export", params={"from": "2033-02-02T00:00:00Z", "to": "2033-02-03T00:00:00+00:00"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert [row["message"] for row in ndjson(response)] == ["late"]
+
+
+def test_booking_export_formats_round_trip(api, new_user):
+    headers = new_user()
+    created = [book(api, headers, f"2033-03-0{day}T10:00:00", "meeting") for day in (1, 2, 3)]
+    ids = [booking["id"] for booking in created]
+
+    rows = ndjson(api.get("/bookings/export", headers=headers))
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["scheduled_date"] == "2033-03-01T10:00:00"
+    assert rows[0]["service_type"] == "meeting"
+
+    response = api.get("/bookings/export", params={"format": "csv"}, headers=headers)
+    assert response.headers["content-type"].startswith("text/csv")
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(record["id"]) for record in records] == ids
+    assert records[0]["status"] == "pending"
+
+    async def raw_gzip():
+        async with api.client.stream("GET", "/bookings/export", params={"gzip": "true"}, headers=headers) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            return b"".join([chunk async for chunk in response.aiter_raw()])
+
+    lines = gzip.decompress(api.loop.run_until_complete(raw_gzip())).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids
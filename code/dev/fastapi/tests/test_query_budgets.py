@@ -0,0 +1,42 @@
+BOOKING = {
+    "service_type": "consultation",
+    "title": "Budget booking",
+    "details": "Created by the query budget tests",
+    "scheduled_date": "2031-03-01T09:00:00",
+}
+
+
+def test_get_booking_query_budget(api, auth_headers, query_budget):
+    response = api.post("/bookings/", headers=auth_headers, json=BOOKING)
+    response.raise_for_status()
+
+    # The principal lookup plus the booking itself
+    with query_budget(2, "GET /bookings/{id}"):
+        response = api.get(f"/bookings/{response.json()['id']}", headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_list_bookings_query_budget(api, auth_headers, query_budget):
+    # The principal lookup, the count and the page
+    with query_budget(3, "GET /bookings/"):
+        response = api.get("/bookings/?per_page=20", headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_me_query_budget(api, auth_headers, query_budget):
+    with query_budget(2, "GET /users/me"):
+        response = api.get("/users/me", headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_revalidating_a_booking_skips_the_row(api, auth_headers, query_budget):
+    response = api.post("/bookings/", headers=auth_headers, json={**BOOKING, "scheduled_date": "2031-03-02T09:00:00"})
+    response.raise_for_status()
+    path = f"/bookings/{response.json()['id']}"
+    etag = api.get(path, headers=auth_headers).headers["ETag"]
+
+    # The principal lookup plus the version; the row is neither loaded nor serialized
+    with query_budget(2, "GET /bookings/{id} revalidation") as profile:
+        response = api.get(path, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert not any("bookings.title" in statement for statement, _, _ in profile.queries)
@@ -0,0 +1,65 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+
+import pytest
+
+from app import deps
+from app.ratelimit import MemoryBackend, RateLimiter, Rule, SQLiteBackend
+
+PASSWORD = "test-password-123"
+
+
+@pytest.fixture
+def login_limits(monkeypatch):
+    monkeypatch.setattr(deps, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(deps, "rate_limiter", RateLimiter(
+        MemoryBackend(), {("login", "ip"): Rule(100, 60), ("login", "user"): Rule(3, 60)}, enabled=True
+    ))
+
+
+def login(api, username: str, password: str, ip: str):
+    return api.post("/users/login", json={"username": username, "password": password}, headers={"X-Forwarded-For": ip})
+
+
+def register(api) -> str:
+    username = f"limit_{uuid.uuid4().hex[:8]}"
+    api.post(
+        "/users/register", json={"username": username, "email": f"{username}@example.com", "password": PASSWORD}
+    ).raise_for_status()
+    return username
+
+
+def test_successful_logins_do_not_use_the_failure_budget(api, login_limits):
+    username = register(api)
+    assert [login(api, username, PASSWORD, "10.0.0.1").status_code for _ in range(5)] == [200] * 5
+
+
+def test_failed_logins_elsewhere_do_not_lock_the_user_out(api, login_limits):
+    username = register(api)
+    statuses = [login(api, username, "wrong-password", "10.0.0.2").status_code for _ in range(4)]
+    assert statuses == [401, 401, 401, 429]
+    # Refused before the password check, even with the right one
+    assert login(api, username, PASSWORD, "10.0.0.2").status_code == 429
+    assert login(api, username, PASSWORD, "10.0.0.3").status_code == 200
+
+
+def test_sqlite_backend_fails_open_at_once_when_locked(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    backend = SQLiteBackend(path)
+    limiter = RateLimiter(backend, {("chat", "ip"): Rule(1, 60)}, enabled=True)
+    assert asyncio.run(limiter.hit("chat", ip="10.0.0.4")).allowed
+
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        decision = asyncio.run(limiter.hit("chat", ip="10.0.0.4"))
+        elapsed = time.perf_counter() - started
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+        backend.close()
+    assert decision is None
+    assert elapsed < 0.01
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from app import models
+from app.db import SessionLocal
+from app.search_index import InvertedIndex, query_terms
+
+
+def add_booking(api, headers, title: str, day: int) -> int:
+    response = api.post("/bookings/", headers=headers, json={
+        "service_type": "consultation", "title": title, "scheduled_date": f"2034-01-{day:02d}T10:00:00",
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def search(api, headers, q: str, **params) -> dict:
+    response = api.get("/search/", headers=headers, params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_index_matches_every_term_as_a_prefix():
+    index = InvertedIndex()
+    index.add_many([(1, "Refund for a broken router"), (2, "Router setup"), (3, "Refunds policy")])
+
+    assert {key for key, _ in index.search(query_terms("refund"))} == {1, 3}
+    assert [key for key, _ in index.search(query_terms("ref rout"))] == [1]
+    assert index.search(query_terms("refund setup")) == []
+    assert index.search([]) == []
+
+
+def test_in_memory_search_prefix_matching(api, new_user):
+    headers = new_user()
+    invoice = add_booking(api, headers, "Invoice question", 1)
+    add_booking(api, headers, "Delivery window", 2)
+
+    assert [hit["id"] for hit in search(api, headers, "invo")["items"]] == [invoice]
+    assert search(api, headers, "invo deliv")["items"] == []
+
+
+def test_in_memory_search_pages_with_the_cursor(api, new_user):
+    headers = new_user()
+    ids = {add_booking(api, headers, f"Warranty claim {day}", day) for day in range(1, 6)}
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = search(api, headers, "warr", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [hit["id"] for hit in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) and set(seen) == ids
+
+    response = api.get("/search/", headers=headers, params={"q": "warr", "cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_in_memory_search_is_scoped_to_the_user(api, new_user):
+    owner, other = new_user(), new_user()
+    booking = add_booking(api, owner, "Passport renewal", 3)
+    owner_id = api.get("/users/me", headers=owner).json()["id"]
+
+    async def add_history():
+        async with SessionLocal() as session:
+            await session.execute(insert(models.ChatHistory), [{
+                "user_id": owner_id, "message": "Passport photo size?", "response": "35x45mm",
+                "timestamp": datetime(2034, 1, 3, tzinfo=timezone.utc),
+            }])
+            await session.commit()
+
+    api.loop.run_until_complete(add_history())
+
+    hits = search(api, owner, "passp")["items"]
+    assert sorted(hit["kind"] for hit in hits) == ["booking", "chat"]
+    assert [hit["id"] for hit in search(api, owner, "passp", scope="bookings")["items"]] == [booking]
+    assert [hit["kind"] for hit in search(api, owner, "passp", scope="chat")["items"]] == ["chat"]
+    assert search(api, other, "passp")["items"] == []
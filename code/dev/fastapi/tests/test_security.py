@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+from app.security import HashingSaturated, _BoundedExecutor
+
+
+def test_cancelled_callers_keep_their_job_counted_until_it_ends():
+    async def scenario():
+        executor = _BoundedExecutor("thread", workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            running = asyncio.ensure_future(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            running.cancel()
+            await asyncio.sleep(0.05)
+            # The job is still on the worker, so the pool is still full
+            assert executor.pending == 1
+            try:
+                await executor.run(sum, [1])
+            except HashingSaturated:
+                pass
+            else:
+                raise AssertionError("a saturated pool accepted another job")
+
+            release.set()
+            await asyncio.sleep(0.05)
+            assert executor.pending == 0
+            assert await executor.run(sum, [1, 2]) == 3
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+import gc
+import json
+import urllib.request
+
+from app.sentiment import SentimentClient
+from benchmarks.harness import LoopLagSampler
+from benchmarks.stub_sentiment import StubSentimentServer
+
+STUB_LATENCY = 0.2
+
+
+async def max_loop_lag(work) -> float:
+    # A full collection of everything earlier tests left behind would show up as lag
+    gc.collect()
+    gc.disable()
+    try:
+        with LoopLagSampler(interval=0.005) as sampler:
+            await asyncio.sleep(0.02)
+            await work
+            await asyncio.sleep(0.02)
+    finally:
+        gc.enable()
+    return sampler.max_lag
+
+
+def blocking_post(url: str, text: str):
+    """What the handler used to do: a synchronous HTTP call on the event loop."""
+    request = urllib.request.Request(
+        url, data=json.dumps({"inputs": text}).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_remote_sentiment_does_not_stall_the_event_loop(free_port):
+    async def scenario(url):
+        client = SentimentClient(url=url, cache_size=0)
+        try:
+            # The first call imports httpx and builds the pool; keep that one-off out of the measurement
+            await client.analyze("warm up")
+
+            async def async_calls():
+                results = await asyncio.gather(*(client.analyze(f"message {i}") for i in range(5)))
+                assert all(r is not None and r.label == "positive" for r in results)
+
+            async def blocking_calls():
+                for i in range(2):
+                    blocking_post(url, f"message {i}")
+
+            return await max_loop_lag(async_calls()), await max_loop_lag(blocking_calls())
+        finally:
+            await client.aclose()
+
+    with StubSentimentServer(free_port, latency=STUB_LATENCY) as stub:
+        async_lag, blocking_lag = asyncio.run(scenario(stub.url))
+
+    # Blocking calls freeze the loop for the whole round trip; the async client barely registers
+    assert blocking_lag >= STUB_LATENCY * 0.9
+    assert async_lag < STUB_LATENCY / 4
+
+
+def test_repeated_messages_hit_the_network_once(free_port):
+    async def scenario(url):
+        client = SentimentClient(url=url)
+        fetches = []
+        fetch = client._fetch
+
+        async def counting_fetch(key, text):
+            fetches.append(key)
+            return await fetch(key, text)
+
+        client._fetch = counting_fetch
+        try:
+            # Concurrent duplicates share one call, later ones come from the cache
+            await asyncio.gather(*(client.analyze("thanks") for _ in range(10)))
+            await client.analyze("  Thanks ")
+            await client.analyze("hi")
+            return fetches
+        finally:
+            await client.aclose()
+
+    with StubSentimentServer(free_port, latency=0.05) as stub:
+        assert asyncio.run(scenario(stub.url)) == ["thanks", "hi"]
@@ -0,0 +1,86 @@
+import asyncio
+
+from app.singleflight import SingleFlight
+
+
+class FakeLoader:
+    """Counts calls; each load blocks until ``release`` and returns the value it started with."""
+
+    def __init__(self, value="v1"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.value
+        await self.release.wait()
+        return value
+
+
+async def settle():
+    """Let started readers reach their load."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_identical_reads_run_one_load():
+    async def scenario():
+        flight = SingleFlight(enabled=True, ttl=0)
+        loader = FakeLoader()
+        readers = [asyncio.ensure_future(flight.do(1, ("route",), loader)) for _ in range(100)]
+        await settle()
+        loader.release.set()
+        return loader, await asyncio.gather(*readers), flight
+
+    loader, values, flight = asyncio.run(scenario())
+    assert loader.calls == 1
+    assert values == ["v1"] * 100
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_reads_after_invalidate_do_not_join_or_cache_an_older_load():
+    async def scenario():
+        flight = SingleFlight(enabled=True, ttl=60)
+        loader = FakeLoader()
+        before = asyncio.ensure_future(flight.do(1, ("route",), loader))
+        await settle()
+        flight.invalidate(1)
+        loader.value = "v2"
+        after = asyncio.ensure_future(flight.do(1, ("route",), loader))
+        await settle()
+        loader.release.set()
+        return loader, await before, await after, await flight.do(1, ("route",), loader)
+
+    loader, before, after, cached = asyncio.run(scenario())
+    assert loader.calls == 2
+    assert (before, after, cached) == ("v1", "v2", "v2")
+
+
+def test_evicted_generation_drops_cached_values_and_detaches_loads():
+    async def scenario():
+        flight = SingleFlight(enabled=True, ttl=60, max_owners=1)
+        stale = FakeLoader("stale")
+        pending = asyncio.ensure_future(flight.do(1, ("route",), stale))
+        await settle()
+        flight.invalidate(1)
+        # Owner 2 pushes owner 1's generation out, so owner 1 is back at generation 0
+        flight.invalidate(2)
+        assert flight.generation(1) == 0
+
+        fresh = FakeLoader("fresh")
+        fresh.release.set()
+        value = await flight.do(1, ("route",), fresh)
+        stale.release.set()
+        await pending
+        return value, await flight.do(1, ("route",), fresh), fresh.calls
+
+    value, cached, calls = asyncio.run(scenario())
+    assert (value, cached, calls) == ("fresh", "fresh", 1)
+
+
+def test_generations_are_bounded():
+    flight = SingleFlight(enabled=True, ttl=60, max_owners=10)
+    for owner in range(1000):
+        flight.invalidate(owner)
+    assert flight.stats()["owners"] == 10
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.startup import SchemaMismatch, alembic_heads, prepare_schema
+
+
+def test_create_all_database_is_adopted_by_stamping(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'adopt.db'}")
+        try:
+            async with engine.begin() as conn:
+                await prepare_schema(conn, "create_all")
+            async with engine.connect() as conn:
+                with pytest.raises(SchemaMismatch, match="alembic stamp head"):
+                    await prepare_schema(conn, "verify")
+
+            # What `alembic stamp head` leaves behind
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+                for head in alembic_heads():
+                    await conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": head})
+            async with engine.connect() as conn:
+                await prepare_schema(conn, "verify")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="STARTUP_SCHEMA_MODE"):
+        asyncio.run(prepare_schema(None, "migrate"))
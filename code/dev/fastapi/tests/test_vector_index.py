@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.vector_index import MANIFEST, SNAPSHOT_PREFIX, ChatVectorIndex, VectorIndex
+
+
+def random_index(n: int, dim: int = 8, seed: int = 0) -> VectorIndex:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex(dim)
+    index.add(np.arange(1, n + 1), [i % 3 for i in range(n)], vectors)
+    return index
+
+
+def snapshots(path) -> list:
+    return sorted(entry for entry in os.listdir(path) if entry.startswith(SNAPSHOT_PREFIX))
+
+
+def test_save_switches_snapshots_whole(tmp_path):
+    index = random_index(50)
+    index.build_ivf(4)
+    first = index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    query = index.vectors[7]
+    assert loaded.search(query, 5, user_id=1) == index.search(query, 5, user_id=1)
+
+    index.add([51], [2], [query])
+    second = index.save(str(tmp_path))
+    third = index.save(str(tmp_path))
+    assert len(VectorIndex.load(str(tmp_path))) == 51
+    # The previous snapshot stays for workers that still map it; older ones go
+    assert snapshots(tmp_path) == sorted([second, third]) and first not in snapshots(tmp_path)
+
+
+def test_load_rejects_arrays_that_disagree(tmp_path):
+    random_index(20).save(str(tmp_path))
+    manifest_path = tmp_path / MANIFEST
+    manifest = json.loads(manifest_path.read_text())
+    manifest["size"] = 25
+    manifest_path.write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError, match="shape"):
+        VectorIndex.load(str(tmp_path))
+
+
+def test_only_one_process_writes_snapshots(tmp_path):
+    async def scenario():
+        workers = [ChatVectorIndex(path=str(tmp_path), sync_interval=0) for _ in range(2)]
+        for worker in workers:
+            worker.index = random_index(10)
+            worker._claim_writer()
+        assert [worker.is_writer for worker in workers] == [True, False]
+
+        await workers[1].stop()
+        assert not (tmp_path / MANIFEST).exists()
+        await workers[0].stop()
+        assert len(snapshots(tmp_path)) == 1 and not workers[0].is_writer
+
+    asyncio.run(scenario())
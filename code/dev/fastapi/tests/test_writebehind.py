@@ -0,0 +1,140 @@
+import asyncio
+
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.writebehind import WriteBehindQueue
+
+
+class FakeStore:
+    """Session factory that records committed rows.
+
+    The first ``failures`` commits raise as if the database were down; an
+    INSERT containing a row whose message is in ``poison`` raises IntegrityError.
+    """
+
+    def __init__(self, failures: int = 0, poison=()):
+        self.rows = []
+        self.failures = failures
+        self.poison = set(poison)
+        self.commits = 0
+        self.inserts = 0
+
+    def __call__(self):
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, store: FakeStore):
+        self.store = store
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, rows):
+        self.store.inserts += 1
+        if any(row["message"] in self.store.poison for row in rows):
+            raise IntegrityError("INSERT INTO chat_history", rows, Exception("foreign key violation"))
+        self.pending.extend(rows)
+
+    async def commit(self):
+        if self.store.failures:
+            self.store.failures -= 1
+            raise RuntimeError("database unavailable")
+        self.store.commits += 1
+        self.store.rows.extend(self.pending)
+
+
+def make_queue(store: FakeStore, **kwargs) -> WriteBehindQueue:
+    options = dict(enabled=True, max_batch=50, flush_interval=0.01, max_queue=10_000, put_timeout=1.0)
+    options.update(kwargs)
+    return WriteBehindQueue(models.ChatHistory.__table__, session_factory=store, **options)
+
+
+def rows(n: int) -> list:
+    return [{"user_id": 1, "message": f"message {i}", "response": "ok"} for i in range(n)]
+
+
+def test_stop_flushes_every_buffered_row():
+    store = FakeStore()
+
+    async def scenario():
+        queue = make_queue(store)
+        queue.start()
+        for row in rows(1000):
+            await queue.put(row)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert store.rows == rows(1000)
+    # Multi-row INSERTs, not one per row
+    assert store.commits < 1000 / 10
+    assert queue.counters["flushed"] == 1000
+    assert queue.counters["dropped"] == 0
+    assert queue.depth == 0
+
+
+def test_rows_from_failed_flushes_are_held_and_written_at_stop():
+    # Enough failures to exhaust every retry of the first batch
+    store = FakeStore(failures=3)
+
+    async def scenario():
+        queue = make_queue(store)
+        queue.start()
+        for row in rows(120):
+            await queue.put(row)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert sorted(r["message"] for r in store.rows) == sorted(r["message"] for r in rows(120))
+    assert len(store.rows) == 120
+    assert queue.counters["dropped"] == 0
+    assert queue.held == 0
+
+
+def test_rows_that_cannot_be_written_are_counted_as_dropped():
+    store = FakeStore(failures=10_000)
+
+    async def scenario():
+        queue = make_queue(store)
+        queue.start()
+        for row in rows(10):
+            await queue.put(row)
+        await asyncio.wait_for(queue.stop(), timeout=10)
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert store.rows == []
+    assert queue.counters["dropped"] == 10
+    assert queue.held == 0
+
+
+def test_a_poison_row_is_isolated_and_does_not_block_later_rows():
+    store = FakeStore(poison={"message 7"})
+
+    async def scenario():
+        queue = make_queue(store)
+        queue.start()
+        for row in rows(500):
+            await queue.put(row)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    expected = [row for row in rows(500) if row["message"] != "message 7"]
+    assert sorted(r["message"] for r in store.rows) == sorted(r["message"] for r in expected)
+    assert queue.counters["dropped"] == 1
+    assert queue.held == 0
+    # Bisecting the one bad batch costs O(log batch) INSERTs, not one per row
+    assert store.inserts < 500 / 50 + 2 * 6 + 2
+
+
+def test_dropped_rows_are_exported_as_a_counter(api):
+    text = api.get("/metrics").text
+    assert "# TYPE chat_write_behind_dropped_total counter" in text